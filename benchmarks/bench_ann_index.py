@@ -0,0 +1,102 @@
+"""
+Benchmark of adaptive RAG index selection: build time, query latency and recall@k of HNSW/IVF indexes
+versus exact flat inner product baseline.
+
+Vectors are synthetic clustered unit vectors of the embedding dimension (chunks of real documents form
+topical clusters), queries are perturbed chunk vectors.
+
+Run: python -m benchmarks.bench_ann_index --sizes 5000,20000,100000 --ef-search 64,128,256 --nprobe 8,16,32
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from task.tools.rag.ann_index import AnnIndexConfig, apply_search_params, build_adaptive_index, create_flat_index, \
+    normalize
+
+EMBEDDING_DIM = 384
+TOP_K = 10
+QUERIES = 200
+
+
+def _clustered_vectors(count: int, rng: np.random.Generator, clusters: int = 64) -> np.ndarray:
+    centers = rng.standard_normal((clusters, EMBEDDING_DIM)).astype('float32')
+    assignment = rng.integers(0, clusters, count)
+    vectors = centers[assignment] + 0.6 * rng.standard_normal((count, EMBEDDING_DIM)).astype('float32')
+    return normalize(vectors)
+
+
+def _recall(approximate: np.ndarray, exact: np.ndarray) -> float:
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approximate, exact))
+    return hits / exact.size
+
+
+def _search_latency(index, queries: np.ndarray) -> tuple[np.ndarray, float]:
+    started = time.perf_counter()
+    _, indices = index.search(queries, TOP_K)
+    return indices, (time.perf_counter() - started) / len(queries) * 1000
+
+
+def _record(size: int, kind: str, params: dict, build_s: float, latency_ms: float, recall: float) -> None:
+    print(json.dumps({
+        "chunks": size,
+        "index": kind,
+        **params,
+        "build_s": round(build_s, 3),
+        "query_ms": round(latency_ms, 4),
+        f"recall@{TOP_K}": round(recall, 4),
+    }))
+
+
+def main(args: argparse.Namespace) -> None:
+    faiss.omp_set_num_threads(1)
+    rng = np.random.default_rng(0)
+
+    for size in args.sizes:
+        vectors = _clustered_vectors(size, rng)
+        queries = normalize(vectors[rng.integers(0, size, QUERIES)]
+                            + 0.3 * rng.standard_normal((QUERIES, EMBEDDING_DIM)).astype('float32'))
+
+        started = time.perf_counter()
+        flat = create_flat_index(EMBEDDING_DIM)
+        flat.add(vectors)
+        flat_build = time.perf_counter() - started
+        exact, flat_latency = _search_latency(flat, queries)
+        _record(size, "flat", {}, flat_build, flat_latency, 1.0)
+
+        hnsw_config = AnnIndexConfig(flat_max_chunks=0, ann_type="hnsw")
+        started = time.perf_counter()
+        hnsw = build_adaptive_index(flat, hnsw_config)
+        hnsw_build = time.perf_counter() - started
+        for ef_search in args.ef_search:
+            apply_search_params(hnsw, AnnIndexConfig(hnsw_ef_search=ef_search))
+            indices, latency = _search_latency(hnsw, queries)
+            _record(size, "hnsw", {"ef_search": ef_search}, hnsw_build, latency, _recall(indices, exact))
+
+        ivf_config = AnnIndexConfig(flat_max_chunks=0, ann_type="ivf")
+        started = time.perf_counter()
+        ivf = build_adaptive_index(flat, ivf_config)
+        ivf_build = time.perf_counter() - started
+        for nprobe in args.nprobe:
+            apply_search_params(ivf, AnnIndexConfig(ivf_nprobe=nprobe))
+            indices, latency = _search_latency(ivf, queries)
+            _record(size, "ivf", {"nprobe": nprobe}, ivf_build, latency, _recall(indices, exact))
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=_int_list, default=[5_000, 20_000, 100_000])
+    parser.add_argument("--ef-search", type=_int_list, default=[64, 128, 256])
+    parser.add_argument("--nprobe", type=_int_list, default=[8, 16, 32])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(_parse_args())
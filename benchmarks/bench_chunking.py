@@ -0,0 +1,104 @@
+"""
+Benchmark of RAG chunking: `TokenChunker` (token windows over text offsets) vs
+`RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)` used before.
+
+Throughput is measured on multi-MB synthetic text. Quality is measured model-free:
+- `facts_intact`: share of planted fact sentences fully contained in at least one chunk
+- `over_window`: share of chunks longer than the embedding model window (their tail is truncated by the model)
+- `mean_tokens`: average chunk size in tokens (how much of the window is used)
+
+With `--with-model` (embedding model must be available locally) retrieval hit@3 of planted facts is measured too.
+
+Run: python -m benchmarks.bench_chunking --megabytes 1,5
+"""
+import argparse
+import json
+import random
+import time
+
+import numpy as np
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from benchmarks.components import _text
+from task.tools.rag.chunking import TokenChunker, create_model_chunker
+
+FACT_EVERY_PARAGRAPHS = 7
+
+
+def _document(size: int, seed: int = 0) -> tuple[str, list[str]]:
+    rnd = random.Random(seed)
+    paragraphs, facts, length = [], [], 0
+    while length < size:
+        sentences = [_text(rnd, rnd.randint(8, 25)).capitalize() + "." for _ in range(rnd.randint(2, 8))]
+        if len(paragraphs) % FACT_EVERY_PARAGRAPHS == 0:
+            fact = f"Contract number {len(facts)} was signed by {rnd.choice(['Alice', 'Bob', 'Carol'])} " \
+                   f"in {rnd.choice(['Paris', 'Berlin', 'Tokyo'])} for {rnd.randint(1000, 99999)} euros."
+            sentences.insert(rnd.randint(0, len(sentences)), fact)
+            facts.append(fact)
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+    return "\n\n".join(paragraphs), facts
+
+
+def _quality(chunks: list[str], facts: list[str], chunker: TokenChunker) -> dict:
+    tokens = [len(chunker._token_offsets(chunk)[0]) for chunk in chunks]
+    joined = "\x00".join(chunks)
+    intact = sum(1 for fact in facts if fact in joined and any(fact in chunk for chunk in chunks))
+    return {
+        "chunks": len(chunks),
+        "mean_tokens": round(float(np.mean(tokens)), 1),
+        "over_window": round(sum(1 for count in tokens if count > chunker.chunk_tokens) / len(chunks), 4),
+        "facts_intact": round(intact / len(facts), 4),
+    }
+
+
+def _hit_at_3(model, chunks: list[str], facts: list[str]) -> float:
+    import faiss
+
+    from task.tools.rag.ann_index import normalize
+
+    index = faiss.IndexFlatIP(model.get_sentence_embedding_dimension())
+    index.add(normalize(model.encode(chunks, batch_size=64)))
+    queries = [fact.rsplit(" for ", 1)[0] + "?" for fact in facts]
+    _, indices = index.search(normalize(model.encode(queries)), 3)
+    return sum(1 for fact, row in zip(facts, indices) if any(fact in chunks[i] for i in row)) / len(facts)
+
+
+def main(args: argparse.Namespace) -> None:
+    model = None
+    if args.with_model:
+        from task.utils.embeddings import get_embedding_model
+        model = get_embedding_model()
+    token_chunker = create_model_chunker(model) if model is not None else TokenChunker()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=500, chunk_overlap=50, length_function=len, separators=["\n\n", "\n", ". ", " ", ""]
+    )
+
+    for megabytes in args.megabytes:
+        text, facts = _document(int(megabytes * 1024 * 1024))
+        for name, split in (("recursive_500_50", splitter.split_text), ("token_chunker", token_chunker.split_text)):
+            started = time.perf_counter()
+            chunks = split(text)
+            duration = time.perf_counter() - started
+            record = {
+                "splitter": name,
+                "megabytes": megabytes,
+                "duration_s": round(duration, 3),
+                "mb_per_s": round(megabytes / duration, 2),
+                **_quality(chunks, facts, token_chunker),
+            }
+            if model is not None:
+                record["hit_at_3"] = round(_hit_at_3(model, chunks, facts[:200]), 4)
+            print(json.dumps(record))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=lambda value: [float(item) for item in value.split(",")], default=[1, 5])
+    parser.add_argument("--with-model", action="store_true")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(_parse_args())
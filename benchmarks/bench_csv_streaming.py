@@ -0,0 +1,97 @@
+"""
+Benchmark of CSV extraction: whole-file path used before (decode + `pd.read_csv` + `to_markdown`) vs chunked
+streaming (`pd.read_csv(chunksize=...)` over the bytes/spooled file, markdown rendered per chunk).
+
+For every input size reports duration and peak traced memory (tracemalloc) of:
+- `to_markdown`: previous implementation (skipped above `--baseline-max-mb`, tabulate is very slow on big frames)
+- `row_groups`: RAG pages, row groups with the header (`aextract_pages_from_file` path), read from spooled file
+
+Run: python -m benchmarks.bench_csv_streaming --megabytes 10,200
+"""
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable
+
+import pandas as pd
+
+from benchmarks.components import _text, _WORDS
+from task.utils.dial_file_conent_extractor import _extract_pages
+
+
+def _make_csv_file(size: int, seed: int = 0) -> str:
+    """CSV of about `size` bytes written to temporary file, generated in batches to keep memory flat."""
+    rnd = random.Random(seed)
+    with tempfile.NamedTemporaryFile("w", prefix="bench-", suffix=".csv", delete=False, encoding="utf-8") as f:
+        f.write("id,name,category,amount,comment\n")
+        row = 0
+        while f.tell() < size:
+            f.write("".join(
+                f"{row + i},{rnd.choice(_WORDS)},{rnd.choice(_WORDS)},{rnd.random() * 1000:.2f},{_text(rnd, 8)}\n"
+                for i in range(10_000)
+            ))
+            row += 10_000
+        return f.name
+
+
+def _to_markdown(content: bytes) -> str:
+    df = pd.read_csv(io.StringIO(content.decode('utf-8', errors='ignore')))
+    return df.to_markdown(index=False)
+
+
+def _run(fn: Callable[[], Any]) -> tuple[Any, float, int]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    duration = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, duration, peak
+
+
+def main(args: argparse.Namespace) -> None:
+    for megabytes in args.megabytes:
+        path = _make_csv_file(int(megabytes * 1024 * 1024))
+        try:
+            size = os.path.getsize(path)
+            with open(path, "rb") as f:
+                content = f.read()
+
+            variants = [
+                ("row_groups", lambda: _extract_pages(path, '.csv', 'bench.csv')),
+            ]
+            if megabytes <= args.baseline_max_mb:
+                variants.insert(0, ("to_markdown", lambda: _to_markdown(content)))
+
+            for name, fn in variants:
+                result, duration, peak = _run(fn)
+                output_chars = sum(map(len, result)) if isinstance(result, list) else len(result)
+                print(json.dumps({
+                    "variant": name,
+                    "megabytes": round(size / 1024 / 1024, 1),
+                    "duration_s": round(duration, 3),
+                    "mb_per_s": round(size / 1024 / 1024 / duration, 2),
+                    "peak_mb": round(peak / 1024 / 1024, 1),
+                    "output_chars": output_chars,
+                    "pages": len(result) if isinstance(result, list) else 1,
+                }))
+            del content
+        finally:
+            os.unlink(path)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megabytes", type=lambda value: [float(item) for item in value.split(",")],
+                        default=[10, 200])
+    parser.add_argument("--baseline-max-mb", type=float, default=50)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main(_parse_args())
@@ -0,0 +1,105 @@
+"""
+Benchmark of event loop responsiveness during file extraction: heartbeat lag while large PDFs are
+downloaded from fake DIAL Core and parsed: on the event loop (blocking, as tools used to parse files)
+vs `aextract_text` (streamed download + process pool).
+
+Run: python -m benchmarks.bench_extraction_concurrency --pages 200 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+
+import httpx
+import uvicorn
+
+from benchmarks.components import _page_text, make_pdf
+from benchmarks.loadtest.fake_dial_core import FakeDialCoreConfig, create_fake_dial_core
+from benchmarks.loadtest.run import _percentile
+from task.utils.dial_file_conent_extractor import DialFileContentExtractor, _extract_pages
+
+HEARTBEAT_INTERVAL = 0.01
+
+
+async def _heartbeat(lags: list[float], stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(time.perf_counter() - started - HEARTBEAT_INTERVAL)
+
+
+async def _run(mode: str, extractor: DialFileContentExtractor, file_url: str, concurrency: int) -> dict:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    heartbeat = asyncio.create_task(_heartbeat(lags, stop))
+
+    async def _extract() -> int:
+        if mode == "sync":
+            with await extractor.adownload(file_url) as downloaded_file:
+                pages = _extract_pages(downloaded_file.read_bytes(), '.pdf', downloaded_file.filename)
+            return len('\n\n'.join(page for page in pages if page))
+        return len(await extractor.aextract_text(file_url))
+
+    started = time.perf_counter()
+    lengths = await asyncio.gather(*(_extract() for _ in range(concurrency)))
+    duration = time.perf_counter() - started
+
+    stop.set()
+    await heartbeat
+    return {
+        "mode": mode,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 3),
+        "text_chars": lengths[0],
+        "loop_lag_p50_ms": round(_percentile(lags, 50) * 1000, 2),
+        "loop_lag_p99_ms": round(_percentile(lags, 99) * 1000, 2),
+        "loop_lag_max_ms": round(max(lags) * 1000, 2),
+    }
+
+
+def _serve_in_thread(port: int) -> uvicorn.Server:
+    """Fake DIAL Core runs on its own event loop, otherwise blocking sync extraction would deadlock it."""
+    config = uvicorn.Config(create_fake_dial_core(FakeDialCoreConfig()), host="127.0.0.1", port=port,
+                            log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def main(args: argparse.Namespace) -> None:
+    endpoint = f"http://127.0.0.1:{args.port}"
+    server = _serve_in_thread(args.port)
+    try:
+        rnd = random.Random(0)
+        pdf = make_pdf([_page_text(rnd, page) for page in range(args.pages)])
+        file_url = "files/fake-bucket/documents/large.pdf"
+        async with httpx.AsyncClient() as client:
+            response = await client.put(f"{endpoint}/v1/{file_url}", files={"file": ("large.pdf", pdf)})
+            response.raise_for_status()
+
+        extractor = DialFileContentExtractor(endpoint=endpoint, api_key="dial_api_key")
+        # Warm up process pool, so worker start-up is not measured
+        await extractor.aextract_text(file_url)
+
+        for mode in ("sync", "async"):
+            result = await _run(mode, extractor, file_url, args.concurrency)
+            result["pdf_bytes"] = len(pdf)
+            print(json.dumps(result))
+    finally:
+        server.should_exit = True
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -0,0 +1,114 @@
+"""
+Benchmark of history preparation on a synthetic 200-turn conversation with tool call state:
+legacy deep-copy unpacking on every round vs incremental `HistoryUnpacker`.
+
+Run: python -m benchmarks.bench_history
+"""
+import copy
+import json
+import time
+
+from aidial_sdk.chat_completion import Message, Role, CustomContent
+
+from task.utils.constants import TOOL_CALL_HISTORY_KEY, CUSTOM_CONTENT
+from task.utils.history import HistoryUnpacker
+
+TURNS = 200
+ROUNDS_PER_REQUEST = 4
+TOOL_RESULT_SIZE = 4_000
+
+
+def _tool_call_history(turn: int) -> list[dict]:
+    history = []
+    for i in range(2):
+        tool_call_id = f"call_{turn}_{i}"
+        history.append({
+            "role": Role.ASSISTANT.value,
+            "content": "",
+            "tool_calls": [{
+                "id": tool_call_id,
+                "type": "function",
+                "function": {"name": "rag_tool", "arguments": json.dumps({"request": f"q{turn}", "file_url": "f.pdf"})},
+            }],
+        })
+        history.append({
+            "role": Role.TOOL.value,
+            "content": "x" * TOOL_RESULT_SIZE,
+            "tool_call_id": tool_call_id,
+        })
+    return history
+
+
+def build_conversation(turns: int = TURNS) -> list[Message]:
+    messages = []
+    for turn in range(turns):
+        messages.append(Message(role=Role.USER, content=f"Question #{turn}"))
+        messages.append(
+            Message(
+                role=Role.ASSISTANT,
+                content=f"Answer #{turn} " * 20,
+                custom_content=CustomContent(state={TOOL_CALL_HISTORY_KEY: _tool_call_history(turn)}),
+            )
+        )
+    messages.append(Message(role=Role.USER, content="Last question"))
+    return messages
+
+
+def _legacy_unpack_messages(messages: list[Message], state_history: list[dict]) -> list[dict]:
+    """Previous implementation: full rebuild with deep copies on every round."""
+    result = []
+    for message in messages:
+        if message.role == Role.ASSISTANT:
+            if custom_content := message.custom_content:
+                state = custom_content.state
+                if state and isinstance(state, dict):
+                    tool_call_history = state.get(TOOL_CALL_HISTORY_KEY)
+                    if tool_call_history and isinstance(tool_call_history, list):
+                        for history_msg in tool_call_history:
+                            if history_msg.get("role") == Role.TOOL.value:
+                                result.append({
+                                    "role": Role.TOOL.value,
+                                    "content": history_msg.get("content"),
+                                    "tool_call_id": history_msg.get("tool_call_id"),
+                                })
+                            else:
+                                result.append(history_msg)
+                    msg = copy.deepcopy(message)
+                    msg.custom_content = None
+                    result.append(msg.dict(exclude_none=True))
+        else:
+            result.append({"role": message.role, "content": message.content or ''})
+    for history_msg in state_history:
+        if history_msg.get(CUSTOM_CONTENT):
+            del history_msg[CUSTOM_CONTENT]
+        result.append(history_msg)
+    return result
+
+
+def _run(messages: list[Message], incremental: bool) -> float:
+    state_history: list[dict] = []
+    unpacker = HistoryUnpacker()
+    started = time.perf_counter()
+    for round_number in range(ROUNDS_PER_REQUEST):
+        if incremental:
+            unpacker.unpack(messages, state_history)
+        else:
+            _legacy_unpack_messages(messages, state_history)
+        state_history.extend(_tool_call_history(TURNS + round_number))
+    return time.perf_counter() - started
+
+
+def main():
+    messages = build_conversation()
+    for incremental in (False, True):
+        elapsed = min(_run(messages, incremental) for _ in range(5))
+        print(json.dumps({
+            "mode": "incremental" if incremental else "legacy",
+            "turns": TURNS,
+            "rounds": ROUNDS_PER_REQUEST,
+            "ms_per_request": elapsed * 1000,
+        }))
+
+
+if __name__ == "__main__":
+    main()
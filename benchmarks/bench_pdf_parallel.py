@@ -0,0 +1,65 @@
+"""
+Benchmark of parallel PDF extraction: pages/second of `DialFileContentExtractor.aextract_pages_from_file`
+for different numbers of extraction worker processes (1 worker = sequential extraction in one process).
+
+Run: python -m benchmarks.bench_pdf_parallel --pages 400 --workers 1,2,4,8
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from benchmarks.components import _int_list, _page_text, make_pdf
+from task.utils.dial_file_conent_extractor import DialFileContentExtractor, DownloadedFile, \
+    _count_pdf_pages_worker, _run_in_process_pool, configure_extraction_workers
+
+
+async def _extract(extractor: DialFileContentExtractor, pdf: bytes) -> tuple[list[str], float]:
+    with DownloadedFile("document.pdf") as downloaded_file:
+        downloaded_file.write(pdf)
+        downloaded_file.finish()
+        started = time.perf_counter()
+        pages = await extractor.aextract_pages_from_file(downloaded_file)
+        return pages, time.perf_counter() - started
+
+
+async def main(args: argparse.Namespace) -> None:
+    rnd = random.Random(0)
+    pdf = make_pdf([_page_text(rnd, page) for page in range(args.pages)])
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="dial_api_key")
+
+    baseline = None
+    for workers in args.workers:
+        configure_extraction_workers(workers)
+        # Start worker processes before measuring
+        with DownloadedFile("warmup.pdf") as warmup:
+            warmup.write(pdf)
+            warmup.finish()
+            await asyncio.gather(*(_run_in_process_pool(_count_pdf_pages_worker, warmup.ensure_path())
+                                   for _ in range(workers)))
+
+        pages, duration = await _extract(extractor, pdf)
+        baseline = baseline or pages
+        print(json.dumps({
+            "workers": workers,
+            "cpu_count": os.cpu_count(),
+            "pages": len(pages),
+            "duration_s": round(duration, 3),
+            "pages_per_s": round(len(pages) / duration, 1),
+            "same_as_first": pages == baseline,
+        }))
+
+    configure_extraction_workers(1)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=_int_list, default=[1, 2, 4, 8])
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
@@ -0,0 +1,70 @@
+"""
+Benchmark of content streaming: chunks emitted and CPU time per 1k-token answer,
+direct `append_content` per delta vs `BufferedContentWriter`.
+
+Run: python -m benchmarks.bench_streaming
+"""
+import asyncio
+import json
+import random
+import time
+
+from task.utils.stream_buffer import BufferedContentWriter
+
+TOKENS = 1000
+RUNS = 50
+
+
+class _SseSink:
+    """Imitates SSE chunk framing done by aidial_sdk for each `append_content` call."""
+
+    def __init__(self):
+        self.chunks = 0
+        self.bytes = 0
+
+    def append_content(self, content: str) -> None:
+        chunk = json.dumps({"choices": [{"index": 0, "delta": {"content": content}}], "object": "chat.completion.chunk"})
+        self.chunks += 1
+        self.bytes += len(f"data: {chunk}\n\n")
+
+
+def _deltas(seed: int) -> list[str]:
+    rnd = random.Random(seed)
+    return [rnd.choice(["the", " agent", " memory", ",", " tool", " result", ".", "\n", " of", " a"]) for _ in range(TOKENS)]
+
+
+async def _run(buffered: bool, token_interval: float) -> dict:
+    chunks, cpu = 0, 0.0
+    for run in range(RUNS):
+        deltas = _deltas(run)
+        sink = _SseSink()
+        started = time.process_time()
+        if buffered:
+            with BufferedContentWriter(sink) as writer:
+                for delta in deltas:
+                    writer.append_content(delta)
+                    if token_interval:
+                        await asyncio.sleep(token_interval)
+        else:
+            for delta in deltas:
+                sink.append_content(delta)
+                if token_interval:
+                    await asyncio.sleep(token_interval)
+        cpu += time.process_time() - started
+        chunks += sink.chunks
+    return {
+        "mode": "buffered" if buffered else "direct",
+        "token_interval_ms": token_interval * 1000,
+        "chunks_per_answer": chunks / RUNS,
+        "cpu_ms_per_answer": cpu / RUNS * 1000,
+    }
+
+
+async def main():
+    for token_interval in (0.0, 0.001):
+        for buffered in (False, True):
+            print(json.dumps(await _run(buffered, token_interval)))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
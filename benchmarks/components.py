@@ -0,0 +1,374 @@
+"""
+Offline microbenchmarks of CPU-heavy components on synthetic data.
+
+Covers:
+- `LongTermMemoryStore` add/search/dedup (network I/O replaced with in-memory collection)
+- `MemoryCollection` JSON (de)serialization
+- `RagTool` chunking + embedding + FAISS search
+- `DialFileContentExtractor` PDF/CSV/HTML extraction, lazy CSV first page (`CsvDocument`)
+- `unpack_messages` / `HistoryUnpacker` on long histories
+
+Results are JSON (one record per benchmark) and can be compared between commits:
+    python -m benchmarks.components --output before.json
+    python -m benchmarks.components --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+from datetime import datetime, UTC
+from typing import Any, Callable, Iterator
+
+import numpy as np
+
+EMBEDDING_DIM = 384
+
+_WORDS = ("agent memory document search tool user preference python paris weather report revenue quarter "
+          "contract policy section clause model embedding index vector answer question context").split()
+
+
+def _measure(fn: Callable[[], Any], repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return {"min_s": min(timings), "median_s": statistics.median(timings), "runs": repeat}
+
+
+def _record(name: str, params: dict[str, Any], **values) -> dict[str, Any]:
+    return {"benchmark": name, "params": params, **values}
+
+
+def _text(rnd: random.Random, words: int) -> str:
+    return " ".join(rnd.choice(_WORDS) for _ in range(words))
+
+
+def _page_text(rnd: random.Random, page: int) -> str:
+    paragraphs = [f"Section {page}.{i}. " + _text(rnd, 90) + "." for i in range(5)]
+    return "\n\n".join(paragraphs)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Memory
+# ----------------------------------------------------------------------------------------------------------------------
+
+def _synthetic_memories(count: int, seed: int = 0):
+    from task.tools.memory._models import Memory, MemoryData
+
+    rnd = np.random.default_rng(seed)
+    # ~20% of memories are near-duplicates of other ones, so deduplication has work to do
+    base = rnd.normal(size=(max(1, int(count * 0.8)), EMBEDDING_DIM)).astype('float32')
+    picks = rnd.integers(0, len(base), size=count)
+    embeddings = base[picks] + rnd.normal(scale=0.05, size=(count, EMBEDDING_DIM)).astype('float32')
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+    return [
+        Memory(
+            data=MemoryData(
+                id=i,
+                content=f"User fact #{i}",
+                importance=float(rnd.random()),
+                category="general",
+                topics=["synthetic"],
+            ),
+            embedding=embeddings[i].tolist(),
+        )
+        for i in range(count)
+    ]
+
+
+def bench_memory_collection_json(sizes: list[int], repeat: int) -> Iterator[dict]:
+    from task.tools.memory._models import MemoryCollection
+
+    for size in sizes:
+        collection = MemoryCollection(memories=_synthetic_memories(size))
+        data = collection.model_dump_json()
+        yield _record("memory_collection.dump_json", {"memories": size}, bytes=len(data),
+                      **_measure(collection.model_dump_json, repeat))
+        yield _record("memory_collection.validate_json", {"memories": size},
+                      **_measure(lambda: MemoryCollection.model_validate_json(data), repeat))
+
+
+def bench_memory_store(sizes: list[int], repeat: int) -> Iterator[dict]:
+    from task.tools.memory._models import MemoryCollection
+    from task.tools.memory.memory_store import LongTermMemoryStore
+
+    try:
+        store = LongTermMemoryStore(endpoint="http://localhost:8080")
+    except NotImplementedError:
+        yield _record("memory_store", {}, skipped="LongTermMemoryStore is not implemented")
+        return
+
+    loop = asyncio.new_event_loop()
+    try:
+        for size in sizes:
+            memories = _synthetic_memories(size)
+            collection = MemoryCollection(memories=list(memories), last_deduplicated_at=datetime.now(UTC))
+
+            async def _load(api_key: str) -> MemoryCollection:
+                return collection
+
+            async def _save(api_key: str, memories: MemoryCollection) -> None:
+                pass
+
+            # Offline: DIAL bucket I/O is replaced with in-memory collection
+            store._load_memories = _load
+            store._save_memories = _save
+
+            params = {"memories": size}
+            yield _record("memory_store.add_memory", params, **_measure(
+                lambda: loop.run_until_complete(
+                    store.add_memory("key", "User lives in Paris", 0.8, "personal_info", ["location"])
+                ),
+                repeat,
+            ))
+            yield _record("memory_store.search_memories", params, **_measure(
+                lambda: loop.run_until_complete(store.search_memories("key", "Where does user live?", top_k=5)),
+                repeat,
+            ))
+            yield _record("memory_store.deduplicate_fast", params,
+                          **_measure(lambda: store._deduplicate_fast(list(memories)), repeat))
+    finally:
+        loop.close()
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# RAG
+# ----------------------------------------------------------------------------------------------------------------------
+
+def bench_rag_indexing(pages: list[int], repeat: int) -> Iterator[dict]:
+    import faiss
+
+    from task.tools.rag.document_cache import DocumentCache
+    from task.tools.rag.rag_tool import RagTool
+
+    rag_tool = RagTool(endpoint="http://localhost:8080", deployment_name="gpt-4o", document_cache=DocumentCache())
+    rnd = random.Random(0)
+    query = rag_tool.model.encode(["What is the revenue in the last quarter?"]).astype('float32')
+
+    for page_count in pages:
+        text = "\n\n".join(_page_text(rnd, page) for page in range(page_count))
+        params = {"pages": page_count, "chars": len(text)}
+
+        chunks = rag_tool.chunker.split_text(text)
+        yield _record("rag.split", params, chunks=len(chunks),
+                      **_measure(lambda: rag_tool.chunker.split_text(text), repeat))
+
+        embeddings = np.array(rag_tool.model.encode(chunks)).astype('float32')
+        yield _record("rag.encode", params, chunks=len(chunks),
+                      **_measure(lambda: rag_tool.model.encode(chunks), max(1, repeat // 3)))
+
+        def _build() -> Any:
+            index = faiss.IndexFlatL2(EMBEDDING_DIM)
+            index.add(embeddings)
+            return index
+
+        index = _build()
+        yield _record("rag.index_build", params, **_measure(_build, repeat))
+        yield _record("rag.search", params,
+                      **_measure(lambda: index.search(query, min(3, len(chunks))), repeat * 10))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Extraction
+# ----------------------------------------------------------------------------------------------------------------------
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(page_texts: list[str]) -> bytes:
+    """Minimal text-only PDF (Helvetica, one text object per page) without extra dependencies."""
+    objects: list[bytes] = []
+    page_count = len(page_texts)
+    font_id = 3 + 2 * page_count
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(page_count))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+
+    for i, page_text in enumerate(page_texts):
+        lines = []
+        for paragraph in page_text.split("\n"):
+            words = paragraph.split()
+            while words:
+                lines.append(" ".join(words[:14]))
+                words = words[14:]
+        operations = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        operations += [f"({_pdf_escape(line)}) Tj T*" for line in lines[:70]]
+        operations.append("ET")
+        stream = "\n".join(operations).encode("latin-1", errors="ignore")
+
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return output.getvalue()
+
+
+def make_csv(rows: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    lines = ["id,name,category,amount,comment"]
+    for i in range(rows):
+        lines.append(f"{i},{rnd.choice(_WORDS)},{rnd.choice(_WORDS)},{rnd.random() * 1000:.2f},{_text(rnd, 8)}")
+    return ("\n".join(lines) + "\n").encode('utf-8')
+
+
+def make_html(sections: int, seed: int = 0) -> bytes:
+    rnd = random.Random(seed)
+    body = "".join(
+        f"<h2>Section {i}</h2><p>{_text(rnd, 80)}</p><script>var x = {i};</script><ul><li>{_text(rnd, 6)}</li></ul>"
+        for i in range(sections)
+    )
+    return f"<html><head><style>p {{}}</style></head><body>{body}</body></html>".encode('utf-8')
+
+
+def bench_extraction(pdf_pages: list[int], csv_rows: list[int], html_sections: list[int],
+                     repeat: int) -> Iterator[dict]:
+    from task.utils.csv_document import CsvDocument
+    from task.utils.dial_file_conent_extractor import _extract_pages
+
+    # Only parsing is measured (what an extraction worker runs), no DIAL client and process pool are needed
+    def extract(content: bytes, file_extension: str, filename: str) -> str:
+        return '\n\n'.join(page for page in _extract_pages(content, file_extension, filename) if page)
+
+    rnd = random.Random(0)
+
+    for page_count in pdf_pages:
+        pdf = make_pdf([_page_text(rnd, page) for page in range(page_count)])
+        yield _record("extract.pdf", {"pages": page_count, "bytes": len(pdf)},
+                      **_measure(lambda: extract(pdf, '.pdf', 'bench.pdf'), max(1, repeat // 3)))
+
+    for rows in csv_rows:
+        csv = make_csv(rows)
+        yield _record("extract.csv", {"rows": rows, "bytes": len(csv)},
+                      **_measure(lambda: extract(csv, '.csv', 'bench.csv'), max(1, repeat // 3)))
+        # FileContentExtractionTool path: offset index + markdown of the first page only
+        yield _record("extract.csv_first_page", {"rows": rows, "bytes": len(csv)},
+                      **_measure(lambda: CsvDocument.build('bench.csv', '', csv).window(0, 10_000),
+                                 max(1, repeat // 3)))
+
+    for sections in html_sections:
+        html = make_html(sections)
+        yield _record("extract.html", {"sections": sections, "bytes": len(html)},
+                      **_measure(lambda: extract(html, '.html', 'bench.html'), repeat))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# History
+# ----------------------------------------------------------------------------------------------------------------------
+
+def bench_history(turns: list[int], repeat: int) -> Iterator[dict]:
+    from benchmarks.bench_history import build_conversation
+    from task.utils.history import HistoryUnpacker, unpack_messages
+
+    for turn_count in turns:
+        messages = build_conversation(turn_count)
+        yield _record("history.unpack_messages", {"turns": turn_count},
+                      **_measure(lambda: unpack_messages(messages, []), repeat))
+        unpacker = HistoryUnpacker()
+        state_history: list[dict] = []
+        unpacker.unpack(messages, state_history)
+
+        def _next_round() -> None:
+            state_history.append({"role": "tool", "content": "result", "tool_call_id": "call"})
+            unpacker.unpack(messages, state_history)
+
+        yield _record("history.unpacker_next_round", {"turns": turn_count}, **_measure(_next_round, repeat))
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+
+SUITES = {
+    "memory_json": lambda args: bench_memory_collection_json(args.memories, args.repeat),
+    "memory_store": lambda args: bench_memory_store(args.memories, args.repeat),
+    "rag": lambda args: bench_rag_indexing(args.pages, args.repeat),
+    "extraction": lambda args: bench_extraction(args.pdf_pages, args.csv_rows, args.html_sections, args.repeat),
+    "history": lambda args: bench_history(args.turns, args.repeat),
+}
+
+
+def _environment() -> dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {"commit": commit, "python": platform.python_version(), "machine": platform.machine(),
+            "timestamp": datetime.now(UTC).isoformat()}
+
+
+def _compare(results: list[dict], baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    def _key(record: dict) -> str:
+        return f"{record['benchmark']} {json.dumps(record['params'], sort_keys=True)}"
+
+    baseline_by_key = {_key(record): record for record in baseline["results"] if "min_s" in record}
+    print(f"{'benchmark':<70} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for record in results:
+        old = baseline_by_key.get(_key(record))
+        if old is None or "min_s" not in record:
+            continue
+        ratio = record["min_s"] / old["min_s"] if old["min_s"] else float('nan')
+        print(f"{_key(record):<70} {old['min_s'] * 1000:>9.2f}ms {record['min_s'] * 1000:>9.2f}ms {ratio:>6.2f}x")
+
+
+def _int_list(value: str) -> list[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suites", default=",".join(SUITES), help=f"Comma-separated suites: {', '.join(SUITES)}")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--memories", type=_int_list, default=[1_000, 10_000, 100_000])
+    parser.add_argument("--pages", type=_int_list, default=[10, 100, 500])
+    parser.add_argument("--pdf-pages", type=_int_list, default=[10, 100])
+    parser.add_argument("--csv-rows", type=_int_list, default=[1_000, 50_000])
+    parser.add_argument("--html-sections", type=_int_list, default=[100, 2_000])
+    parser.add_argument("--turns", type=_int_list, default=[50, 200])
+    parser.add_argument("--output", help="Write results as JSON to the file")
+    parser.add_argument("--compare", help="Baseline JSON produced with --output to compare with")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = _parse_args()
+    results: list[dict] = []
+    for suite in args.suites.split(","):
+        for record in SUITES[suite](args):
+            print(json.dumps(record), flush=True)
+            results.append(record)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"environment": _environment(), "results": results}, f, indent=2)
+
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
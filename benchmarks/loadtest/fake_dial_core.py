@@ -0,0 +1,162 @@
+"""
+Fake DIAL Core for load tests.
+
+- Chat completions stream scripted tool calls (requests with `tools`) and answers at configurable token rate
+- Files API: download of synthetic documents, upload, metadata (ETag), bucket/appdata info
+"""
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+BUCKET = "fake-bucket"
+APPDATA = f"{BUCKET}/appdata/general-purpose-agent"
+
+
+@dataclass
+class ToolCallStep:
+    name: str
+    arguments: dict
+
+
+@dataclass
+class FakeDialCoreConfig:
+    # Tool calls made by the orchestration model, one round per step, before it answers
+    tool_script: list[ToolCallStep] = field(default_factory=list)
+    answer_tokens: int = 200
+    tokens_per_second: float = 200.0
+    # Latency before the first chunk of completion
+    first_token_delay: float = 0.05
+    document_size: int = 200_000
+    # Latency of file upload
+    upload_delay: float = 0.0
+
+
+def _chunk(completion_id: str, deployment: str, delta: dict, finish_reason: str | None = None) -> str:
+    data = {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _completed_tool_rounds(messages: list[dict]) -> int:
+    """Number of assistant tool call rounds after the last user message."""
+    rounds = 0
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            break
+        if message.get("role") == "assistant" and message.get("tool_calls"):
+            rounds += 1
+    return rounds
+
+
+def _synthetic_document(size: int) -> bytes:
+    line = "The quick brown fox jumps over the lazy dog. Agents remember user preferences across conversations.\n"
+    return (line * (size // len(line) + 1))[:size].encode('utf-8')
+
+
+def create_fake_dial_core(config: FakeDialCoreConfig) -> FastAPI:
+    app = FastAPI()
+    uploaded_files: dict[str, bytes] = {}
+
+    async def _stream_answer(completion_id: str, deployment: str):
+        await asyncio.sleep(config.first_token_delay)
+        yield _chunk(completion_id, deployment, {"role": "assistant", "content": ""})
+        token_interval = 1 / config.tokens_per_second if config.tokens_per_second else 0
+        for i in range(config.answer_tokens):
+            yield _chunk(completion_id, deployment, {"content": f" token{i}"})
+            if token_interval:
+                await asyncio.sleep(token_interval)
+        yield _chunk(completion_id, deployment, {}, finish_reason="stop")
+        yield "data: [DONE]\n\n"
+
+    async def _stream_tool_call(completion_id: str, deployment: str, step: ToolCallStep):
+        await asyncio.sleep(config.first_token_delay)
+        tool_call_id = f"call_{uuid.uuid4().hex[:12]}"
+        yield _chunk(completion_id, deployment, {
+            "role": "assistant",
+            "tool_calls": [{
+                "index": 0,
+                "id": tool_call_id,
+                "type": "function",
+                "function": {"name": step.name, "arguments": ""},
+            }],
+        })
+        yield _chunk(completion_id, deployment, {
+            "tool_calls": [{"index": 0, "function": {"arguments": json.dumps(step.arguments)}}],
+        })
+        yield _chunk(completion_id, deployment, {}, finish_reason="tool_calls")
+        yield "data: [DONE]\n\n"
+
+    @app.post("/openai/deployments/{deployment}/chat/completions")
+    async def chat_completions(deployment: str, request: Request):
+        body = await request.json()
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+        tool_round = _completed_tool_rounds(body.get("messages", []))
+        if body.get("tools") and tool_round < len(config.tool_script):
+            stream = _stream_tool_call(completion_id, deployment, config.tool_script[tool_round])
+        else:
+            stream = _stream_answer(completion_id, deployment)
+
+        return StreamingResponse(stream, media_type="text/event-stream")
+
+    @app.get("/v1/bucket")
+    async def bucket():
+        return JSONResponse({"bucket": BUCKET, "appdata": APPDATA})
+
+    @app.get("/v1/files/{path:path}")
+    async def download(path: str):
+        content = uploaded_files.get(path)
+        if content is None:
+            content = _synthetic_document(config.document_size)
+        filename = path.rsplit('/', 1)[-1]
+        return Response(
+            content=content,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+
+    def _file_metadata(path: str, content: bytes) -> dict:
+        bucket, _, name = path.partition('/')
+        return {
+            "name": name.rsplit('/', 1)[-1],
+            "parentPath": name.rsplit('/', 1)[0] if '/' in name else None,
+            "bucket": bucket,
+            "url": f"files/{path}",
+            "nodeType": "ITEM",
+            "resourceType": "FILE",
+            "contentLength": len(content),
+            "etag": hashlib.md5(content).hexdigest(),
+        }
+
+    @app.get("/v1/metadata/files/{path:path}")
+    async def metadata(path: str):
+        content = uploaded_files.get(path)
+        if content is None:
+            content = _synthetic_document(config.document_size)
+        return JSONResponse(_file_metadata(path, content))
+
+    @app.put("/v1/files/{path:path}")
+    async def upload(path: str, request: Request):
+        form = await request.form()
+        file = form.get("file")
+        uploaded_files[path] = await file.read() if file is not None else await request.body()
+        await asyncio.sleep(config.upload_delay)
+        return JSONResponse(_file_metadata(path, uploaded_files[path]))
+
+    @app.delete("/v1/files/{path:path}")
+    async def delete(path: str):
+        uploaded_files.pop(path, None)
+        return Response(status_code=200)
+
+    return app
@@ -0,0 +1,80 @@
+"""
+Fake MCP servers (streamable HTTP) for load tests:
+- Python interpreter with `execute_code` tool
+- Web search with `search` and `fetch_content` tools
+"""
+import asyncio
+import json
+import os
+import uuid
+
+from mcp.server.fastmcp import FastMCP
+
+
+def create_fake_interpreter_server(
+        execution_delay: float = 0.05,
+        session_startup_delay: float = 0.5,
+        files_per_call: int = 0,
+        file_size: int = 100_000,
+        resource_delay: float = 0.05,
+) -> FastMCP:
+    """
+    `session_startup_delay` imitates kernel startup for calls without `session_id`. Every call produces
+    `files_per_call` PNG files of `file_size` random bytes, served as `files://` resources after `resource_delay`.
+    """
+    mcp = FastMCP("fake-python-interpreter")
+    sessions: set[str] = set()
+    files: dict[str, bytes] = {}
+
+    @mcp.resource("files://{file_id}", mime_type="image/png")
+    async def get_file(file_id: str) -> bytes:
+        await asyncio.sleep(resource_delay)
+        return files.pop(file_id)
+
+    @mcp.tool()
+    async def execute_code(code: str, session_id: str | None = None) -> str:
+        """Executes Python code in a stateful Jupyter kernel. Pass `session_id` to reuse the kernel."""
+        if not session_id or session_id not in sessions:
+            await asyncio.sleep(session_startup_delay)
+            session_id = uuid.uuid4().hex
+            sessions.add(session_id)
+        await asyncio.sleep(execution_delay)
+        file_references = []
+        for i in range(files_per_call):
+            file_id = uuid.uuid4().hex
+            files[file_id] = os.urandom(file_size)
+            file_references.append(
+                {"uri": f"files://{file_id}", "mime_type": "image/png", "name": f"chart_{i}.png", "size": file_size}
+            )
+        return json.dumps({
+            "success": True,
+            "output": [f"executed {len(code)} chars"],
+            "result": None,
+            "error": None,
+            "traceback": [],
+            "files": file_references,
+            "session_info": {"session_id": session_id, "instructions": "Reuse session_id for next calls"},
+        })
+
+    return mcp
+
+
+def create_fake_search_server(search_delay: float = 0.1) -> FastMCP:
+    mcp = FastMCP("fake-ddg-search")
+
+    @mcp.tool()
+    async def search(query: str, max_results: int = 10) -> str:
+        """Searches the web with DuckDuckGo."""
+        await asyncio.sleep(search_delay)
+        return "\n".join(
+            f"{i + 1}. Result for {query}\n   URL: https://example.com/{i}\n   Summary: lorem ipsum dolor sit amet"
+            for i in range(max_results)
+        )
+
+    @mcp.tool()
+    async def fetch_content(url: str) -> str:
+        """Fetches and parses content of the web page."""
+        await asyncio.sleep(search_delay)
+        return f"Content of {url}: " + "lorem ipsum " * 500
+
+    return mcp
@@ -0,0 +1,148 @@
+"""
+Load test of file handling in `PythonCodeInterpreterTool`: every `execute_code` call of local fake interpreter MCP
+server produces `--files` files, the tool fetches them as MCP resources and uploads them to local fake DIAL Core.
+Fake servers run in a child process, so the event loop of the tool only does the tool work.
+
+Reports duration of tool calls and the longest event loop stall seen by a ticker task meanwhile (blocking work on
+the event loop stalls all other requests of the worker).
+
+Run: python -m benchmarks.loadtest.interpreter_files --files 10 --file-size 500000 --calls 4
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+from types import SimpleNamespace
+
+import uvicorn
+
+from benchmarks.loadtest.fake_dial_core import FakeDialCoreConfig, create_fake_dial_core
+from benchmarks.loadtest.fake_mcp_servers import create_fake_interpreter_server
+from benchmarks.loadtest.run import _summary
+from task.tools.models import ToolCallParams
+from task.tools.py_interpreter.python_code_interpreter_tool import PythonCodeInterpreterTool
+
+
+class _Collector:
+    """Stands in for stage and choice, collects content and attachments."""
+
+    def __init__(self):
+        self.content = []
+        self.attachments = []
+
+    def append_content(self, content: str) -> None:
+        self.content.append(content)
+
+    def add_attachment(self, attachment) -> None:
+        self.attachments.append(attachment)
+
+
+async def _serve(app, port: int) -> None:
+    await uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")).serve()
+
+
+def _run_servers(args: argparse.Namespace) -> None:
+    interpreter = create_fake_interpreter_server(
+        session_startup_delay=0,
+        files_per_call=args.files,
+        file_size=args.file_size,
+        resource_delay=args.resource_delay,
+    )
+
+    async def _serve_all() -> None:
+        await asyncio.gather(
+            _serve(create_fake_dial_core(FakeDialCoreConfig(upload_delay=args.upload_delay)), args.dial_port),
+            _serve(interpreter.streamable_http_app(), args.interpreter_port),
+        )
+
+    asyncio.run(_serve_all())
+
+
+async def _create_tool(args: argparse.Namespace) -> PythonCodeInterpreterTool:
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            return await PythonCodeInterpreterTool.create(
+                mcp_url=f"http://127.0.0.1:{args.interpreter_port}/mcp",
+                tool_name="execute_code",
+                dial_endpoint=f"http://127.0.0.1:{args.dial_port}",
+                max_concurrent_files=args.max_concurrent_files,
+                pool_size=args.pool_size,
+            )
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def _ticker(stalls: list[float], done: asyncio.Event, interval: float = 0.005) -> None:
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(time.perf_counter() - started - interval)
+
+
+async def _call(tool: PythonCodeInterpreterTool, number: int) -> tuple[float, int]:
+    collector = _Collector()
+    params = ToolCallParams(
+        tool_call=SimpleNamespace(
+            id=f"call_{number}",
+            function=SimpleNamespace(name="execute_code", arguments=json.dumps({"code": "plot()"})),
+        ),
+        stage=collector,
+        choice=collector,
+        api_key=f"key-{number % 2}",
+        conversation_id=f"conversation-{number}",
+    )
+    started = time.perf_counter()
+    await tool._execute(params)
+    return time.perf_counter() - started, len(collector.attachments) // 2
+
+
+async def main(args: argparse.Namespace) -> None:
+    tool = await _create_tool(args)
+
+    stalls: list[float] = []
+    done = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(stalls, done))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(_call(tool, number) for number in range(args.calls)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+
+    print(json.dumps({
+        "calls": args.calls,
+        "files_per_call": args.files,
+        "file_size": args.file_size,
+        "max_concurrent_files": args.max_concurrent_files,
+        "uploaded_files": sum(uploaded for _, uploaded in results),
+        "elapsed_s": round(elapsed, 3),
+        "call_s": {key: round(value, 3) for key, value in _summary([duration for duration, _ in results]).items()},
+        "max_event_loop_stall_s": round(max(stalls), 3),
+    }))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=4)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--file-size", type=int, default=500_000)
+    parser.add_argument("--resource-delay", type=float, default=0.05)
+    parser.add_argument("--upload-delay", type=float, default=0.2)
+    parser.add_argument("--max-concurrent-files", type=int, default=4)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--dial-port", type=int, default=18081)
+    parser.add_argument("--interpreter-port", type=int, default=18052)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    servers = multiprocessing.Process(target=_run_servers, args=(arguments,), daemon=True)
+    servers.start()
+    try:
+        asyncio.run(main(arguments))
+    finally:
+        servers.terminate()
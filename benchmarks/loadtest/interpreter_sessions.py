@@ -0,0 +1,127 @@
+"""
+Load test of interpreter sessions of `PythonCodeInterpreterTool`: conversations call `execute_code` without
+`session_id` (as the model often does) on local fake interpreter MCP server, which imitates kernel startup with
+`--session-startup-delay` for calls without known session.
+
+Runs the same conversations without and with `--warm-sessions` and reports latency of the first call of
+a conversation and of the next ones. Conversations start every `--arrival-interval` seconds, there are
+`--think-time` seconds between turns. Fake server runs in a child process.
+
+Run: python -m benchmarks.loadtest.interpreter_sessions --conversations 20 --turns 3 --warm-sessions 2
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import time
+import uuid
+from types import SimpleNamespace
+
+from benchmarks.loadtest.fake_mcp_servers import create_fake_interpreter_server
+from benchmarks.loadtest.interpreter_files import _Collector, _serve
+from benchmarks.loadtest.run import _summary
+from task.tools.models import ToolCallParams
+from task.tools.py_interpreter.python_code_interpreter_tool import PythonCodeInterpreterTool
+
+
+def _run_server(args: argparse.Namespace) -> None:
+    interpreter = create_fake_interpreter_server(session_startup_delay=args.session_startup_delay)
+    asyncio.run(_serve(interpreter.streamable_http_app(), args.port))
+
+
+async def _create_tool(args: argparse.Namespace, warm_sessions: int) -> PythonCodeInterpreterTool:
+    deadline = time.monotonic() + 10
+    while True:
+        try:
+            return await PythonCodeInterpreterTool.create(
+                mcp_url=f"http://127.0.0.1:{args.port}/mcp",
+                tool_name="execute_code",
+                dial_endpoint="http://127.0.0.1:1",
+                warm_sessions=warm_sessions,
+                pool_size=args.pool_size,
+            )
+        except Exception:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def _conversation(
+        tool: PythonCodeInterpreterTool,
+        args: argparse.Namespace,
+        first_calls: list[float],
+        next_calls: list[float],
+        sessions: list[set[str]],
+) -> None:
+    conversation_id = uuid.uuid4().hex
+    used_sessions = set()
+    for turn in range(args.turns):
+        collector = _Collector()
+        params = ToolCallParams(
+            tool_call=SimpleNamespace(
+                id=f"call_{turn}",
+                function=SimpleNamespace(name="execute_code", arguments=json.dumps({"code": "print(df.head())"})),
+            ),
+            stage=collector,
+            choice=collector,
+            api_key="load-test",
+            conversation_id=conversation_id,
+        )
+        started = time.perf_counter()
+        result = json.loads(await tool._execute(params))
+        (first_calls if turn == 0 else next_calls).append(time.perf_counter() - started)
+        used_sessions.add(result["session_info"]["session_id"])
+        await asyncio.sleep(args.think_time)
+    sessions.append(used_sessions)
+
+
+async def _run(args: argparse.Namespace, warm_sessions: int) -> dict:
+    tool = await _create_tool(args, warm_sessions)
+    # Let the pool warm up, like between application startup and the first conversations
+    await asyncio.sleep(args.session_startup_delay * 2)
+
+    first_calls: list[float] = []
+    next_calls: list[float] = []
+    sessions: list[set[str]] = []
+    conversations = []
+    for _ in range(args.conversations):
+        conversations.append(asyncio.create_task(_conversation(tool, args, first_calls, next_calls, sessions)))
+        await asyncio.sleep(args.arrival_interval)
+    await asyncio.gather(*conversations)
+
+    return {
+        "warm_sessions": warm_sessions,
+        "conversations": args.conversations,
+        "turns": args.turns,
+        "first_call_s": {key: round(value, 3) for key, value in _summary(first_calls).items()},
+        "next_calls_s": {key: round(value, 3) for key, value in _summary(next_calls).items()},
+        "sessions_per_conversation": round(sum(map(len, sessions)) / len(sessions), 2),
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    for warm_sessions in (0, args.warm_sessions):
+        print(json.dumps(await _run(args, warm_sessions)))
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--warm-sessions", type=int, default=2)
+    parser.add_argument("--session-startup-delay", type=float, default=0.5)
+    parser.add_argument("--arrival-interval", type=float, default=0.3)
+    parser.add_argument("--think-time", type=float, default=0.5)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--port", type=int, default=18053)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = _parse_args()
+    server = multiprocessing.Process(target=_run_server, args=(arguments,), daemon=True)
+    server.start()
+    try:
+        asyncio.run(main(arguments))
+    finally:
+        server.terminate()
@@ -0,0 +1,130 @@
+"""
+Load test of `MCPClientPool` against local fake search MCP server (streamable HTTP), compared with single
+`MCPClient` session.
+
+Concurrent callers invoke `search` for `--duration` seconds. With `--restart-after` the fake server is stopped
+and started again on the same port in the middle of the run, imitating MCP container restart: the single
+session stays broken, the pool reconnects.
+
+Run: python -m benchmarks.loadtest.mcp_pool --concurrency 32 --duration 10 --restart-after 4
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import uvicorn
+
+from benchmarks.loadtest.fake_mcp_servers import create_fake_search_server
+from benchmarks.loadtest.run import _summary
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
+
+
+async def _caller(client, deadline: float, latencies: list[float], errors: list[str]) -> None:
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(client.call_tool("search", {"query": "weather", "max_results": 3}), 10)
+            latencies.append(time.perf_counter() - started)
+        except Exception as e:
+            errors.append(repr(e))
+            await asyncio.sleep(0.1)
+
+
+async def _start_server(args: argparse.Namespace) -> tuple[uvicorn.Server, asyncio.Task]:
+    app = create_fake_search_server(args.search_delay).streamable_http_app()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server, task
+
+
+async def _stop_server(server: tuple[uvicorn.Server, asyncio.Task]) -> None:
+    # Open SSE streams of MCP sessions would delay graceful shutdown, connections are dropped like on crash
+    server[0].should_exit = server[0].force_exit = True
+    await asyncio.gather(server[1], return_exceptions=True)
+
+
+async def _restart_server(server, args: argparse.Namespace):
+    await asyncio.sleep(args.restart_after)
+    await _stop_server(server)
+    await asyncio.sleep(args.downtime)
+    return await _start_server(args)
+
+
+async def _run(name: str, client, args: argparse.Namespace, server) -> tuple[dict, object]:
+    latencies: list[float] = []
+    errors: list[str] = []
+    deadline = time.monotonic() + args.duration
+    restart = None
+    if args.restart_after:
+        restart = asyncio.create_task(_restart_server(server, args))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(_caller(client, deadline, latencies, errors) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    if restart is not None:
+        server = await restart
+
+    return {
+        "client": name,
+        "concurrency": args.concurrency,
+        "calls": len(latencies),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "calls_per_s": round(len(latencies) / elapsed, 1),
+        "latency_s": {key: round(value, 4) if value is not None else None
+                      for key, value in _summary(latencies).items()},
+    }, server
+
+
+async def main(args: argparse.Namespace) -> None:
+    server = await _start_server(args)
+    url = f"http://127.0.0.1:{args.port}/mcp"
+
+    # Single session is owned by separate task: its transport failure cancels the owner task, not this one
+    ready, done = asyncio.get_running_loop().create_future(), asyncio.Event()
+
+    async def _own_single() -> None:
+        async with MCPClient(url) as client:
+            ready.set_result(client)
+            await done.wait()
+
+    owner = asyncio.create_task(_own_single())
+    report, server = await _run("single_session", await ready, args, server)
+    print(json.dumps(report))
+    done.set()
+    await asyncio.gather(owner, return_exceptions=True)
+
+    pool = await MCPClientPool.create(
+        url,
+        size=args.pool_size,
+        max_in_flight=args.max_in_flight,
+        health_check_interval=args.health_check_interval,
+    )
+    report, server = await _run("pool", pool, args, server)
+    report["pool_size"] = args.pool_size
+    report["sessions"] = pool.stats()
+    print(json.dumps(report))
+    await pool.close()
+    await _stop_server(server)
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--restart-after", type=float, default=4, help="0 disables server restart")
+    parser.add_argument("--downtime", type=float, default=1)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--max-in-flight", type=int, default=8)
+    parser.add_argument("--health-check-interval", type=float, default=2)
+    parser.add_argument("--search-delay", type=float, default=0.05)
+    parser.add_argument("--port", type=int, default=8061)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(_parse_args()))
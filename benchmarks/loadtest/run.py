@@ -0,0 +1,217 @@
+"""
+End-to-end load test of GeneralPurposeAgentApplication against local stand-ins of DIAL Core and MCP servers.
+
+Starts fake DIAL Core and fake MCP servers in this process, runs `task.app` in a subprocess pointed at them,
+drives concurrent conversations and prints JSON report with p50/p95/p99 turn latency, time-to-first-token
+and requests per second.
+
+Run: python -m benchmarks.loadtest.run --conversations 20 --turns 3 --tool-script search,execute_code
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import httpx
+import uvicorn
+
+from benchmarks.loadtest.fake_dial_core import FakeDialCoreConfig, ToolCallStep, create_fake_dial_core
+from benchmarks.loadtest.fake_mcp_servers import create_fake_interpreter_server, create_fake_search_server
+
+DOCUMENT_URL = "files/fake-bucket/documents/report.txt"
+
+TOOL_STEPS = {
+    "search": ToolCallStep("search", {"query": "weather in Paris"}),
+    "fetch_content": ToolCallStep("fetch_content", {"url": "https://example.com/0"}),
+    "execute_code": ToolCallStep("execute_code", {"code": "import math\nprint(math.pi)"}),
+    "rag_tool": ToolCallStep("rag_tool", {"request": "What does the fox do?", "file_urls": [DOCUMENT_URL]}),
+    "file_content_extraction_tool": ToolCallStep("file_content_extraction_tool", {"file_url": DOCUMENT_URL, "page": 1}),
+}
+
+
+def _percentile(values: list[float], percent: float) -> float | None:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percent / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(values: list[float]) -> dict[str, float | None]:
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "p99": _percentile(values, 99),
+        "max": max(values) if values else None,
+    }
+
+
+async def _serve(app, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+    return server
+
+
+async def _wait_ready(url: str, process: subprocess.Popen, timeout: float) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"Application exited with code {process.returncode}")
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise TimeoutError(f"Application is not ready after {timeout}s")
+
+
+async def _run_turn(client: httpx.AsyncClient, url: str, conversation_id: str, messages: list[dict]) -> dict:
+    started = time.perf_counter()
+    first_token_at = None
+    content = ''
+    state = None
+
+    async with client.stream(
+            "POST",
+            url,
+            json={"messages": messages, "stream": True},
+            headers={"api-key": "load-test", "x-conversation-id": conversation_id},
+    ) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.startswith("data: ") or line == "data: [DONE]":
+                continue
+            chunk = json.loads(line[len("data: "):])
+            for choice in chunk.get("choices", []):
+                delta = choice.get("delta") or {}
+                if delta.get("content"):
+                    if first_token_at is None:
+                        first_token_at = time.perf_counter()
+                    content += delta["content"]
+                custom_content = delta.get("custom_content") or {}
+                if custom_content.get("state") is not None:
+                    state = custom_content["state"]
+
+    finished = time.perf_counter()
+    return {
+        "latency": finished - started,
+        "ttft": (first_token_at - started) if first_token_at else None,
+        "content": content,
+        "state": state,
+    }
+
+
+async def _run_conversation(client: httpx.AsyncClient, url: str, turns: int, results: list[dict], errors: list[str]):
+    conversation_id = uuid.uuid4().hex
+    messages: list[dict] = []
+    for turn in range(turns):
+        messages.append({"role": "user", "content": f"Question #{turn}: what is the weather and pi?"})
+        try:
+            result = await _run_turn(client, url, conversation_id, messages)
+        except Exception as e:
+            errors.append(str(e))
+            return
+        results.append(result)
+        assistant_message = {"role": "assistant", "content": result["content"]}
+        if result["state"] is not None:
+            assistant_message["custom_content"] = {"state": result["state"]}
+        messages.append(assistant_message)
+
+
+async def main(args: argparse.Namespace) -> dict:
+    dial_config = FakeDialCoreConfig(
+        tool_script=[TOOL_STEPS[name] for name in args.tool_script.split(",") if name],
+        answer_tokens=args.answer_tokens,
+        tokens_per_second=args.tokens_per_second,
+        first_token_delay=args.first_token_delay,
+    )
+    servers = [
+        await _serve(create_fake_dial_core(dial_config), args.dial_port),
+        await _serve(create_fake_interpreter_server().streamable_http_app(), args.interpreter_port),
+        await _serve(create_fake_search_server().streamable_http_app(), args.search_port),
+    ]
+
+    env = {
+        **os.environ,
+        "DIAL_ENDPOINT": f"http://127.0.0.1:{args.dial_port}",
+        "PYTHON_INTERPRETER_MCP_URL": f"http://127.0.0.1:{args.interpreter_port}/mcp",
+        "DDG_MCP_URL": f"http://127.0.0.1:{args.search_port}/mcp",
+        "PORT": str(args.app_port),
+        "WORKERS": str(args.workers),
+    }
+    app_process = subprocess.Popen(
+        [sys.executable, "-m", "task.app"],
+        env=env,
+        stdout=subprocess.DEVNULL if not args.app_logs else None,
+        stderr=subprocess.STDOUT if not args.app_logs else None,
+    )
+    try:
+        app_url = f"http://127.0.0.1:{args.app_port}"
+        await _wait_ready(f"{app_url}/health", app_process, args.startup_timeout)
+
+        completion_url = f"{app_url}/openai/deployments/general-purpose-agent/chat/completions"
+        results: list[dict] = []
+        errors: list[str] = []
+        async with httpx.AsyncClient(timeout=args.request_timeout, limits=httpx.Limits(max_connections=None)) as client:
+            # Warm-up: tools are created lazily on the first request
+            await _run_conversation(client, completion_url, 1, [], [])
+
+            started = time.perf_counter()
+            await asyncio.gather(*[
+                _run_conversation(client, completion_url, args.turns, results, errors)
+                for _ in range(args.conversations)
+            ])
+            elapsed = time.perf_counter() - started
+
+        return {
+            "conversations": args.conversations,
+            "turns": args.turns,
+            "tool_script": args.tool_script,
+            "workers": args.workers,
+            "requests": len(results),
+            "errors": len(errors),
+            "elapsed_s": elapsed,
+            "rps": len(results) / elapsed if elapsed else None,
+            "turn_latency_s": _summary([result["latency"] for result in results]),
+            "ttft_s": _summary([result["ttft"] for result in results if result["ttft"] is not None]),
+        }
+    finally:
+        app_process.terminate()
+        try:
+            app_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            app_process.kill()
+        for server in servers:
+            server.should_exit = True
+
+
+def _parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", type=int, default=10, help="Number of concurrent conversations")
+    parser.add_argument("--turns", type=int, default=3, help="User turns per conversation")
+    parser.add_argument("--tool-script", default="search,execute_code",
+                        help=f"Comma-separated tool calls per turn, available: {', '.join(TOOL_STEPS)}")
+    parser.add_argument("--answer-tokens", type=int, default=200)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--first-token-delay", type=float, default=0.05)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--app-port", type=int, default=5031)
+    parser.add_argument("--dial-port", type=int, default=18080)
+    parser.add_argument("--interpreter-port", type=int, default=18050)
+    parser.add_argument("--search-port", type=int, default=18051)
+    parser.add_argument("--startup-timeout", type=float, default=120.0)
+    parser.add_argument("--request-timeout", type=float, default=300.0)
+    parser.add_argument("--app-logs", action="store_true", help="Show application output")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    print(json.dumps(asyncio.run(main(_parse_args())), indent=2))
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import time
 from typing import Any
 
 from aidial_client import AsyncDial
@@ -8,9 +9,11 @@ from aidial_sdk.chat_completion import Message, Role, Choice, Request, Response
 
 from task.tools.base import BaseTool
 from task.tools.models import ToolCallParams
-from task.utils.constants import TOOL_CALL_HISTORY_KEY
-from task.utils.history import unpack_messages
+from task.utils.constants import TOOL_CALL_HISTORY_KEY, CUSTOM_CONTENT
+from task.utils.history import HistoryUnpacker
+from task.utils.metrics import COMPLETION_DURATION, COMPLETION_TTFT, TOOL_CALL_DURATION
 from task.utils.stage import StageProcessor
+from task.utils.stream_buffer import BufferedContentWriter
 
 
 class GeneralPurposeAgent:
@@ -31,6 +34,7 @@ class GeneralPurposeAgent:
         self.state = {
             TOOL_CALL_HISTORY_KEY: []
         }
+        self._history_unpacker = HistoryUnpacker()
 
     async def handle_request(
             self, deployment_name: str, choice: Choice, request: Request, response: Response) -> Message:
@@ -42,6 +46,8 @@ class GeneralPurposeAgent:
             api_version='2025-01-01-preview'
         )
 
+        completion_started = time.perf_counter()
+        first_chunk_received = False
         chunks = await client.chat.completions.create(
             messages=self._prepare_messages(request.messages),
             tools=[tool.schema for tool in self.tools],
@@ -52,22 +58,28 @@ class GeneralPurposeAgent:
         tool_call_index_map = {}
         content = ''
         custom_content: CustomContent = CustomContent(attachments=[])
-        async for chunk in chunks:
-            if chunk.choices and len(chunk.choices) > 0:
-                delta = chunk.choices[0].delta
-                if delta and delta.content:
-                    choice.append_content(delta.content)
-                    content += delta.content
-
-                if delta.tool_calls:
-                    for tool_call_delta in delta.tool_calls:
-                        if tool_call_delta.id:
-                            tool_call_index_map[tool_call_delta.index] = tool_call_delta
-                        else:
-                            tool_call = tool_call_index_map[tool_call_delta.index]
-                            if tool_call_delta.function:
-                                argument_chunk = tool_call_delta.function.arguments or ''
-                                tool_call.function.arguments += argument_chunk
+        with BufferedContentWriter(choice) as content_writer:
+            async for chunk in chunks:
+                if not first_chunk_received:
+                    first_chunk_received = True
+                    COMPLETION_TTFT.observe(time.perf_counter() - completion_started, deployment=deployment_name)
+                if chunk.choices and len(chunk.choices) > 0:
+                    delta = chunk.choices[0].delta
+                    if delta and delta.content:
+                        content_writer.append_content(delta.content)
+                        content += delta.content
+
+                    if delta.tool_calls:
+                        for tool_call_delta in delta.tool_calls:
+                            if tool_call_delta.id:
+                                tool_call_index_map[tool_call_delta.index] = tool_call_delta
+                            else:
+                                tool_call = tool_call_index_map[tool_call_delta.index]
+                                if tool_call_delta.function:
+                                    argument_chunk = tool_call_delta.function.arguments or ''
+                                    tool_call.function.arguments += argument_chunk
+
+        COMPLETION_DURATION.observe(time.perf_counter() - completion_started, deployment=deployment_name)
 
         assistant_message = Message(
             role=Role.ASSISTANT,
@@ -88,7 +100,7 @@ class GeneralPurposeAgent:
             ]
             tool_messages = await asyncio.gather(*tasks)
 
-            self.state[TOOL_CALL_HISTORY_KEY].append(assistant_message.dict(exclude_none=True))
+            self.state[TOOL_CALL_HISTORY_KEY].append(assistant_message.dict(exclude_none=True, exclude={CUSTOM_CONTENT}))
             self.state[TOOL_CALL_HISTORY_KEY].extend(tool_messages)
 
             return await self.handle_request(
@@ -103,14 +115,13 @@ class GeneralPurposeAgent:
         return assistant_message
 
     def _prepare_messages(self, messages: list[Message]) -> list[dict[str, Any]]:
-        unpacked_messages = unpack_messages(messages, self.state[TOOL_CALL_HISTORY_KEY])
-        unpacked_messages.insert(
-            0,
+        unpacked_messages = [
             {
                 "role": Role.SYSTEM.value,
                 "content": self.system_prompt,
-            }
-        )
+            },
+            *self._history_unpacker.unpack(messages, self.state[TOOL_CALL_HISTORY_KEY]),
+        ]
 
         print("\nHistory:")
         for msg in unpacked_messages:
@@ -123,6 +134,7 @@ class GeneralPurposeAgent:
     async def _process_tool_call(self, tool_call: ToolCall, choice: Choice, api_key: str, conversation_id: str) -> dict[
         str, Any]:
         tool_name = tool_call.function.name
+        started = time.perf_counter()
         stage = StageProcessor.open_stage(
             choice,
             tool_name
@@ -147,5 +159,6 @@ class GeneralPurposeAgent:
         )
 
         StageProcessor.close_stage_safely(stage)
+        TOOL_CALL_DURATION.observe(time.perf_counter() - started, tool=tool_name)
 
-        return tool_message.dict(exclude_none=True)
+        return tool_message.dict(exclude_none=True, exclude={CUSTOM_CONTENT})
@@ -2,76 +2,186 @@ import os
 
 from aidial_sdk import DIALApp
 from aidial_sdk.chat_completion import ChatCompletion, Request, Response
+from fastapi.responses import PlainTextResponse
 
 from task.agent import GeneralPurposeAgent
 from task.prompts import SYSTEM_PROMPT
 from task.tools.base import BaseTool
 from task.tools.deployment.image_generation_tool import ImageGenerationTool
 from task.tools.files.file_content_extraction_tool import FileContentExtractionTool
-from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
 from task.tools.mcp.mcp_tool import MCPTool
+from task.tools.mcp.mcp_tool_catalog import MCPToolCatalog
 from task.tools.memory.memory_delete_tool import DeleteMemoryTool
 from task.tools.memory.memory_search_tool import SearchMemoryTool
 from task.tools.memory.memory_store import LongTermMemoryStore
 from task.tools.memory.memory_store_tool import StoreMemoryTool
 from task.tools.py_interpreter.python_code_interpreter_tool import PythonCodeInterpreterTool
+from task.tools.rag.ann_index import AnnIndexConfig
+from task.tools.rag.disk_index_store import DiskIndexStore
 from task.tools.rag.document_cache import DocumentCache
+from task.tools.rag.embedding_cache import ChunkEmbeddingCache
 from task.tools.rag.rag_tool import RagTool
+from task.tools.result_cache import ToolResultCache
+from task.utils.embeddings import EMBEDDING_MODEL_NAME, get_embedding_model
+from task.utils.extracted_text_cache import ExtractedTextCache
+from task.utils.metrics import METRICS
+from task.utils.shared_cache import SharedCache
 
 DIAL_ENDPOINT = os.getenv('DIAL_ENDPOINT', "http://localhost:8080")
 DEPLOYMENT_NAME = os.getenv('DEPLOYMENT_NAME', 'gpt-4o')
 # DEPLOYMENT_NAME = os.getenv('DEPLOYMENT_NAME', 'claude-sonnet-3-7')
+PYTHON_INTERPRETER_MCP_URL = os.getenv('PYTHON_INTERPRETER_MCP_URL', "http://localhost:8050/mcp")
+DDG_MCP_URL = os.getenv('DDG_MCP_URL', "http://localhost:8051/mcp")
+MCP_RESULT_CACHE_TTL = float(os.getenv('MCP_RESULT_CACHE_TTL', 300))
+# MCP sessions per server, concurrent calls per session and interval of session health checks (ping)
+MCP_POOL_SIZE = int(os.getenv('MCP_POOL_SIZE', 4))
+MCP_MAX_IN_FLIGHT_PER_SESSION = int(os.getenv('MCP_MAX_IN_FLIGHT_PER_SESSION', 8))
+MCP_HEALTH_CHECK_INTERVAL = float(os.getenv('MCP_HEALTH_CHECK_INTERVAL', 30))
+# Retries of MCP calls failed with transport errors (e.g. MCP server restarted), done on reconnected session
+MCP_CALL_RETRIES = int(os.getenv('MCP_CALL_RETRIES', 1))
+# Poll interval of MCP tool lists, in addition to `tools/list_changed` notifications (0 disables polling)
+MCP_TOOLS_REFRESH_INTERVAL = float(os.getenv('MCP_TOOLS_REFRESH_INTERVAL', 300))
+# Files produced by one code execution that are fetched from interpreter and uploaded to DIAL concurrently
+PY_INTERPRETER_FILE_CONCURRENCY = int(os.getenv('PY_INTERPRETER_FILE_CONCURRENCY', 4))
+# Interpreter sessions started in advance and bound to conversations (0 disables), idle time after which session of
+# conversation is released and code run in started sessions (e.g. imports of common libraries)
+PY_INTERPRETER_WARM_SESSIONS = int(os.getenv('PY_INTERPRETER_WARM_SESSIONS', 2))
+PY_INTERPRETER_SESSION_IDLE_TTL = float(os.getenv('PY_INTERPRETER_SESSION_IDLE_TTL', 30 * 60))
+PY_INTERPRETER_WARMUP_CODE = os.getenv('PY_INTERPRETER_WARMUP_CODE', 'import numpy, pandas, matplotlib.pyplot')
+# Number of worker processes, for multi-worker mode set SHARED_CACHE_URL as well (e.g. `redis://localhost:6379/0`)
+WORKERS = int(os.getenv('WORKERS', 1))
+SHARED_CACHE_URL = os.getenv('SHARED_CACHE_URL')
+# Directory of persistent RAG indexes, empty value disables disk tier
+RAG_INDEX_DIR = os.getenv('RAG_INDEX_DIR', '.cache/rag-indexes')
+RAG_INDEX_DISK_MAX_BYTES = int(os.getenv('RAG_INDEX_DISK_MAX_BYTES', 10 * 1024 * 1024 * 1024))
+# Memory budget of RAG indexes per worker and idle time after which unused index is dropped from memory
+RAG_INDEX_MEMORY_MAX_BYTES = int(os.getenv('RAG_INDEX_MEMORY_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+RAG_INDEX_IDLE_TTL = float(os.getenv('RAG_INDEX_IDLE_TTL', 24 * 60 * 60))
+# Documents with at least this number of chunks get approximate index (`ivf` or `hnsw`) instead of exact one
+RAG_ANN_MIN_CHUNKS = int(os.getenv('RAG_ANN_MIN_CHUNKS', 50_000))
+RAG_ANN_TYPE = os.getenv('RAG_ANN_TYPE', 'ivf')
+RAG_HNSW_EF_SEARCH = int(os.getenv('RAG_HNSW_EF_SEARCH', 128))
+RAG_IVF_NPROBE = int(os.getenv('RAG_IVF_NPROBE', 32))
+# Cache of chunk embeddings, empty path keeps it in memory only
+RAG_EMBEDDING_CACHE_PATH = os.getenv('RAG_EMBEDDING_CACHE_PATH', '.cache/chunk-embeddings.sqlite')
+RAG_EMBEDDING_CACHE_MAX_BYTES = int(os.getenv('RAG_EMBEDDING_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+# Default mode of RAG tool: `answer` (inner completion answers request) or `retrieve` (ranked chunks are returned)
+RAG_MODE = os.getenv('RAG_MODE', 'answer')
+RAG_RETRIEVAL_TOKEN_BUDGET = int(os.getenv('RAG_RETRIEVAL_TOKEN_BUDGET', 2_000))
+# Cache of extracted file texts shared by file content extraction and RAG tools
+EXTRACTED_TEXT_CACHE_MAX_BYTES = int(os.getenv('EXTRACTED_TEXT_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+EXTRACTED_TEXT_CACHE_TTL = float(os.getenv('EXTRACTED_TEXT_CACHE_TTL', 60 * 60))
 
 
 class GeneralPurposeAgentApplication(ChatCompletion):
 
-    def __init__(self):
+    def __init__(self, shared_cache: SharedCache | None = None):
         self.tools: list[BaseTool] = []
-        self.memory_store = LongTermMemoryStore(endpoint=DIAL_ENDPOINT)
-
-    async def _get_mcp_tools(self, url: str) -> list[BaseTool]:
+        self._static_tools: list[BaseTool] = []
+        self._mcp_catalogs: list[MCPToolCatalog] = []
+        self.shared_cache = shared_cache
+        self.tool_result_cache = ToolResultCache()
+        self.extracted_text_cache = ExtractedTextCache(
+            max_bytes=EXTRACTED_TEXT_CACHE_MAX_BYTES,
+            ttl_seconds=EXTRACTED_TEXT_CACHE_TTL,
+        )
+        self.memory_store = LongTermMemoryStore(endpoint=DIAL_ENDPOINT, shared_cache=shared_cache)
+
+    async def _get_mcp_tool_catalog(self, url: str, result_cache_ttl: float | None = None) -> MCPToolCatalog:
         try:
-            tools: list[BaseTool] = []
-            mcp_client = await MCPClient.create(url)
-            for mcp_tool_model in await mcp_client.get_tools():
-                tools.append(
-                    MCPTool(
-                        client=mcp_client,
-                        mcp_tool_model=mcp_tool_model,
-                    )
-                )
-            return tools
+            mcp_client = await MCPClientPool.create(
+                url,
+                size=MCP_POOL_SIZE,
+                max_in_flight=MCP_MAX_IN_FLIGHT_PER_SESSION,
+                health_check_interval=MCP_HEALTH_CHECK_INTERVAL,
+                retries=MCP_CALL_RETRIES,
+            )
+            return await MCPToolCatalog.create(
+                mcp_client,
+                build_tool=lambda mcp_tool_model: MCPTool(
+                    client=mcp_client,
+                    mcp_tool_model=mcp_tool_model,
+                    result_cache_ttl=result_cache_ttl,
+                ),
+                refresh_interval=MCP_TOOLS_REFRESH_INTERVAL,
+                on_change=self._update_tools,
+            )
         except Exception as e:
             print(f"Warning: Could not load MCP tools: {e}")
             raise e
 
-    async def _create_tools(self) -> list[BaseTool]:
-        tools: list[BaseTool] = [
+    async def _create_tools(self) -> None:
+        self._static_tools = [
             ImageGenerationTool(endpoint=DIAL_ENDPOINT),
-            FileContentExtractionTool(endpoint=DIAL_ENDPOINT),
+            FileContentExtractionTool(endpoint=DIAL_ENDPOINT, text_cache=self.extracted_text_cache),
             RagTool(
                 endpoint=DIAL_ENDPOINT,
                 deployment_name=DEPLOYMENT_NAME,
-                document_cache=DocumentCache.create()
+                document_cache=DocumentCache.create(
+                    shared_cache=self.shared_cache,
+                    disk_store=DiskIndexStore(RAG_INDEX_DIR, RAG_INDEX_DISK_MAX_BYTES) if RAG_INDEX_DIR else None,
+                    max_bytes=RAG_INDEX_MEMORY_MAX_BYTES,
+                    idle_ttl_seconds=RAG_INDEX_IDLE_TTL,
+                ),
+                shared_cache=self.shared_cache,
+                index_config=AnnIndexConfig(
+                    flat_max_chunks=RAG_ANN_MIN_CHUNKS,
+                    ann_type=RAG_ANN_TYPE,
+                    hnsw_ef_search=RAG_HNSW_EF_SEARCH,
+                    ivf_nprobe=RAG_IVF_NPROBE,
+                ),
+                embedding_cache=ChunkEmbeddingCache(
+                    model_name=EMBEDDING_MODEL_NAME,
+                    max_bytes=RAG_EMBEDDING_CACHE_MAX_BYTES,
+                    path=RAG_EMBEDDING_CACHE_PATH or None,
+                ),
+                text_cache=self.extracted_text_cache,
+                mode=RAG_MODE,
+                retrieval_token_budget=RAG_RETRIEVAL_TOKEN_BUDGET,
             ),
             await PythonCodeInterpreterTool.create(
-                mcp_url="http://localhost:8050/mcp",
+                mcp_url=PYTHON_INTERPRETER_MCP_URL,
                 tool_name="execute_code",
-                dial_endpoint=DIAL_ENDPOINT
+                dial_endpoint=DIAL_ENDPOINT,
+                max_concurrent_files=PY_INTERPRETER_FILE_CONCURRENCY,
+                warm_sessions=PY_INTERPRETER_WARM_SESSIONS,
+                session_idle_ttl=PY_INTERPRETER_SESSION_IDLE_TTL,
+                session_warmup_code=PY_INTERPRETER_WARMUP_CODE,
+                shared_cache=self.shared_cache,
+                pool_size=MCP_POOL_SIZE,
+                max_in_flight=MCP_MAX_IN_FLIGHT_PER_SESSION,
+                health_check_interval=MCP_HEALTH_CHECK_INTERVAL,
+                retries=MCP_CALL_RETRIES,
             ),
 
             #TODO:
             # Add tools with Long-term memory capabilities
         ]
 
-        tools.extend(await self._get_mcp_tools("http://localhost:8051/mcp"))
+        self._mcp_catalogs = [
+            await self._get_mcp_tool_catalog(DDG_MCP_URL, result_cache_ttl=MCP_RESULT_CACHE_TTL),
+        ]
+        self._update_tools()
+
+    def _update_tools(self) -> None:
+        """
+        Rebuild the tool set from static tools and current MCP catalogs. The list is replaced, not mutated:
+        requests in progress keep the tool set they started with.
+        """
+        tools = list(self._static_tools)
+        for catalog in self._mcp_catalogs:
+            tools.extend(catalog.tools)
+
+        for tool in tools:
+            tool.result_cache = self.tool_result_cache
 
-        return tools
+        self.tools = tools
 
     async def chat_completion(self, request: Request, response: Response) -> None:
         print(request.headers)
         if not self.tools:
-            self.tools = await self._create_tools()
+            await self._create_tools()
 
         with response.create_single_choice() as choice:
             await GeneralPurposeAgent(
@@ -86,15 +196,39 @@ class GeneralPurposeAgentApplication(ChatCompletion):
             )
 
 
-app: DIALApp = DIALApp()
-agent_app = GeneralPurposeAgentApplication()
-app.add_chat_completion(deployment_name="general-purpose-agent", impl=agent_app)
+async def metrics() -> str:
+    """Prometheus text exposition of the worker metrics."""
+    return METRICS.expose()
+
+
+def create_app() -> DIALApp:
+    """
+    Application factory, called by uvicorn in the serving process (in every worker in multi-worker mode).
+    Nothing is created on import: file extraction workers are spawned processes that import this module
+    as `__mp_main__`, they must not create the application with its caches and connections.
+    """
+    app = DIALApp()
+    agent_app = GeneralPurposeAgentApplication(
+        shared_cache=SharedCache.from_url(SHARED_CACHE_URL) if SHARED_CACHE_URL else None
+    )
+    app.add_chat_completion(deployment_name="general-purpose-agent", impl=agent_app)
+    app.add_api_route("/metrics", metrics, methods=["GET"], response_class=PlainTextResponse)
+    return app
+
 
 if __name__ == "__main__":
     import uvicorn
 
-    config = uvicorn.Config(app, port=5030, host="0.0.0.0")
-    server = uvicorn.Server(config)
-    import asyncio
+    config = uvicorn.Config(create_app, factory=True, port=int(os.getenv('PORT', 5030)), host="0.0.0.0")
+
+    if WORKERS > 1:
+        from task.utils.prefork import serve_prefork
+
+        # Load embedding model before fork, workers share its weights copy-on-write
+        get_embedding_model()
+        serve_prefork(config, WORKERS)
+    else:
+        server = uvicorn.Server(config)
+        import asyncio
 
-    asyncio.run(server.serve())
+        asyncio.run(server.serve())
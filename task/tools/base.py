@@ -1,5 +1,7 @@
+import json
+import time
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Optional
 
 from aidial_client.types.chat import ToolParam, FunctionParam
 from aidial_client.types.chat.legacy.chat_completion import Role
@@ -7,31 +9,77 @@ from aidial_sdk.chat_completion import Message
 from pydantic import StrictStr
 
 from task.tools.models import ToolCallParams
+from task.tools.result_cache import ToolResultCache
+from task.utils.metrics import TOOL_ERRORS, TOOL_EXECUTE_DURATION
 
 
 class BaseTool(ABC):
 
+    # Shared result cache, set up by the application. Used only by tools that opt in with `result_cache_ttl`
+    result_cache: Optional[ToolResultCache] = None
+
     async def execute(self, tool_call_params: ToolCallParams) -> Message:
         msg =  Message(
             role=Role.TOOL,
             name=StrictStr(tool_call_params.tool_call.function.name),
             tool_call_id=StrictStr(tool_call_params.tool_call.id),
         )
+        started = time.perf_counter()
         try:
-            result = await self._execute(tool_call_params)
+            result = await self._execute_with_cache(tool_call_params)
             if isinstance(result, Message):
                 msg = result
             else:
                 msg.content = StrictStr(result)
         except Exception as e:
+            TOOL_ERRORS.inc(tool=self.name)
             msg.content = StrictStr(f"ERROR during tool call execution:\n {e}")
+        finally:
+            TOOL_EXECUTE_DURATION.observe(time.perf_counter() - started, tool=self.name)
 
         return msg
 
+    async def _execute_with_cache(self, tool_call_params: ToolCallParams) -> str | Message:
+        ttl = self.result_cache_ttl
+        if self.result_cache is None or not ttl:
+            return await self._execute(tool_call_params)
+
+        arguments = json.loads(tool_call_params.tool_call.function.arguments or '{}')
+        key = ToolResultCache.make_key(
+            tool_name=self.name,
+            arguments=arguments,
+            scope=tool_call_params.api_key if self.result_cache_per_user else None,
+        )
+        result, from_cache = await self.result_cache.get_or_execute(
+            tool_name=self.name,
+            key=key,
+            ttl_seconds=ttl,
+            execute=lambda: self._execute(tool_call_params),
+        )
+
+        if from_cache:
+            if isinstance(result, Message):
+                # Result of coalesced call belongs to another tool call, rebind it
+                result = result.copy(update={"tool_call_id": StrictStr(tool_call_params.tool_call.id)})
+            else:
+                tool_call_params.stage.append_content(f"*Served from cache*\n\r{result}\n\r")
+
+        return result
+
     @abstractmethod
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         pass
 
+    @property
+    def result_cache_ttl(self) -> float | None:
+        """TTL in seconds for cached results of this tool. `None` disables caching (default)."""
+        return None
+
+    @property
+    def result_cache_per_user(self) -> bool:
+        """Whether cached results are scoped to the user (API key) that made the call."""
+        return True
+
     @property
     def create_tool_stage(self) -> bool:
         return True
@@ -8,6 +8,7 @@ from pydantic import StrictStr
 
 from task.tools.base import BaseTool
 from task.tools.models import ToolCallParams
+from task.utils.stream_buffer import BufferedContentWriter
 
 
 class DeploymentTool(BaseTool, ABC):
@@ -48,26 +49,29 @@ class DeploymentTool(BaseTool, ABC):
 
         content = ''
         custom_content: CustomContent = CustomContent(attachments=[])
-        async for chunk in chunks:
-            if chunk.choices and len(chunk.choices) > 0:
-                delta = chunk.choices[0].delta
-                if delta:
-                    if delta.content:
-                        tool_call_params.stage.append_content(delta.content)
-                        content += delta.content
-                    if delta.custom_content and delta.custom_content.attachments:
-                        attachments = delta.custom_content.attachments
-                        custom_content.attachments.extend(attachments)
+        with BufferedContentWriter(tool_call_params.stage) as stage_writer:
+            async for chunk in chunks:
+                if chunk.choices and len(chunk.choices) > 0:
+                    delta = chunk.choices[0].delta
+                    if delta:
+                        if delta.content:
+                            stage_writer.append_content(delta.content)
+                            content += delta.content
+                        if delta.custom_content and delta.custom_content.attachments:
+                            attachments = delta.custom_content.attachments
+                            custom_content.attachments.extend(attachments)
 
-                        for attachment in attachments:
-                            tool_call_params.stage.add_attachment(
-                                type=attachment.type,
-                                title=attachment.title,
-                                data=attachment.data,
-                                url=attachment.url,
-                                reference_url=attachment.reference_url,
-                                reference_type=attachment.reference_type,
-                            )
+                            # Keep content and attachments in order for the client
+                            stage_writer.flush()
+                            for attachment in attachments:
+                                tool_call_params.stage.add_attachment(
+                                    type=attachment.type,
+                                    title=attachment.title,
+                                    data=attachment.data,
+                                    url=attachment.url,
+                                    reference_url=attachment.reference_url,
+                                    reference_type=attachment.reference_type,
+                                )
 
         return Message(
             role=Role.TOOL,
@@ -1,22 +1,30 @@
 import json
-from typing import Any
+from typing import Any, Optional
 
 from aidial_sdk.chat_completion import Message
 
 from task.tools.base import BaseTool
 from task.tools.models import ToolCallParams
 from task.utils.dial_file_conent_extractor import DialFileContentExtractor
+from task.utils.extracted_text_cache import ExtractedTextCache
+
+PAGE_SIZE = 10_000
 
 
 class FileContentExtractionTool(BaseTool):
 
-    def __init__(self, endpoint: str):
+    def __init__(self, endpoint: str, text_cache: Optional[ExtractedTextCache] = None):
         self.endpoint = endpoint
+        self.text_cache = text_cache
 
     @property
     def show_in_stage(self) -> bool:
         return False
 
+    @property
+    def result_cache_ttl(self) -> float | None:
+        return 600
+
     @property
     def name(self) -> str:
         return "file_content_extraction_tool"
@@ -61,28 +69,30 @@ class FileContentExtractionTool(BaseTool):
 
         stage.append_content(f"## Response: \n")
 
-        content = DialFileContentExtractor(
+        # With text cache, reading next pages doesn't download and parse the file again.
+        # CSV files are rendered lazily: only rows of the requested page are converted to markdown
+        document = await DialFileContentExtractor(
             endpoint=self.endpoint,
             api_key=tool_call_params.api_key
-        ).extract_text(file_url)
+        ).aextract_paged(file_url, self.text_cache)
+        total_chars = document.total_chars
 
-        if not content:
+        if not total_chars:
             content = "Error: File content not found."
-
-        if len(content) > 10_000:
-            page_size = 10_000
-            total_pages = (len(content) + page_size - 1) // page_size
+        elif total_chars > PAGE_SIZE:
+            total_pages = (total_chars + PAGE_SIZE - 1) // PAGE_SIZE
 
             if page < 1:
                 page = 1
             elif page > total_pages:
                 return f"Error: Page {page} does not exist. Total pages: {total_pages}"
 
-            start_index = (page - 1) * page_size
-            end_index = start_index + page_size
-            page_content = content[start_index:end_index]
+            start_index = (page - 1) * PAGE_SIZE
+            page_content = document.window(start_index, start_index + PAGE_SIZE)
 
             content = f"{page_content}\n\n**Page #{page}. Total pages: {total_pages}**"
+        else:
+            content = document.window(0, total_chars)
 
         stage.append_content(f"```text\n\r{content}\n\r```\n\r")
 
@@ -1,18 +1,34 @@
-from typing import Optional, Any
+import time
+from typing import Callable, Optional, Any
 
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
-from mcp.types import CallToolResult, TextContent, ReadResourceResult, TextResourceContents, BlobResourceContents
+from mcp.types import CallToolResult, TextContent, ReadResourceResult, TextResourceContents, BlobResourceContents, \
+    ServerNotification, ToolListChangedNotification
 from pydantic import AnyUrl
 
 from task.tools.mcp.mcp_tool_model import MCPToolModel
+from task.utils.metrics import MCP_CALL_DURATION, MCP_ERRORS
+
+
+class MCPToolError(Exception):
+    """Tool call returned result with `isError` set, the message is the error text from the server."""
 
 
 class MCPClient:
     """Handles MCP server connection and tool execution"""
 
-    def __init__(self, mcp_server_url: str) -> None:
+    def __init__(
+            self,
+            mcp_server_url: str,
+            on_transport_error: Optional[Callable[[Exception], None]] = None,
+            on_tool_list_changed: Optional[Callable[[], None]] = None,
+    ) -> None:
         self.server_url = mcp_server_url
+        # Transport errors (e.g. dropped connection) are not raised to pending calls, they are reported here
+        self.on_transport_error = on_transport_error
+        # Called on `notifications/tools/list_changed` from the server
+        self.on_tool_list_changed = on_tool_list_changed
         self.session: Optional[ClientSession] = None
         self._streams_context = None
         self._session_context = None
@@ -34,7 +50,7 @@ class MCPClient:
         read_stream, write_stream, _ = await self._streams_context.__aenter__()
 
         # Create session context
-        self._session_context = ClientSession(read_stream, write_stream)
+        self._session_context = ClientSession(read_stream, write_stream, message_handler=self._handle_message)
         self.session: ClientSession = await self._session_context.__aenter__()
 
         # Initialize session
@@ -48,6 +64,21 @@ class MCPClient:
             await self.close()
             raise ValueError(f"MCP server connection failed: {e}")
 
+    async def _handle_message(self, message: Any) -> None:
+        if isinstance(message, Exception):
+            if self.on_transport_error is not None:
+                self.on_transport_error(message)
+        elif isinstance(message, ServerNotification) and isinstance(message.root, ToolListChangedNotification):
+            if self.on_tool_list_changed is not None:
+                self.on_tool_list_changed()
+
+    async def ping(self) -> None:
+        """Check that MCP server responds"""
+        if not self.session:
+            raise RuntimeError("MCP client not connected.")
+
+        await self.session.send_ping()
+
     async def get_tools(self) -> list[MCPToolModel]:
         """Get available tools from MCP server"""
         if not self.session:
@@ -63,12 +94,29 @@ class MCPClient:
             for tool in tools.tools
         ]
 
-    async def call_tool(self, tool_name: str, tool_args: dict[str, Any]) -> Any:
-        """Call a tool on the MCP server"""
+    async def call_tool(self, tool_name: str, tool_args: dict[str, Any], idempotent: bool = True) -> Any:
+        """
+        Call a tool on the MCP server. `idempotent` is used by `MCPClientPool` for retries, calls are not retried here
+
+        Raises:
+            MCPToolError: if the tool reported an error (e.g. failed search), so the error is not taken for a result
+        """
         if not self.session:
             raise RuntimeError("MCP client not connected.")
 
-        tool_result: CallToolResult = await self.session.call_tool(tool_name, tool_args)
+        started = time.perf_counter()
+        try:
+            tool_result: CallToolResult = await self.session.call_tool(tool_name, tool_args)
+        except Exception:
+            MCP_ERRORS.inc(tool=tool_name)
+            raise
+        finally:
+            MCP_CALL_DURATION.observe(time.perf_counter() - started, tool=tool_name)
+
+        if tool_result.isError:
+            MCP_ERRORS.inc(tool=tool_name)
+            error_text = "\n".join(content.text for content in tool_result.content if isinstance(content, TextContent))
+            raise MCPToolError(error_text or f"MCP tool `{tool_name}` failed")
 
         if not tool_result.content:
             return None
@@ -0,0 +1,288 @@
+import asyncio
+import itertools
+from typing import Any, Awaitable, Callable, Optional, TypeVar
+
+import anyio
+import httpx
+from mcp.shared.exceptions import McpError
+from mcp.types import CONNECTION_CLOSED
+from pydantic import AnyUrl
+
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_tool_model import MCPToolModel
+from task.utils.metrics import MCP_RECONNECTS
+
+T = TypeVar("T")
+
+_TRANSPORT_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    anyio.EndOfStream,
+    ConnectionError,
+)
+# Error returned by MCP client for requests to a session the server doesn't know (e.g. after server restart)
+_SESSION_TERMINATED = 32600
+
+
+def _is_transport_error(error: BaseException) -> bool:
+    if isinstance(error, McpError):
+        return error.error.code in (CONNECTION_CLOSED, _SESSION_TERMINATED)
+    return isinstance(error, _TRANSPORT_ERRORS)
+
+
+def _is_rejected_session(error: BaseException) -> bool:
+    """Server rejected the request of the session it doesn't know, so the request was not executed."""
+    return isinstance(error, McpError) and error.error.code == _SESSION_TERMINATED
+
+
+class _PooledSession:
+    """
+    One MCP session of the pool.
+
+    Session is opened and closed by its own owner task: MCP client contexts (anyio task groups) must be exited
+    in the task that entered them, while the pool reconnects sessions from the calling and health check tasks.
+    `closing` is set when the session is closed or its transport fails, calls running on it are cancelled then:
+    MCP client doesn't fail pending requests on transport errors, they would wait forever.
+    """
+
+    def __init__(
+            self,
+            server_url: str,
+            number: int,
+            max_in_flight: int,
+            on_tool_list_changed: Callable[[], None],
+    ):
+        self.server_url = server_url
+        self.number = number
+        self.on_tool_list_changed = on_tool_list_changed
+        self.client: Optional[MCPClient] = None
+        self.closing: Optional[asyncio.Event] = None
+        # Calls dispatched to the session, including the ones waiting for `limit`
+        self.in_flight = 0
+        self.limit = asyncio.Semaphore(max_in_flight)
+        self._owner: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    async def connect(self, timeout: float) -> tuple[MCPClient, asyncio.Event]:
+        async with self._lock:
+            if self.client is not None:
+                return self.client, self.closing
+
+            ready = asyncio.get_running_loop().create_future()
+            closing = asyncio.Event()
+            owner = asyncio.create_task(self._own(ready, closing))
+            try:
+                client = await asyncio.wait_for(ready, timeout)
+            except BaseException:
+                closing.set()
+                owner.cancel()
+                raise
+            self.client, self.closing, self._owner = client, closing, owner
+            return client, closing
+
+    async def _own(self, ready: asyncio.Future, closing: asyncio.Event) -> None:
+        def _on_transport_error(error: Exception) -> None:
+            if not ready.done():
+                # Server is not reachable, `initialize` request would never be answered
+                ready.set_exception(ConnectionError(f"MCP server connection failed: {error!r}"))
+            elif not closing.is_set():
+                print(f"[MCPClientPool] Transport error on session #{self.number} to {self.server_url}: {error!r}")
+                MCP_RECONNECTS.inc(reason="transport_error")
+                self._detach(closing)
+
+        try:
+            async with MCPClient(
+                    self.server_url,
+                    on_transport_error=_on_transport_error,
+                    on_tool_list_changed=self.on_tool_list_changed,
+            ) as client:
+                if ready.done():
+                    return
+                ready.set_result(client)
+                await closing.wait()
+        except Exception as e:
+            if not ready.done():
+                ready.set_exception(e)
+            else:
+                print(f"[MCPClientPool] Session #{self.number} to {self.server_url} closed with error: {e!r}")
+        finally:
+            # Failed request crashes task group of the MCP client, the owner task is cancelled then
+            if not ready.done():
+                ready.set_exception(ConnectionError("MCP session closed while connecting"))
+            self._detach(closing)
+
+    def _detach(self, closing: asyncio.Event) -> None:
+        """Stop routing calls to the session and let its owner task close it."""
+        closing.set()
+        if self.closing is closing:
+            self.client, self.closing, self._owner = None, None, None
+
+    async def close(self, timeout: float = 5.0) -> None:
+        async with self._lock:
+            owner, closing = self._owner, self.closing
+            if closing is None:
+                return
+            self._detach(closing)
+            await asyncio.wait((owner,), timeout=timeout)
+            if not owner.done():
+                owner.cancel()
+
+
+class MCPClientPool:
+    """
+    Pool of `size` MCP sessions to one server with the `MCPClient` interface.
+
+    - Calls are dispatched to the least busy connected session (round-robin among equally busy ones),
+      a session runs at most `max_in_flight` calls at once, further calls wait for it
+    - Calls failed with transport errors (connection refused/reset, closed stream, unknown session) are retried
+      `retries` times with exponential backoff on a reconnected session, so the pool survives MCP server restarts.
+      Transport error may come after the server received the request, so calls marked as not idempotent
+      (e.g. code execution) are retried only if they failed before the request was sent or were rejected
+    - Idle sessions are pinged every `health_check_interval` seconds, broken or disconnected ones are reconnected
+
+    `on_tool_list_changed` is called when any of the sessions receives tool list change notification.
+    """
+
+    def __init__(
+            self,
+            server_url: str,
+            size: int = 4,
+            max_in_flight: int = 8,
+            health_check_interval: float = 30.0,
+            retries: int = 1,
+            retry_backoff: float = 0.5,
+            connect_timeout: float = 10.0,
+    ):
+        self.server_url = server_url
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.connect_timeout = connect_timeout
+        self.health_check_interval = health_check_interval
+        self.on_tool_list_changed: Optional[Callable[[], None]] = None
+        self._sessions = [
+            _PooledSession(server_url, number, max_in_flight, self._notify_tool_list_changed)
+            for number in range(size)
+        ]
+        self._round_robin = itertools.count()
+        self._health_check_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    async def create(cls, server_url: str, **kwargs) -> 'MCPClientPool':
+        """Async factory method to create pool and connect its sessions"""
+        instance = cls(server_url, **kwargs)
+        await instance.connect()
+        return instance
+
+    async def connect(self) -> None:
+        """
+        Connect all sessions, the pool is usable if at least one of them is connected.
+
+        Raises:
+            ValueError: if no session could connect
+        """
+        results = await asyncio.gather(
+            *(session.connect(self.connect_timeout) for session in self._sessions), return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if len(errors) == len(self._sessions):
+            await self.close()
+            raise ValueError(f"MCP server connection failed: {errors[0]}")
+        if self._health_check_task is None and self.health_check_interval > 0:
+            self._health_check_task = asyncio.create_task(self._health_check_loop())
+
+    async def get_tools(self) -> list[MCPToolModel]:
+        """Get available tools from MCP server"""
+        return await self._call(lambda client: client.get_tools())
+
+    async def call_tool(self, tool_name: str, tool_args: dict[str, Any], idempotent: bool = True) -> Any:
+        """Call a tool on the MCP server, pass `idempotent=False` for tools that must not run twice"""
+        return await self._call(lambda client: client.call_tool(tool_name, tool_args), idempotent)
+
+    async def get_resource(self, uri: AnyUrl) -> str | bytes:
+        """Get specific resource content"""
+        return await self._call(lambda client: client.get_resource(uri))
+
+    def stats(self) -> list[dict[str, Any]]:
+        return [
+            {"session": session.number, "connected": session.client is not None, "in_flight": session.in_flight}
+            for session in self._sessions
+        ]
+
+    async def close(self) -> None:
+        """Stop health checks and close all sessions"""
+        if self._health_check_task is not None:
+            self._health_check_task.cancel()
+            self._health_check_task = None
+        await asyncio.gather(*(session.close() for session in self._sessions))
+
+    async def _call(self, fn: Callable[[MCPClient], Awaitable[T]], idempotent: bool = True) -> T:
+        for attempt in range(self.retries + 1):
+            session = self._pick_session()
+            session.in_flight += 1
+            sent = False
+            try:
+                async with session.limit:
+                    client, closing = await session.connect(self.connect_timeout)
+                    sent = True
+                    return await self._run_until_closed(fn(client), closing)
+            except Exception as e:
+                if attempt >= self.retries or not _is_transport_error(e):
+                    raise
+                if sent and not idempotent and not _is_rejected_session(e):
+                    print(f"[MCPClientPool] Call on session #{session.number} to {self.server_url} failed after "
+                          f"it was sent, not retried: {e!r}")
+                    raise
+                print(f"[MCPClientPool] Call on session #{session.number} to {self.server_url} failed, "
+                      f"retrying: {e!r}")
+                await session.close()
+                await asyncio.sleep(self.retry_backoff * 2 ** attempt)
+            finally:
+                session.in_flight -= 1
+
+    @staticmethod
+    async def _run_until_closed(call: Awaitable[T], closing: asyncio.Event) -> T:
+        """Run the call, cancel it if the session is closed meanwhile."""
+        call_task = asyncio.ensure_future(call)
+        closing_task = asyncio.ensure_future(closing.wait())
+        try:
+            await asyncio.wait((call_task, closing_task), return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closing_task.cancel()
+            if not call_task.done():
+                call_task.cancel()
+        if not call_task.done() or call_task.cancelled():
+            raise ConnectionError("MCP session was closed during the call")
+        return call_task.result()
+
+    def _notify_tool_list_changed(self) -> None:
+        if self.on_tool_list_changed is not None:
+            self.on_tool_list_changed()
+
+    def _pick_session(self) -> _PooledSession:
+        """Least busy session, connected sessions first. Ties are broken round-robin."""
+        offset = next(self._round_robin)
+        size = len(self._sessions)
+        return min(
+            self._sessions,
+            key=lambda session: (session.client is None, session.in_flight, (session.number - offset) % size),
+        )
+
+    async def _health_check_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            await asyncio.gather(*(self._check(session) for session in self._sessions))
+
+    async def _check(self, session: _PooledSession) -> None:
+        client = session.client
+        try:
+            if client is None:
+                await session.connect(self.connect_timeout)
+                MCP_RECONNECTS.inc(reason="disconnected")
+            elif session.in_flight == 0:
+                await asyncio.wait_for(client.ping(), self.connect_timeout)
+        except Exception as e:
+            print(f"[MCPClientPool] Health check of session #{session.number} to {self.server_url} failed: {e!r}")
+            if client is not None:
+                MCP_RECONNECTS.inc(reason="health_check")
+                await session.close()
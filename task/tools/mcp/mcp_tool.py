@@ -5,15 +5,17 @@ from aidial_sdk.chat_completion import Message
 
 from task.tools.base import BaseTool
 from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
 from task.tools.mcp.mcp_tool_model import MCPToolModel
 from task.tools.models import ToolCallParams
 
 
 class MCPTool(BaseTool):
 
-    def __init__(self, client: MCPClient, mcp_tool_model: MCPToolModel):
+    def __init__(self, client: MCPClient | MCPClientPool, mcp_tool_model: MCPToolModel, result_cache_ttl: float | None = None):
         self._client = client
         self._mcp_tool_model = mcp_tool_model
+        self._result_cache_ttl = result_cache_ttl
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         arguments = json.loads(tool_call_params.tool_call.function.arguments)
@@ -24,6 +26,15 @@ class MCPTool(BaseTool):
 
         return content
 
+    @property
+    def result_cache_ttl(self) -> float | None:
+        return self._result_cache_ttl
+
+    @property
+    def result_cache_per_user(self) -> bool:
+        # MCP server results (web search, page fetch) don't depend on the user
+        return False
+
     @property
     def name(self) -> str:
         return self._mcp_tool_model.name
@@ -0,0 +1,122 @@
+import asyncio
+from typing import Callable, Optional
+
+from task.tools.base import BaseTool
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
+from task.tools.mcp.mcp_tool_model import MCPToolModel
+from task.utils.metrics import MCP_TOOL_CATALOG_REFRESHES
+
+
+class MCPToolCatalog:
+    """
+    Cached tool list of one MCP server.
+
+    The list is fetched once on `create` and refreshed in background: on `notifications/tools/list_changed` from
+    the server and every `refresh_interval` seconds (for servers that don't send notifications), so reading
+    `tools` never calls the server. Refresh replaces the whole snapshot at once and keeps tool objects of unchanged
+    tools, `on_change` is called after the snapshot changed. Failed refresh keeps the previous snapshot.
+    """
+
+    def __init__(
+            self,
+            client: MCPClient | MCPClientPool,
+            build_tool: Callable[[MCPToolModel], BaseTool],
+            refresh_interval: float = 300.0,
+            on_change: Optional[Callable[[], None]] = None,
+    ):
+        self.client = client
+        self.build_tool = build_tool
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self.version = 0
+        self._models: dict[str, MCPToolModel] = {}
+        self._tools: tuple[BaseTool, ...] = ()
+        self._lock = asyncio.Lock()
+        self._poll_task: Optional[asyncio.Task] = None
+        self._notified_task: Optional[asyncio.Task] = None
+        self._notified_again = False
+
+    @classmethod
+    async def create(cls, client: MCPClient | MCPClientPool, **kwargs) -> 'MCPToolCatalog':
+        """Async factory method to create catalog, load tools and start background refresh"""
+        instance = cls(client, **kwargs)
+        await instance.start()
+        return instance
+
+    @property
+    def tools(self) -> list[BaseTool]:
+        return list(self._tools)
+
+    async def start(self) -> None:
+        """
+        Load tools and subscribe to change notifications.
+
+        Raises:
+            Exception: if tools could not be loaded
+        """
+        self.client.on_tool_list_changed = self.notify_changed
+        async with self._lock:
+            self._apply(await self.client.get_tools())
+        if self._poll_task is None and self.refresh_interval > 0:
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def refresh(self, trigger: str = "poll") -> bool:
+        """Reload tools from the server, returns True if the tool list changed."""
+        async with self._lock:
+            try:
+                models = await self.client.get_tools()
+            except Exception as e:
+                print(f"[MCPToolCatalog] Refresh of tools from {self.client.server_url} failed: {e!r}")
+                MCP_TOOL_CATALOG_REFRESHES.inc(trigger=trigger, result="error")
+                return False
+            changed = self._apply(models)
+
+        MCP_TOOL_CATALOG_REFRESHES.inc(trigger=trigger, result="changed" if changed else "unchanged")
+        if changed:
+            print(f"[MCPToolCatalog] Tools of {self.client.server_url} changed (version {self.version}): "
+                  f"{[tool.name for tool in self._tools]}")
+            if self.on_change is not None:
+                self.on_change()
+        return changed
+
+    def notify_changed(self) -> None:
+        """Schedule refresh, notifications coming during a running refresh are coalesced into one more refresh."""
+        if self._notified_task is not None and not self._notified_task.done():
+            self._notified_again = True
+            return
+        self._notified_task = asyncio.create_task(self._refresh_notified())
+
+    async def close(self) -> None:
+        """Stop background refresh"""
+        self.client.on_tool_list_changed = None
+        for task in (self._poll_task, self._notified_task):
+            if task is not None:
+                task.cancel()
+        self._poll_task = self._notified_task = None
+
+    def _apply(self, models: list[MCPToolModel]) -> bool:
+        models_by_name = {model.name: model for model in models}
+        if models_by_name == self._models:
+            return False
+
+        current = {tool.name: tool for tool in self._tools}
+        self._tools = tuple(
+            current[name] if self._models.get(name) == model else self.build_tool(model)
+            for name, model in models_by_name.items()
+        )
+        self._models = models_by_name
+        self.version += 1
+        return True
+
+    async def _refresh_notified(self) -> None:
+        while True:
+            self._notified_again = False
+            await self.refresh(trigger="notification")
+            if not self._notified_again:
+                return
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh(trigger="poll")
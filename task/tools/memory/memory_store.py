@@ -9,6 +9,8 @@ from aidial_client import AsyncDial
 from sentence_transformers import SentenceTransformer
 
 from task.tools.memory._models import Memory, MemoryData, MemoryCollection
+from task.utils.embeddings import EMBEDDING_MODEL_NAME, get_embedding_model
+from task.utils.shared_cache import SharedCache, TieredCache
 
 
 class LongTermMemoryStore:
@@ -17,20 +19,34 @@ class LongTermMemoryStore:
 
     Storage format: Single JSON file per user in DIAL bucket
     - File: {user_id}/long-memories.json
-    - Caching: In-memory cache with conversation_id as key
+    - Caching: per-worker in-memory cache (optionally in front of shared cache tier) with memory file path as key
     - Deduplication: O(n log n) using FAISS batch search
     """
 
     DEDUP_INTERVAL_HOURS = 24
 
-    def __init__(self, endpoint: str):
+    def __init__(self, endpoint: str, shared_cache: SharedCache | None = None):
         #TODO:
         # 1. Set endpoint
-        # 2. Create SentenceTransformer as model, model name is `all-MiniLM-L6-v2`
-        # 3. Create cache, doct of str and MemoryCollection (it is imitation of cache, normally such cache should be set aside)
+        # 2. Get SentenceTransformer as model with `get_embedding_model(EMBEDDING_MODEL_NAME)` (model name is
+        #    `all-MiniLM-L6-v2`, the instance is shared with RagTool and preloaded before fork in multi-worker mode)
+        # 3. Create cache with `self._create_cache(shared_cache)`. It is per-worker cache of str and MemoryCollection,
+        #    when `shared_cache` is provided (multi-worker mode) collections are also shared between workers
         # 4. Make `faiss.omp_set_num_threads(1)` (without this set up you won't be able to work in debug mode in `_deduplicate_fast` method
         raise NotImplementedError()
 
+    @staticmethod
+    def _create_cache(shared_cache: SharedCache | None) -> TieredCache[MemoryCollection]:
+        """Per-worker cache of memory collections in front of optional shared cache tier."""
+        return TieredCache(
+            namespace="long-memories",
+            dumps=lambda collection: collection.model_dump_json().encode('utf-8'),
+            loads=MemoryCollection.model_validate_json,
+            shared_cache=shared_cache,
+            l1_max_entries=1024,
+            ttl_seconds=24 * 60 * 60,
+        )
+
     async def _get_memory_file_path(self, dial_client: AsyncDial) -> str:
         """Get the path to the memory file in DIAL bucket."""
         #TODO:
@@ -44,8 +60,8 @@ class LongTermMemoryStore:
         #TODO:
         # 1. Create AsyncDial client (api_version is 2025-01-01-preview)
         # 2. Get memory file path
-        # 3. Check cache: cache is dict of str and MemoryCollection, for the key we will use `memory file path` to make
-        #    it simple. Such key will be unique for user and will allow to access memories across different
+        # 3. Check cache: cache is `TieredCache` of str and MemoryCollection (use async `aget`), for the key we will use
+        #    `memory file path` to make it simple. Such key will be unique for user and will allow to access memories across different
         #    conversations and only user can access them. In case if cache is present return its MemoryCollection.
         # ---
         # Below is logic when cache is not present:
@@ -72,7 +88,7 @@ class LongTermMemoryStore:
         #    in one file and 'one memory' with its embeddings takes ~6-8Kb, we expect that there are won't be more that
         #    1000 memories but anyway for 1000 memories it will be ~6-8Mb, so, we need to make at least these small
         #    efforts to make it smaller 😉
-        # 5. Put to cache (kind reminder the key is memory file path)
+        # 5. Put to cache with async `aset` (kind reminder the key is memory file path)
         raise NotImplementedError()
 
     async def add_memory(self, api_key: str, content: str, importance: float, category: str, topics: list[str]) -> str:
@@ -153,5 +169,6 @@ class LongTermMemoryStore:
         # 1. Create AsyncDial client
         # 2. Get memory file path
         # 3. Delete file
-        # 4. Return info about successful memory deletion
+        # 4. Delete memories from cache with async `adelete` (otherwise other workers will keep serving them)
+        # 5. Return info about successful memory deletion
         raise NotImplementedError()
@@ -1,29 +1,88 @@
+import asyncio
 import base64
+import hashlib
 import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BufferedReader
+from pathlib import PurePosixPath
 from typing import Any, Optional
 
-from aidial_client import Dial
+from aidial_client import AsyncDial, AsyncDialClientPool
 from aidial_sdk.chat_completion import Message, Attachment
 from pydantic import StrictStr, AnyUrl
 
 from task.tools.base import BaseTool
-from task.tools.py_interpreter._response import _ExecutionResult
+from task.tools.py_interpreter._response import _ExecutionResult, _FileReference
+from task.tools.py_interpreter.session_pool import InterpreterSessionPool
 from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
 from task.tools.mcp.mcp_tool_model import MCPToolModel
 from task.tools.models import ToolCallParams
+from task.utils.metrics import INTERPRETER_FILE_DURATION
+from task.utils.shared_cache import SharedCache
+
+_TEXT_MIME_TYPES = ['application/json', 'application/xml']
+# Base64 content above the spool size is decoded to disk in slices (multiple of 4 chars)
+_BASE64_SLICE_CHARS = 4 * 1024 * 1024
+_SPOOL_MAX_SIZE = 16 * 1024 * 1024
+# MCP client parses resource responses on the event loop, files above this size are fetched one at a time
+_LARGE_FILE_SIZE = 8 * 1024 * 1024
+_APPDATA_HOME_CACHE_SIZE = 1024
+
+
+@dataclass
+class _StoredFile:
+    url: str
+    size: int
+    fetch_seconds: float
+    upload_seconds: float
+
+
+def _decode_file(resource: str | bytes, mime_type: str) -> bytes | BufferedReader:
+    """
+    Decode resource content. Large base64 content is decoded slice by slice into temporary file, so the second full
+    copy of the content is not held in memory. The file is already unlinked, it is removed once closed.
+    """
+    if isinstance(resource, bytes):
+        return resource
+    if mime_type.startswith('text/') or mime_type in _TEXT_MIME_TYPES:
+        return resource.encode('utf-8')
+    if len(resource) <= _SPOOL_MAX_SIZE:
+        return base64.b64decode(resource)
+
+    with tempfile.NamedTemporaryFile(prefix="gpa-interpreter-", delete=False) as file:
+        for start in range(0, len(resource), _BASE64_SLICE_CHARS):
+            file.write(base64.b64decode(resource[start:start + _BASE64_SLICE_CHARS]))
+    try:
+        # DIAL client accepts only bytes or file opened for reading
+        return open(file.name, "rb")
+    finally:
+        os.unlink(file.name)
 
 
 class PythonCodeInterpreterTool(BaseTool):
 
     def __init__(
             self,
-            mcp_client: MCPClient,
+            mcp_client: MCPClient | MCPClientPool,
             mcp_tool_models: list[MCPToolModel],
             tool_name: str,
             dial_endpoint: str,
+            max_concurrent_files: int = 4,
+            session_pool: Optional[InterpreterSessionPool] = None,
     ):
         self.dial_endpoint = dial_endpoint
+        self.max_concurrent_files = max_concurrent_files
         self._mcp_client = mcp_client
+        self._session_pool = session_pool
+        # Uploads of all requests share connections of one HTTP client
+        self._dial_client_pool = AsyncDialClientPool()
+        # Appdata home per API key hash, it doesn't change for the key
+        self._appdata_homes: OrderedDict[str, PurePosixPath] = OrderedDict()
 
         self._code_execute_tool: Optional[MCPToolModel] = None
         for mcp_tool_model in mcp_tool_models:
@@ -39,16 +98,45 @@ class PythonCodeInterpreterTool(BaseTool):
             mcp_url: str,
             tool_name: str,
             dial_endpoint: str,
+            max_concurrent_files: int = 4,
+            warm_sessions: int = 0,
+            session_idle_ttl: float = 30 * 60,
+            session_warmup_code: str = "pass",
+            shared_cache: Optional[SharedCache] = None,
+            pool_size: int = 1,
+            **pool_kwargs,
     ) -> 'PythonCodeInterpreterTool':
-        """Async factory method to create PythonCodeInterpreterTool"""
-        mcp_client = await MCPClient.create(mcp_url)
+        """
+        Async factory method to create PythonCodeInterpreterTool, with `pool_size` > 1 calls are spread
+        over a pool of MCP sessions (see `MCPClientPool`). With `warm_sessions` > 0 calls without `session_id`
+        use interpreter session of the conversation (see `InterpreterSessionPool`)
+        """
+        if pool_size > 1:
+            mcp_client = await MCPClientPool.create(mcp_url, size=pool_size, **pool_kwargs)
+        else:
+            mcp_client = await MCPClient.create(mcp_url)
         tools = await mcp_client.get_tools()
-        return cls(
+        session_pool = None
+        if warm_sessions > 0:
+            session_pool = InterpreterSessionPool(
+                mcp_client,
+                tool_name,
+                size=warm_sessions,
+                idle_ttl=session_idle_ttl,
+                warmup_code=session_warmup_code,
+                shared_cache=shared_cache,
+            )
+        instance = cls(
             mcp_client=mcp_client,
             mcp_tool_models=tools,
             tool_name=tool_name,
             dial_endpoint=dial_endpoint,
+            max_concurrent_files=max_concurrent_files,
+            session_pool=session_pool,
         )
+        if session_pool is not None:
+            session_pool.start()
+        return instance
 
     @property
     def show_in_stage(self) -> bool:
@@ -77,41 +165,56 @@ class PythonCodeInterpreterTool(BaseTool):
         stage.append_content(f"```python\n\r{code}\n\r```\n\r")
         if session_id:
             stage.append_content(f"**session_id**: {session_id}\n\r")
+        elif self._session_pool is not None and (
+                session_id := await self._session_pool.acquire(tool_call_params.conversation_id)):
+            arguments["session_id"] = session_id
+            stage.append_content(f"**session_id** (session of the conversation): {session_id}\n\r")
         else:
             stage.append_content("New session will be created\n\r")
         stage.append_content("## Response: \n")
 
-        content = await self._mcp_client.call_tool(self.name, arguments)
+        # Code execution is not idempotent (files, HTTP calls), it is never retried once sent
+        content = await self._mcp_client.call_tool(self.name, arguments, idempotent=False)
         execution_result_json = json.loads(content)
         execution_result = _ExecutionResult.model_validate(execution_result_json)
 
+        if self._session_pool is not None and execution_result.session_info is not None:
+            await self._session_pool.bind(tool_call_params.conversation_id, execution_result.session_info.session_id)
+
         if execution_result.files:
-            dial_client = Dial(
+            dial_client = self._dial_client_pool.create_client(
                 base_url=self.dial_endpoint,
                 api_key=tool_call_params.api_key,
             )
-            files_home = dial_client.my_appdata_home()
-
-            for file in execution_result.files:
-                name = file.name
-                mime_type = file.mime_type
+            files_home = asyncio.ensure_future(self._get_files_home(dial_client, tool_call_params.api_key))
+            limit = asyncio.Semaphore(self.max_concurrent_files)
+            large_file_limit = asyncio.Semaphore(1)
+            store_tasks = [
+                asyncio.ensure_future(self._store_file(
+                    dial_client, files_home, large_file_limit if file.size > _LARGE_FILE_SIZE else limit, file
+                ))
+                for file in execution_result.files
+            ]
 
-                resource = await self._mcp_client.get_resource(AnyUrl(file.uri))
+            try:
+                stored_files = await asyncio.gather(*store_tasks)
+            finally:
+                # If a file failed, the other files are not stored either. All tasks are awaited, so none of them
+                # outlives the call and their errors are retrieved
+                for task in (files_home, *store_tasks):
+                    task.cancel()
+                await asyncio.gather(files_home, *store_tasks, return_exceptions=True)
 
-                if mime_type.startswith('text/') or mime_type in ['application/json', 'application/xml']:
-                    file_data = resource.encode('utf-8')
-                else:
-                    file_data = base64.b64decode(resource)
-
-                url = f"files/{(files_home / name).as_posix()}"
-                print(url)
-
-                dial_client.files.upload(url=url, file=file_data)
+            stage.append_content("## Files: \n")
+            stage.append_content("| File | Size, bytes | Fetch, s | Upload, s |\n|---|---|---|---|\n")
+            for file, stored_file in zip(execution_result.files, stored_files):
+                stage.append_content(f"| {file.name} | {stored_file.size} | {stored_file.fetch_seconds:.3f} "
+                                     f"| {stored_file.upload_seconds:.3f} |\n")
 
                 attachment = Attachment(
-                    url=StrictStr(url),
-                    type=StrictStr(mime_type),
-                    title=StrictStr(name)
+                    url=StrictStr(stored_file.url),
+                    type=StrictStr(file.mime_type),
+                    title=StrictStr(file.name)
                 )
                 stage.add_attachment(attachment)
                 tool_call_params.choice.add_attachment(attachment)
@@ -126,3 +229,46 @@ class PythonCodeInterpreterTool(BaseTool):
         stage.append_content(f"```json\n\r{execution_result.model_dump_json(indent=2)}\n\r```\n\r")
 
         return StrictStr(execution_result.model_dump_json())
+
+    async def _get_files_home(self, dial_client: AsyncDial, api_key: str) -> PurePosixPath:
+        key = hashlib.sha256(api_key.encode('utf-8')).hexdigest()
+        files_home = self._appdata_homes.get(key)
+        if files_home is None:
+            files_home = await dial_client.my_appdata_home()
+            self._appdata_homes[key] = files_home
+            if len(self._appdata_homes) > _APPDATA_HOME_CACHE_SIZE:
+                self._appdata_homes.popitem(last=False)
+        else:
+            self._appdata_homes.move_to_end(key)
+        return files_home
+
+    async def _store_file(
+            self,
+            dial_client: AsyncDial,
+            files_home: asyncio.Future,
+            limit: asyncio.Semaphore,
+            file: _FileReference,
+    ) -> _StoredFile:
+        """Fetch file from MCP server and upload it to the appdata of the user."""
+        async with limit:
+            started = time.perf_counter()
+            resource = await self._mcp_client.get_resource(AnyUrl(file.uri))
+            # Decoding of large files would block the event loop
+            file_data = await asyncio.to_thread(_decode_file, resource, file.mime_type)
+            del resource
+            fetch_seconds = time.perf_counter() - started
+            INTERPRETER_FILE_DURATION.observe(fetch_seconds, step="fetch")
+
+            try:
+                size = len(file_data) if isinstance(file_data, bytes) else os.fstat(file_data.fileno()).st_size
+                url = f"files/{((await files_home) / file.name).as_posix()}"
+
+                started = time.perf_counter()
+                await dial_client.files.upload(url=url, file=(file.name, file_data, file.mime_type))
+                upload_seconds = time.perf_counter() - started
+                INTERPRETER_FILE_DURATION.observe(upload_seconds, step="upload")
+            finally:
+                if not isinstance(file_data, bytes):
+                    file_data.close()
+
+        return _StoredFile(url=url, size=size, fetch_seconds=fetch_seconds, upload_seconds=upload_seconds)
@@ -0,0 +1,175 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_client_pool import MCPClientPool
+from task.tools.py_interpreter._response import _ExecutionResult
+from task.utils.metrics import INTERPRETER_SESSION_REQUESTS
+from task.utils.shared_cache import SharedCache
+
+_SHARED_KEY_PREFIX = "interpreter-session:"
+
+
+@dataclass
+class _Session:
+    session_id: str
+    last_used: float
+
+
+class InterpreterSessionPool:
+    """
+    Interpreter sessions (Jupyter kernels) bound to conversations.
+
+    Call without `session_id` makes the interpreter start new kernel. The pool keeps `size` sessions started in
+    advance with `warmup_code` (e.g. imports of common libraries) and binds one of them to a conversation on its
+    first call, further calls of the conversation reuse it. A warm session is started in place of a bound one only
+    then, so an idle server doesn't start kernels. Conversations idle for `idle_ttl` seconds are forgotten, their
+    kernels are expired by the interpreter server. Warm sessions unused for `idle_ttl` are not dropped: while the
+    pool is in use they run `warmup_code` again, so the interpreter keeps their kernels (or replaces expired ones),
+    otherwise they are left as they are. With `shared_cache` bindings are shared between workers.
+    """
+
+    def __init__(
+            self,
+            mcp_client: MCPClient | MCPClientPool,
+            tool_name: str,
+            size: int = 2,
+            idle_ttl: float = 30 * 60,
+            warmup_code: str = "pass",
+            shared_cache: Optional[SharedCache] = None,
+    ):
+        self.mcp_client = mcp_client
+        self.tool_name = tool_name
+        self.size = size
+        self.idle_ttl = idle_ttl
+        self.warmup_code = warmup_code
+        self.shared_cache = shared_cache
+        self._warm: deque[_Session] = deque()
+        self._bound: dict[str, _Session] = {}
+        self._starting: set[asyncio.Task] = set()
+        self._refreshing: set[asyncio.Task] = set()
+        self._reaper_task: Optional[asyncio.Task] = None
+        self._last_acquired = 0.0
+
+    def start(self) -> None:
+        """Start warming up sessions and reaping idle ones"""
+        self._fill()
+        if self._reaper_task is None and self.idle_ttl > 0:
+            self._reaper_task = asyncio.create_task(self._reap_loop())
+
+    async def acquire(self, conversation_id: str) -> Optional[str]:
+        """
+        Session of the conversation: already bound one, otherwise a warm one that gets bound to the conversation.
+        Returns None if there is no warm session, the interpreter starts new session then.
+        """
+        self._last_acquired = time.monotonic()
+        session = self._bound.get(conversation_id)
+        result = "bound"
+        if session is None and self.shared_cache is not None:
+            session_id = await asyncio.to_thread(self.shared_cache.get, self._shared_key(conversation_id))
+            # Other call of the conversation could bind a session meanwhile
+            session = self._bound.get(conversation_id)
+            if session is None and session_id is not None:
+                session = self._bound[conversation_id] = _Session(session_id.decode('utf-8'), time.monotonic())
+                result = "shared"
+        if session is None and self._warm:
+            session = self._bound[conversation_id] = self._warm.popleft()
+            result = "warm"
+            self._fill()
+
+        if session is None:
+            INTERPRETER_SESSION_REQUESTS.inc(result="cold")
+            self._fill()
+            return None
+        INTERPRETER_SESSION_REQUESTS.inc(result=result)
+        session.last_used = time.monotonic()
+        return session.session_id
+
+    async def bind(self, conversation_id: str, session_id: str) -> None:
+        """Bind session used by the call to the conversation (the interpreter can replace expired session)."""
+        session = self._bound.get(conversation_id)
+        if session is not None and session.session_id == session_id:
+            session.last_used = time.monotonic()
+        else:
+            self._bound[conversation_id] = _Session(session_id, time.monotonic())
+        if self.shared_cache is not None:
+            await asyncio.to_thread(
+                self.shared_cache.set,
+                self._shared_key(conversation_id),
+                session_id.encode('utf-8'),
+                int(self.idle_ttl) if self.idle_ttl > 0 else None,
+            )
+
+    async def close(self) -> None:
+        """Stop warm-up and reaping"""
+        for task in [*self._starting, *self._refreshing, self._reaper_task]:
+            if task is not None:
+                task.cancel()
+        self._starting.clear()
+        self._refreshing.clear()
+        self._reaper_task = None
+
+    def _fill(self) -> None:
+        while len(self._warm) + len(self._starting) < self.size:
+            task = asyncio.create_task(self._start_session())
+            self._starting.add(task)
+            task.add_done_callback(self._starting.discard)
+
+    async def _start_session(self) -> None:
+        started = time.perf_counter()
+        try:
+            session_id = await self._warm_up()
+            self._warm.append(_Session(session_id, time.monotonic()))
+            print(f"[InterpreterSessionPool] Session {session_id} warmed up in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            # Not retried here, next `acquire` starts it again
+            print(f"[InterpreterSessionPool] Session warm-up failed: {e!r}")
+
+    async def _refresh_session(self, session: _Session) -> None:
+        try:
+            session_id = await self._warm_up(session.session_id)
+        except Exception as e:
+            print(f"[InterpreterSessionPool] Refresh of session {session.session_id} failed: {e!r}")
+            return
+        if session_id != session.session_id:
+            print(f"[InterpreterSessionPool] Session {session.session_id} expired, replaced by {session_id}")
+        session.session_id = session_id
+        session.last_used = time.monotonic()
+
+    async def _warm_up(self, session_id: Optional[str] = None) -> str:
+        """Run warm-up code in the session (new one if `session_id` is None), returns id of the session used."""
+        arguments = {"code": self.warmup_code}
+        if session_id is not None:
+            arguments["session_id"] = session_id
+        content = await self.mcp_client.call_tool(self.tool_name, arguments, idempotent=False)
+        execution_result = _ExecutionResult.model_validate_json(content)
+        if execution_result.session_info is None:
+            raise ValueError("Interpreter response has no session info")
+        if not execution_result.success:
+            print(f"[InterpreterSessionPool] Warm-up code failed: {execution_result.error}")
+        return execution_result.session_info.session_id
+
+    async def _reap_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_ttl / 2, 60))
+            self._reap()
+
+    def _reap(self) -> None:
+        expired = time.monotonic() - self.idle_ttl
+        for conversation_id in [key for key, session in self._bound.items() if session.last_used < expired]:
+            del self._bound[conversation_id]
+
+        if self._last_acquired < expired or self._refreshing:
+            return
+        for session in self._warm:
+            if session.last_used < expired:
+                task = asyncio.create_task(self._refresh_session(session))
+                self._refreshing.add(task)
+                task.add_done_callback(self._refreshing.discard)
+
+    @staticmethod
+    def _shared_key(conversation_id: str) -> str:
+        return f"{_SHARED_KEY_PREFIX}{conversation_id}"
@@ -0,0 +1,83 @@
+from dataclasses import dataclass
+from typing import Any, Literal
+
+import faiss
+import numpy as np
+
+
+@dataclass
+class AnnIndexConfig:
+    """
+    Index selection by number of chunks. All indexes use inner product on L2-normalized vectors (cosine similarity).
+
+    - `< flat_max_chunks`: exact `IndexFlatIP`, brute force is ~2ms per query at 100k chunks, so exact search
+      is kept for everything but huge documents
+    - otherwise `ann_type` index:
+      - `ivf`: `IndexIVFFlat` with ~4 * sqrt(n) lists, search quality/latency tuned with `ivf_nprobe`
+      - `hnsw`: `IndexHNSWFlat`, search quality/latency tuned with `hnsw_ef_search`
+
+    See `benchmarks/bench_ann_index.py` for build time, latency and recall of the options.
+    """
+    flat_max_chunks: int = 50_000
+    ann_type: Literal["ivf", "hnsw"] = "ivf"
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 80
+    hnsw_ef_search: int = 128
+    ivf_nprobe: int = 32
+    ivf_train_size: int = 50_000
+
+
+def normalize(embeddings: Any) -> np.ndarray:
+    """Return float32 L2-normalized copy of embeddings, so inner product equals cosine similarity."""
+    vectors = np.array(embeddings, dtype='float32', copy=True).reshape(len(embeddings), -1)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def create_flat_index(dimension: int) -> Any:
+    return faiss.IndexFlatIP(dimension)
+
+
+def build_adaptive_index(flat_index: Any, config: AnnIndexConfig) -> Any:
+    """
+    Rebuild exact flat index (filled incrementally while indexing) into ANN index when the document is large.
+    Small documents keep the flat index as is.
+    """
+    total = flat_index.ntotal
+    if total < config.flat_max_chunks:
+        return flat_index
+
+    vectors = flat_index.reconstruct_n(0, total)
+    dimension = flat_index.d
+    if config.ann_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, config.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = config.hnsw_ef_construction
+    else:
+        nlist = max(1, min(int(4 * np.sqrt(total)), total // 39))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(dimension), dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+        train_size = max(config.ivf_train_size, nlist * 39)
+        if total > train_size:
+            sample = vectors[np.random.default_rng(0).choice(total, train_size, replace=False)]
+        else:
+            sample = vectors
+        index.train(sample)
+
+    index.add(vectors)
+    apply_search_params(index, config)
+    return index
+
+
+def apply_search_params(index: Any, config: AnnIndexConfig) -> None:
+    """Set query-time parameters, indexes loaded from disk or shared cache get current configuration too."""
+    if isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = config.hnsw_ef_search
+    elif isinstance(index, faiss.IndexIVF):
+        index.nprobe = config.ivf_nprobe
+
+
+def describe(index: Any) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
@@ -0,0 +1,112 @@
+from typing import Any, Iterator, Optional
+
+import numpy as np
+
+_WHITESPACE_CODE_POINTS = np.array([ord(char) for char in " \t\n\r\x0b\x0c\xa0"], dtype=np.uint32)
+
+
+class TokenChunker:
+    """
+    Splits text into chunks sized in model tokens, working on offsets into the original text.
+
+    Text is tokenized once (fast tokenizers report character offsets of tokens), chunk windows are taken
+    over token offsets and their ends are moved back to the nearest separator (paragraph, line, sentence, word)
+    within the second half of the window. Only the final chunks are sliced out of the text.
+
+    Chunks are returned as (start, end) character offsets, so the caller keeps position metadata for citations.
+    """
+
+    def __init__(
+            self,
+            tokenizer: Optional[Any] = None,
+            chunk_tokens: int = 254,
+            overlap_tokens: int = 25,
+            separators: tuple[str, ...] = ("\n\n", "\n", ". ", " "),
+    ):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("overlap_tokens must be less than chunk_tokens")
+        self.tokenizer = tokenizer
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.separators = separators
+
+    def split_offsets(self, text: str) -> Iterator[tuple[int, int]]:
+        starts, ends = self._token_offsets(text)
+        total = len(starts)
+        first = 0
+        while first < total:
+            last = min(first + self.chunk_tokens, total)
+            start = int(starts[first])
+            end = int(ends[last - 1])
+
+            if last < total:
+                end = self._snap_end(text, start, int(ends[first + self.chunk_tokens // 2 - 1]), end)
+                # First token that starts at or after the chunk end
+                last = max(int(np.searchsorted(starts, end, side='left')), first + 1)
+                end = max(end, int(ends[last - 1]))
+
+            yield start, end
+            if last >= total:
+                break
+            first = max(last - self.overlap_tokens, first + 1)
+
+    def split_text(self, text: str) -> list[str]:
+        return [text[start:end] for start, end in self.split_offsets(text)]
+
+    def _snap_end(self, text: str, start: int, min_end: int, end: int) -> int:
+        """Move chunk end back to the last separator between `min_end` and `end`, separator is not included."""
+        for separator in self.separators:
+            position = text.rfind(separator, min_end, end)
+            if position > start:
+                return position + len(separator.rstrip())
+        return end
+
+    def _token_offsets(self, text: str) -> tuple[np.ndarray, np.ndarray]:
+        if self.tokenizer is not None:
+            encoding = self.tokenizer(
+                text,
+                add_special_tokens=False,
+                return_offsets_mapping=True,
+                return_attention_mask=False,
+                return_token_type_ids=False,
+                verbose=False,
+            )
+            offsets = np.asarray(encoding["offset_mapping"], dtype=np.int64).reshape(-1, 2)
+            return offsets[:, 0], offsets[:, 1]
+
+        return _approximate_token_offsets(text)
+
+
+def _approximate_token_offsets(text: str) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Approximation of word piece tokens (words and single punctuation marks), used when the model tokenizer
+    is not available. Vectorized over code points, offsets are `str` indices.
+    """
+    code_points = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    is_space = np.isin(code_points, _WHITESPACE_CODE_POINTS)
+    is_word = (
+            ((code_points >= ord('0')) & (code_points <= ord('9')))
+            | ((code_points >= ord('A')) & (code_points <= ord('Z')))
+            | ((code_points >= ord('a')) & (code_points <= ord('z')))
+            | (code_points == ord('_'))
+            | ((code_points > 127) & ~is_space)
+    )
+    is_punctuation = ~is_space & ~is_word
+
+    previous_word = np.concatenate(([False], is_word[:-1]))
+    next_word = np.concatenate((is_word[1:], [False]))
+    starts = np.flatnonzero((is_word & ~previous_word) | is_punctuation)
+    ends = np.flatnonzero((is_word & ~next_word) | is_punctuation) + 1
+    return starts.astype(np.int64), ends.astype(np.int64)
+
+
+def create_model_chunker(model: Any, overlap_tokens: int = 25) -> TokenChunker:
+    """
+    Chunker sized to the embedding model window (`max_seq_length` minus [CLS] and [SEP] tokens),
+    using the model tokenizer when it is a fast one (reports offsets).
+    """
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None and not getattr(tokenizer, "is_fast", False):
+        tokenizer = None
+    max_seq_length = getattr(model, "max_seq_length", None) or 256
+    return TokenChunker(tokenizer=tokenizer, chunk_tokens=max_seq_length - 2, overlap_tokens=overlap_tokens)
@@ -0,0 +1,159 @@
+import hashlib
+import mmap
+import os
+import shutil
+import struct
+import threading
+import time
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Tuple
+
+import faiss
+import numpy as np
+
+_CHUNKS_MAGIC = b"GPACHK01"
+_INDEX_FILE = "index.faiss"
+_CHUNKS_FILE = "chunks.bin"
+_SPANS_FILE = "spans.npy"
+
+
+class MappedChunks(Sequence):
+    """
+    Read-only list of chunks backed by memory-mapped file.
+
+    File format: 8 bytes magic, uint64 count, (count + 1) uint64 offsets, UTF-8 chunk bytes.
+    Chunks are decoded on access, only touched pages are read from disk.
+    """
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mmap[:8] != _CHUNKS_MAGIC:
+            raise ValueError(f"Invalid chunks file: {path}")
+        (count,) = struct.unpack_from('<Q', self._mmap, 8)
+        self._offsets = np.frombuffer(self._mmap, dtype='<u8', count=count + 1, offset=16)
+        self._data_start = 16 + (count + 1) * 8
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        start = self._data_start + int(self._offsets[index])
+        end = self._data_start + int(self._offsets[index + 1])
+        return self._mmap[start:end].decode('utf-8')
+
+    @staticmethod
+    def write(path: Path, chunks: Sequence[str]) -> None:
+        encoded = [chunk.encode('utf-8') for chunk in chunks]
+        offsets = np.zeros(len(encoded) + 1, dtype='<u8')
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        with open(path, "wb") as f:
+            f.write(_CHUNKS_MAGIC)
+            f.write(struct.pack('<Q', len(encoded)))
+            f.write(offsets.tobytes())
+            for chunk in encoded:
+                f.write(chunk)
+
+
+class DiskIndexStore:
+    """
+    Persistent tier of DocumentCache: FAISS index (`faiss.write_index`), memory-mapped chunks and chunk spans
+    per entry.
+
+    - One directory per entry, written to temporary directory and atomically renamed
+    - Total size is capped with LRU eviction (entry directory mtime is updated on every hit)
+    - Loading is lazy: index is memory-mapped when FAISS supports it for the index type, chunks always are
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def load(self, key: str) -> Tuple[Any, Sequence[str], np.ndarray] | None:
+        entry_dir = self._entry_dir(key)
+        if not (entry_dir / _CHUNKS_FILE).exists():
+            return None
+
+        try:
+            index = self._read_index(entry_dir / _INDEX_FILE)
+            chunks = MappedChunks(entry_dir / _CHUNKS_FILE)
+            spans = np.load(entry_dir / _SPANS_FILE, mmap_mode='r')
+        except Exception as e:
+            print(f"[DiskIndexStore] Unable to load {entry_dir}, removing it: {e}")
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            return None
+
+        now = time.time()
+        try:
+            os.utime(entry_dir, (now, now))
+        except OSError:
+            pass
+        return index, chunks, spans
+
+    def save(self, key: str, index: Any, chunks: Sequence[str], spans: np.ndarray) -> None:
+        entry_dir = self._entry_dir(key)
+        if entry_dir.exists():
+            return
+
+        tmp_dir = self.directory / f".tmp-{entry_dir.name}-{os.getpid()}-{threading.get_ident()}"
+        try:
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(index, str(tmp_dir / _INDEX_FILE))
+            MappedChunks.write(tmp_dir / _CHUNKS_FILE, chunks)
+            np.save(tmp_dir / _SPANS_FILE, np.ascontiguousarray(spans, dtype='<i8'))
+            os.replace(tmp_dir, entry_dir)
+        except (OSError, RuntimeError) as e:
+            # Other worker could have stored the same entry first. faiss reports write failures as RuntimeError
+            if not entry_dir.exists():
+                print(f"[DiskIndexStore] Unable to save {entry_dir}: {e}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        self._evict()
+
+    def size_bytes(self) -> int:
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = sorted(self._entries(), key=lambda entry: entry[1])
+            total = sum(size for _, _, size in entries)
+            for entry_dir, _, size in entries:
+                if total <= self.max_bytes:
+                    break
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                total -= size
+                print(f"[DiskIndexStore] Evicted {entry_dir.name} ({size} bytes)")
+
+    def _entries(self) -> list[Tuple[Path, float, int]]:
+        entries = []
+        for entry_dir in self.directory.iterdir():
+            if entry_dir.name.startswith(".tmp-") or not entry_dir.is_dir():
+                continue
+            try:
+                size = sum(file.stat().st_size for file in entry_dir.iterdir())
+                entries.append((entry_dir, entry_dir.stat().st_mtime, size))
+            except OSError:
+                continue
+        return entries
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.directory / hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _read_index(path: Path) -> Any:
+        try:
+            return faiss.read_index(str(path), faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            # mmap is not supported for all index types
+            return faiss.read_index(str(path))
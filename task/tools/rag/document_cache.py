@@ -1,28 +1,83 @@
-from datetime import datetime, time, timedelta
-from typing import Any, Tuple
+import json
+import struct
+import sys
 import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+import faiss
+import numpy as np
+
+from task.tools.rag.disk_index_store import DiskIndexStore
+from task.utils.metrics import DOCUMENT_CACHE_EVICTIONS, DOCUMENT_CACHE_REQUESTS, METRICS
+from task.utils.shared_cache import SharedCache
+
+_SHARED_TTL_SECONDS = 24 * 60 * 60
+# Expired entries are swept on `set` at most once per interval
+_SWEEP_INTERVAL_SECONDS = 60
 
 
 class DocumentCache:
     """
-    Thread-safe document cache with automatic cleanup at midnight.
-    Removes entries older than 24 hours.
+    Thread-safe in-memory LRU cache of document indexes, bounded by memory budget and idle TTL.
+
+    - Size of every entry is accounted: FAISS vectors (`ntotal * d * 4`) plus chunk strings
+    - Least recently used entries are evicted on `set` once `max_bytes` is exceeded
+    - Entries (and aliases) not accessed for `idle_ttl_seconds` expire, they are removed lazily on access
+      and swept on `set`, there is no background thread
+
+    With `shared_cache` set, entries are written through to the shared tier, so other workers
+    can load the index instead of re-embedding the document.
+    With `disk_store` set, entries are also persisted on disk and survive restarts.
+
+    Aliases map other keys (e.g. conversation + file URL, file URL + ETag) to entry keys, so one entry
+    can be shared by many conversations. At most `max_aliases` aliases are kept, least recently used are dropped.
     """
 
-    def __init__(self):
-        self._cache: dict[str, Tuple[Any, Any, datetime]] = {}
+    def __init__(
+            self,
+            shared_cache: Optional[SharedCache] = None,
+            disk_store: Optional[DiskIndexStore] = None,
+            max_bytes: int = 2 * 1024 * 1024 * 1024,
+            idle_ttl_seconds: float = 24 * 60 * 60,
+            max_aliases: int = 10_000,
+    ):
+        # key -> (index, chunks, spans, size in bytes, last access time), ordered from least recently used
+        self._cache: OrderedDict[str, Tuple[Any, Any, np.ndarray, int, float]] = OrderedDict()
+        # alias -> (key, last access time), ordered from least recently used
+        self._aliases: OrderedDict[str, Tuple[str, float]] = OrderedDict()
         self._lock = threading.Lock()
-        self._cleanup_thread = None
-        self._stop_event = threading.Event()
-        self._running = False
+        self._shared_cache = shared_cache
+        self._disk_store = disk_store
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_aliases = max_aliases
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+        METRICS.gauge("gpa_document_cache_entries", "Number of documents in DocumentCache", self.size)
+        METRICS.gauge("gpa_document_cache_bytes", "Estimated memory of documents in DocumentCache",
+                      lambda: self._total_bytes)
 
     @classmethod
-    def create(cls) ->'DocumentCache':
-        instance = cls()
-        instance.start_cleanup_task()
-        return instance
+    def create(
+            cls,
+            shared_cache: Optional[SharedCache] = None,
+            disk_store: Optional[DiskIndexStore] = None,
+            max_bytes: int = 2 * 1024 * 1024 * 1024,
+            idle_ttl_seconds: float = 24 * 60 * 60,
+            max_aliases: int = 10_000,
+    ) -> 'DocumentCache':
+        return cls(
+            shared_cache=shared_cache,
+            disk_store=disk_store,
+            max_bytes=max_bytes,
+            idle_ttl_seconds=idle_ttl_seconds,
+            max_aliases=max_aliases,
+        )
 
-    def get(self, key: str) -> Tuple[Any, Any] | None:
+    def get(self, key: str) -> Tuple[Any, Any, np.ndarray] | None:
         """
         Retrieve a cached entry.
 
@@ -30,18 +85,24 @@ class DocumentCache:
             key: Cache key
 
         Returns:
-            Tuple of (index, chunks) if found and not expired, None otherwise
+            Tuple of (index, chunks, spans) if found and not expired, None otherwise
         """
+        now = time.monotonic()
         with self._lock:
             if key in self._cache:
-                index, chunks, timestamp = self._cache[key]
-                if datetime.now() - timestamp < timedelta(hours=24):
-                    return (index, chunks)
-                else:
-                    del self._cache[key]
-            return None
+                index, chunks, spans, size, last_access = self._cache[key]
+                if now - last_access < self.idle_ttl_seconds:
+                    self._cache[key] = (index, chunks, spans, size, now)
+                    self._cache.move_to_end(key)
+                    self._stats["hits"] += 1
+                    DOCUMENT_CACHE_REQUESTS.inc(result="hit")
+                    return (index, chunks, spans)
+                self._remove(key, reason="idle")
+            self._stats["misses"] += 1
 
-    def set(self, key: str, index: Any, chunks: Any) -> None:
+        return self._get_disk(key) or self._get_shared(key)
+
+    def set(self, key: str, index: Any, chunks: Any, spans: np.ndarray) -> None:
         """
         Store an entry in the cache.
 
@@ -49,75 +110,240 @@ class DocumentCache:
             key: Cache key
             index: FAISS index
             chunks: Document chunks
+            spans: (page, start offset, end offset) of every chunk, int64 array of shape (n, 3)
+        """
+        self._put(key, index, chunks, spans)
+
+        if self._disk_store is not None:
+            self._disk_store.save(key, index, chunks, spans)
+
+        if self._shared_cache is not None:
+            try:
+                data = self._serialize(index, chunks, spans)
+                self._shared_cache.set(self._shared_key(key), data, _SHARED_TTL_SECONDS)
+            except Exception as e:
+                print(f"[DocumentCache] Unable to write entry to shared cache: {e}")
+
+    def get_alias(self, alias: str) -> str | None:
+        """
+        Resolve alias to the entry key.
+
+        Returns:
+            Entry key if alias is known and not expired, None otherwise
+        """
+        now = time.monotonic()
+        with self._lock:
+            if alias in self._aliases:
+                key, last_access = self._aliases[alias]
+                if now - last_access < self.idle_ttl_seconds:
+                    self._aliases[alias] = (key, now)
+                    self._aliases.move_to_end(alias)
+                    return key
+                del self._aliases[alias]
+
+        if self._shared_cache is None:
+            return None
+
+        try:
+            data = self._shared_cache.get(self._shared_alias_key(alias))
+        except Exception as e:
+            print(f"[DocumentCache] Unable to read alias from shared cache: {e}")
+            return None
+        if data is None:
+            return None
+
+        key = data.decode('utf-8')
+        self._put_alias(alias, key)
+        return key
+
+    def set_alias(self, alias: str, key: str) -> None:
         """
+        Point alias to the entry key.
+
+        Args:
+            alias: Alias key
+            key: Cache key of the entry
+        """
+        self._put_alias(alias, key)
+
+        if self._shared_cache is not None:
+            try:
+                self._shared_cache.set(self._shared_alias_key(alias), key.encode('utf-8'), _SHARED_TTL_SECONDS)
+            except Exception as e:
+                print(f"[DocumentCache] Unable to write alias to shared cache: {e}")
+
+    def _get_disk(self, key: str) -> Tuple[Any, Any, np.ndarray] | None:
+        if self._disk_store is None:
+            return None
+
+        loaded = self._disk_store.load(key)
+        if loaded is None:
+            return None
+
+        DOCUMENT_CACHE_REQUESTS.inc(result="disk_hit")
+        self._put(key, *loaded)
+        return loaded
+
+    def _get_shared(self, key: str) -> Tuple[Any, Any, np.ndarray] | None:
+        if self._shared_cache is None:
+            DOCUMENT_CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        try:
+            data = self._shared_cache.get(self._shared_key(key))
+        except Exception as e:
+            print(f"[DocumentCache] Unable to read entry from shared cache: {e}")
+            data = None
+        if data is None:
+            DOCUMENT_CACHE_REQUESTS.inc(result="miss")
+            return None
+
+        DOCUMENT_CACHE_REQUESTS.inc(result="shared_hit")
+        entry = self._deserialize(data)
+        self._put(key, *entry)
+        return entry
+
+    def _put(self, key: str, index: Any, chunks: Any, spans: np.ndarray) -> None:
+        size = self.entry_size(index, chunks, spans)
+        now = time.monotonic()
         with self._lock:
-            self._cache[key] = (index, chunks, datetime.now())
+            if key in self._cache:
+                self._remove(key)
+            if size > self.max_bytes:
+                # Entry doesn't fit the budget at all, it is served from disk/shared tier only
+                print(f"[DocumentCache] Entry of {size} bytes exceeds memory budget of {self.max_bytes} bytes")
+                return
+            self._cache[key] = (index, chunks, spans, size, now)
+            self._total_bytes += size
+
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._cache)), reason="budget")
+
+            if now - self._last_sweep >= _SWEEP_INTERVAL_SECONDS:
+                self._last_sweep = now
+                self._sweep_expired(now)
+
+    def _put_alias(self, alias: str, key: str) -> None:
+        with self._lock:
+            self._aliases[alias] = (key, time.monotonic())
+            self._aliases.move_to_end(alias)
+            while len(self._aliases) > self.max_aliases:
+                self._aliases.popitem(last=False)
+
+    def _remove(self, key: str, reason: str | None = None) -> None:
+        """Remove entry, must be called under lock."""
+        _, _, _, size, _ = self._cache.pop(key)
+        self._total_bytes -= size
+        if reason == "budget":
+            self._stats["evictions"] += 1
+        elif reason == "idle":
+            self._stats["expirations"] += 1
+        if reason:
+            DOCUMENT_CACHE_EVICTIONS.inc(reason=reason)
+
+    def _sweep_expired(self, now: float) -> int:
+        """
+        Remove expired entries and aliases, must be called under lock.
+        Both dicts are ordered by last access, so only expired items at the front are visited.
+        """
+        cutoff = now - self.idle_ttl_seconds
+        removed_count = 0
+        while self._cache:
+            key, (_, _, _, _, last_access) = next(iter(self._cache.items()))
+            if last_access >= cutoff:
+                break
+            self._remove(key, reason="idle")
+            removed_count += 1
+
+        while self._aliases:
+            alias, (_, last_access) = next(iter(self._aliases.items()))
+            if last_access >= cutoff:
+                break
+            del self._aliases[alias]
+
+        return removed_count
+
+    @staticmethod
+    def entry_size(index: Any, chunks: Any, spans: np.ndarray) -> int:
+        """
+        Estimated memory of the entry in bytes: float32 vectors of the index plus chunk strings and spans.
+        Chunks and spans memory-mapped from disk live in the page cache and are not counted.
+        """
+        size = index.ntotal * index.d * 4
+        if isinstance(chunks, list):
+            size += sum(sys.getsizeof(chunk) for chunk in chunks)
+        if not isinstance(spans, np.memmap):
+            size += spans.nbytes
+        return size
+
+    @staticmethod
+    def _shared_key(key: str) -> str:
+        return f"document-index:{key}"
+
+    @staticmethod
+    def _shared_alias_key(alias: str) -> str:
+        return f"document-alias:{alias}"
+
+    @staticmethod
+    def _serialize(index: Any, chunks: list[str], spans: np.ndarray) -> bytes:
+        """
+        Format: 8 bytes length of FAISS index, serialized FAISS index, 8 bytes length of spans,
+        int64 spans, JSON list of chunks.
+        """
+        index_bytes = faiss.serialize_index(index).tobytes()
+        spans_bytes = np.ascontiguousarray(spans, dtype='<i8').tobytes()
+        return b"".join([
+            struct.pack('<Q', len(index_bytes)),
+            index_bytes,
+            struct.pack('<Q', len(spans_bytes)),
+            spans_bytes,
+            json.dumps(list(chunks)).encode('utf-8'),
+        ])
+
+    @staticmethod
+    def _deserialize(data: bytes) -> Tuple[Any, list[str], np.ndarray]:
+        (index_size,) = struct.unpack_from('<Q', data)
+        index_bytes = np.frombuffer(data, dtype=np.uint8, count=index_size, offset=8)
+        index = faiss.deserialize_index(index_bytes)
+        offset = 8 + index_size
+        (spans_size,) = struct.unpack_from('<Q', data, offset)
+        spans = np.frombuffer(data, dtype='<i8', count=spans_size // 8, offset=offset + 8).reshape(-1, 3)
+        chunks = json.loads(data[offset + 8 + spans_size:].decode('utf-8'))
+        return index, chunks, spans
 
     def clear(self) -> None:
         """Clear all cached entries."""
         with self._lock:
             self._cache.clear()
+            self._aliases.clear()
+            self._total_bytes = 0
 
     def cleanup_old_entries(self) -> int:
         """
-        Remove entries older than 24 hours.
+        Remove entries and aliases not accessed for `idle_ttl_seconds`.
 
         Returns:
             Number of entries removed
         """
-        now = datetime.now()
-        cutoff_time = now - timedelta(hours=24)
-
+        now = time.monotonic()
         with self._lock:
-            keys_to_remove = [
-                key for key, (_, _, timestamp) in self._cache.items()
-                if timestamp < cutoff_time
-            ]
-
-            for key in keys_to_remove:
-                del self._cache[key]
-
-            removed_count = len(keys_to_remove)
-            if removed_count > 0:
-                print(f"[DocumentCache] Cleaned up {removed_count} expired entries at {now}")
+            self._last_sweep = now
+            removed_count = self._sweep_expired(now)
 
-            return removed_count
+        if removed_count > 0:
+            print(f"[DocumentCache] Cleaned up {removed_count} expired entries")
+        return removed_count
 
-    def _schedule_midnight_cleanup(self) -> None:
-        """Background thread that runs cleanup at midnight every day."""
-        while not self._stop_event.is_set():
-            now = datetime.now()
-            tomorrow = now + timedelta(days=1)
-            midnight = datetime.combine(tomorrow.date(), time.min)
-            seconds_until_midnight = (midnight - now).total_seconds()
-
-            if self._stop_event.wait(timeout=seconds_until_midnight):
-                break
-
-            if not self._stop_event.is_set():
-                self.cleanup_old_entries()
-
-    def start_cleanup_task(self) -> None:
-        """Start the background cleanup thread."""
-        if not self._running:
-            self._running = True
-            self._stop_event.clear()
-            self._cleanup_thread = threading.Thread(
-                target=self._schedule_midnight_cleanup,
-                daemon=True,
-                name="DocumentCache-Cleanup"
-            )
-            self._cleanup_thread.start()
-            print("[DocumentCache] Started automatic cleanup thread (runs at midnight)")
-
-    def stop_cleanup_task(self) -> None:
-        """Stop the background cleanup thread."""
-        if self._running:
-            self._running = False
-            self._stop_event.set()
-            if self._cleanup_thread and self._cleanup_thread.is_alive():
-                self._cleanup_thread.join(timeout=5)
-            print("[DocumentCache] Stopped automatic cleanup thread")
+    def stats(self) -> dict[str, Any]:
+        """Return cache metrics: counters, number of entries and aliases, memory usage and budget."""
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._cache),
+                "aliases": len(self._aliases),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+            }
 
     def size(self) -> int:
         """Return the number of cached entries."""
@@ -126,4 +352,4 @@ class DocumentCache:
 
     def __contains__(self, key: str) -> bool:
         """Check if a key exists in the cache (and is not expired)."""
-        return self.get(key) is not None
\ No newline at end of file
+        return self.get(key) is not None
@@ -0,0 +1,156 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+from task.utils.metrics import EMBEDDING_CACHE_REQUESTS, METRICS
+
+# Disk tier is trimmed every N inserts, not on each of them
+_DISK_EVICTION_INTERVAL = 1_000
+
+
+class ChunkEmbeddingCache:
+    """
+    Cache of chunk embeddings keyed by hash of the model name and chunk text.
+
+    Re-uploaded edited documents and boilerplate shared by many documents (contracts, policies) are mostly
+    made of chunks that were already embedded, so only new or changed chunks hit the model.
+
+    - Memory tier: LRU bounded by `max_bytes`
+    - Optional disk tier: SQLite file at `path` (shared by worker processes), bounded by `max_disk_entries`
+      with eviction of least recently used rows (rows are marked as used when they are read from disk)
+    """
+
+    def __init__(
+            self,
+            model_name: str,
+            max_bytes: int = 128 * 1024 * 1024,
+            path: Optional[str] = None,
+            max_disk_entries: int = 2_000_000,
+    ):
+        self.model_name = model_name
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self._inserts_since_eviction = 0
+        if path:
+            self._db = self._open_db(path)
+        METRICS.gauge("gpa_chunk_embedding_cache_bytes", "Memory of cached chunk embeddings", lambda: self._memory_bytes)
+
+    def key(self, chunk: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{chunk}".encode('utf-8')).hexdigest()
+
+    def get_many(self, chunks: Sequence[str]) -> list[np.ndarray | None]:
+        """Return cached embeddings aligned with chunks, None for chunks that are not cached."""
+        keys = [self.key(chunk) for chunk in chunks]
+        result: list[np.ndarray | None] = [None] * len(keys)
+        missing: dict[str, list[int]] = {}
+
+        with self._lock:
+            for position, key in enumerate(keys):
+                embedding = self._memory.get(key)
+                if embedding is not None:
+                    self._memory.move_to_end(key)
+                    result[position] = embedding
+                else:
+                    missing.setdefault(key, []).append(position)
+
+        if missing and self._db is not None:
+            for key, embedding in self._load_from_disk(list(missing)).items():
+                for position in missing.pop(key):
+                    result[position] = embedding
+                self._put_memory(key, embedding)
+
+        hits = len(keys) - sum(len(positions) for positions in missing.values())
+        EMBEDDING_CACHE_REQUESTS.inc(hits, result="hit")
+        EMBEDDING_CACHE_REQUESTS.inc(len(keys) - hits, result="miss")
+        return result
+
+    def set_many(self, chunks: Sequence[str], embeddings: np.ndarray) -> None:
+        keys = [self.key(chunk) for chunk in chunks]
+        vectors = [np.array(embedding, dtype='float32') for embedding in embeddings]
+        for key, vector in zip(keys, vectors):
+            self._put_memory(key, vector)
+
+        if self._db is not None:
+            self._save_to_disk(keys, vectors)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            stats = {"entries": len(self._memory), "bytes": self._memory_bytes}
+            if self._db is not None:
+                stats["disk_entries"] = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return stats
+
+    def _put_memory(self, key: str, embedding: np.ndarray) -> None:
+        with self._lock:
+            previous = self._memory.pop(key, None)
+            if previous is not None:
+                self._memory_bytes -= previous.nbytes
+            self._memory[key] = embedding
+            self._memory_bytes += embedding.nbytes
+            while self._memory_bytes > self.max_bytes and self._memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= evicted.nbytes
+
+    def _load_from_disk(self, keys: list[str]) -> dict[str, np.ndarray]:
+        loaded: dict[str, np.ndarray] = {}
+        try:
+            with self._lock:
+                # SQLite limits number of query parameters
+                for start in range(0, len(keys), 500):
+                    batch = keys[start:start + 500]
+                    placeholders = ",".join("?" * len(batch))
+                    rows = self._db.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, vector in rows:
+                        loaded[key] = np.frombuffer(vector, dtype='float32')
+                    self._db.execute(
+                        f"UPDATE embeddings SET accessed_at = ? WHERE key IN ({placeholders})", [time.time(), *batch]
+                    )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"[ChunkEmbeddingCache] Unable to read embeddings from disk: {e}")
+        return loaded
+
+    def _save_to_disk(self, keys: list[str], vectors: list[np.ndarray]) -> None:
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, accessed_at) VALUES (?, ?, ?)",
+                    [(key, vector.tobytes(), now) for key, vector in zip(keys, vectors)],
+                )
+                self._inserts_since_eviction += len(keys)
+                if self._inserts_since_eviction >= _DISK_EVICTION_INTERVAL:
+                    self._inserts_since_eviction = 0
+                    self._db.execute(
+                        "DELETE FROM embeddings WHERE key IN ("
+                        "SELECT key FROM embeddings ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                        (self.max_disk_entries,),
+                    )
+                self._db.commit()
+        except sqlite3.Error as e:
+            print(f"[ChunkEmbeddingCache] Unable to write embeddings to disk: {e}")
+
+    @staticmethod
+    def _open_db(path: str) -> sqlite3.Connection:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # Connection is used from indexer threads, access is serialized with the lock
+        db = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at)")
+        db.commit()
+        return db
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Iterator
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+from task.tools.rag.ann_index import AnnIndexConfig, build_adaptive_index, create_flat_index, normalize
+from task.tools.rag.chunking import TokenChunker
+from task.tools.rag.embedding_cache import ChunkEmbeddingCache
+from task.utils.metrics import EMBEDDING_BATCH_SIZE
+
+
+@dataclass
+class IndexingProgress:
+    """State of the incremental indexing job, updated after every embedded batch."""
+    index: Any
+    chunks: list[str] = field(default_factory=list)
+    # (page number, start offset, end offset) of every chunk within its page text
+    spans: list[tuple[int, int, int]] = field(default_factory=list)
+    pages: int = 0
+    done: bool = False
+    # Chunks which embeddings were taken from the chunk embedding cache
+    cached_chunks: int = 0
+
+    @property
+    def cache_hit_ratio(self) -> float:
+        return self.cached_chunks / len(self.chunks) if self.chunks else 0.0
+
+    def spans_array(self) -> np.ndarray:
+        return np.asarray(self.spans, dtype=np.int64).reshape(-1, 3)
+
+
+class StreamingDocumentIndexer:
+    """
+    Page-incremental indexing pipeline: pages -> chunks -> batched embeddings -> index append.
+
+    Only one batch of chunks is embedded at a time, so peak memory doesn't depend on the document size
+    (besides chunks and index that are kept for retrieval).
+
+    With `embedding_cache` set, only chunks missing in the cache are encoded.
+    Normalized embeddings are collected in exact inner product index, once all pages are indexed it is
+    rebuilt into ANN index if the document is large (see `AnnIndexConfig`).
+    """
+
+    def __init__(
+            self,
+            model: SentenceTransformer,
+            chunker: TokenChunker,
+            dimension: int = 384,
+            batch_size: int = 64,
+            index_config: AnnIndexConfig | None = None,
+            embedding_cache: ChunkEmbeddingCache | None = None,
+    ):
+        self.model = model
+        self.chunker = chunker
+        self.dimension = dimension
+        self.batch_size = batch_size
+        self.index_config = index_config or AnnIndexConfig()
+        self.embedding_cache = embedding_cache
+
+    def iter_index(self, pages: Iterable[str], split_pages: bool = True) -> Iterator[IndexingProgress]:
+        """
+        Sync generator, yields progress after each batch is added to the index.
+        With `split_pages=False` every page is indexed as one chunk (e.g. CSV row groups).
+        Empty pages are counted, but not indexed, so page numbers in `spans` match the file.
+        """
+        progress = IndexingProgress(index=create_flat_index(self.dimension))
+        pending: list[str] = []
+
+        for page_text in pages:
+            progress.pages += 1
+            if not page_text:
+                continue
+            offsets = self.chunker.split_offsets(page_text) if split_pages else [(0, len(page_text))]
+            for start, end in offsets:
+                pending.append(page_text[start:end])
+                progress.spans.append((progress.pages, start, end))
+            while len(pending) >= self.batch_size:
+                batch, pending = pending[:self.batch_size], pending[self.batch_size:]
+                self._add_batch(progress, batch)
+                yield progress
+
+        if pending:
+            self._add_batch(progress, pending)
+
+        progress.index = build_adaptive_index(progress.index, self.index_config)
+        progress.done = True
+        yield progress
+
+    async def index(
+            self,
+            pages: Iterable[str],
+            on_progress: Callable[[IndexingProgress], None] | None = None,
+            split_pages: bool = True,
+    ) -> IndexingProgress:
+        """
+        Runs pipeline off the event loop, batch by batch in a worker thread.
+        `on_progress` is called on the event loop, so it can safely write to stage.
+        """
+        iterator = self.iter_index(pages, split_pages)
+        while True:
+            progress: IndexingProgress = await asyncio.to_thread(next, iterator)
+            if on_progress:
+                on_progress(progress)
+            if progress.done:
+                return progress
+
+    def _add_batch(self, progress: IndexingProgress, batch: list[str]) -> None:
+        progress.index.add(normalize(self._encode(progress, batch)))
+        progress.chunks.extend(batch)
+
+    def _encode(self, progress: IndexingProgress, batch: list[str]) -> np.ndarray:
+        if self.embedding_cache is None:
+            EMBEDDING_BATCH_SIZE.observe(len(batch), component="rag_index")
+            return self.model.encode(batch)
+
+        embeddings = self.embedding_cache.get_many(batch)
+        missing = [position for position, embedding in enumerate(embeddings) if embedding is None]
+        progress.cached_chunks += len(batch) - len(missing)
+        if missing:
+            missing_chunks = [batch[position] for position in missing]
+            EMBEDDING_BATCH_SIZE.observe(len(missing_chunks), component="rag_index")
+            encoded = self.model.encode(missing_chunks)
+            self.embedding_cache.set_many(missing_chunks, encoded)
+            for position, embedding in zip(missing, encoded):
+                embeddings[position] = embedding
+        return np.vstack(embeddings)
+
+
+class StageProgressReporter:
+    """
+    Reports indexing progress to the stage, at most once per `interval` seconds.
+    `label` tells apart concurrently indexed documents.
+    """
+
+    def __init__(self, append_content: Callable[[str], None], interval: float = 1.0, label: str | None = None):
+        self._append_content = append_content
+        self._interval = interval
+        self._prefix = f"{label}: " if label else ""
+        self._last_reported_at = 0.0
+
+    def __call__(self, progress: IndexingProgress) -> None:
+        now = time.monotonic()
+        if progress.done or now - self._last_reported_at >= self._interval:
+            self._last_reported_at = now
+            status = "Indexed" if progress.done else "Indexing..."
+            cached = f", from cache: {progress.cache_hit_ratio:.0%}" if progress.cached_chunks else ""
+            self._append_content(
+                f"{self._prefix}{status} pages: {progress.pages}, chunks: {len(progress.chunks)}{cached}\n\r"
+            )
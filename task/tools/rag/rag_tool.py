@@ -1,50 +1,107 @@
+import asyncio
+import hashlib
 import json
-from typing import Any
+from pathlib import Path
+from typing import Any, NamedTuple, Optional
 
-import faiss
 import numpy as np
 from aidial_client import AsyncDial
 from aidial_sdk.chat_completion import Message, Role
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from sentence_transformers import SentenceTransformer
 
 from task.tools.base import BaseTool
 from task.tools.models import ToolCallParams
+from task.tools.rag.ann_index import AnnIndexConfig, apply_search_params, normalize
+from task.tools.rag.chunking import create_model_chunker
 from task.tools.rag.document_cache import DocumentCache
+from task.tools.rag.embedding_cache import ChunkEmbeddingCache
+from task.tools.rag.indexing import StageProgressReporter, StreamingDocumentIndexer
 from task.utils.dial_file_conent_extractor import DialFileContentExtractor
+from task.utils.embeddings import EMBEDDING_MODEL_NAME, get_embedding_model
+from task.utils.extracted_text_cache import ExtractedTextCache
+from task.utils.metrics import EMBEDDING_BATCH_SIZE
+from task.utils.shared_cache import SharedCache, TieredCache
+from task.utils.stream_buffer import BufferedContentWriter
+
+# Part of the index key: index built with another model or chunking is not reusable
+_INDEX_CONFIG = f"{EMBEDDING_MODEL_NAME}:tokens-window-25-paged:pdf-page-numbers:csv-row-groups:adaptive-ip"
+
+# Retrieved chunks per document, merged top-k of multi-document search is capped with `_MAX_TOP_K`
+_TOP_K_PER_DOCUMENT = 3
+_MAX_TOP_K = 10
+# Retrieval mode returns as many of the top chunks as fit the token budget
+_RETRIEVAL_TOP_K = 20
+# Token count estimate for budgeting when the model tokenizer is not available: ~4 characters per token for English
+# text with common tokenizers
+_CHARS_PER_TOKEN = 4
+
+# `answer`: chunks are passed to inner completion which answers the request
+# `retrieve`: ranked chunks are returned as tool result, orchestrating model answers itself
+MODE_ANSWER = "answer"
+MODE_RETRIEVE = "retrieve"
 
 _SYSTEM_PROMPT = """You are a helpful assistant that answers questions based on provided document context.
 
 You will receive:
-- CONTEXT: Retrieved relevant excerpts from a document
+- CONTEXT: Retrieved relevant excerpts from one or more documents, each excerpt is marked with its source
 - REQUEST: The user's question or search query
 
 Instructions:
 - Answer the request using only the information in the provided context
 - If the context doesn't contain enough information to answer, clearly state that
+- When excerpts come from several documents, mention which document the information comes from
 - Be concise and direct in your response"""
 
 
 class RagTool(BaseTool):
 
-    def __init__(self, endpoint: str, deployment_name: str, document_cache: DocumentCache):
+    def __init__(
+            self,
+            endpoint: str,
+            deployment_name: str,
+            document_cache: DocumentCache,
+            shared_cache: Optional[SharedCache] = None,
+            index_config: Optional[AnnIndexConfig] = None,
+            embedding_cache: Optional[ChunkEmbeddingCache] = None,
+            text_cache: Optional[ExtractedTextCache] = None,
+            mode: str = MODE_ANSWER,
+            retrieval_token_budget: int = 2_000,
+    ):
+        if mode not in (MODE_ANSWER, MODE_RETRIEVE):
+            raise ValueError(f"Unsupported RAG mode: {mode}")
         self.endpoint = endpoint
         self.deployment_name = deployment_name
         self.document_cache = document_cache
+        self.text_cache = text_cache
+        self.mode = mode
+        self.retrieval_token_budget = retrieval_token_budget
 
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.model = get_embedding_model(EMBEDDING_MODEL_NAME)
+        self.query_embeddings_cache: TieredCache[np.ndarray] = TieredCache(
+            namespace=f"query-embedding:{EMBEDDING_MODEL_NAME}:normalized",
+            dumps=lambda embedding: embedding.astype('float32').tobytes(),
+            loads=lambda data: np.frombuffer(data, dtype='float32').reshape(1, -1),
+            shared_cache=shared_cache,
+            l1_max_entries=1024,
+            ttl_seconds=24 * 60 * 60,
+        )
 
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=50,
-            length_function=len,
-            separators=["\n\n", "\n", ". ", " ", ""]
+        self.chunker = create_model_chunker(self.model, overlap_tokens=25)
+        self.index_config = index_config or AnnIndexConfig()
+        self.indexer = StreamingDocumentIndexer(
+            model=self.model,
+            chunker=self.chunker,
+            index_config=self.index_config,
+            embedding_cache=embedding_cache,
         )
 
     @property
     def show_in_stage(self) -> bool:
         return False
 
+    @property
+    def result_cache_ttl(self) -> float | None:
+        return 600
+
     @property
     def name(self) -> str:
         return "rag_tool"
@@ -56,8 +113,14 @@ class RagTool(BaseTool):
                 "Use this tool when user asks questions about document content, needs specific information from large files, "
                 "or wants to search for particular topics/keywords. "
                 "Don't use it when: user wants to read entire document sequentially. "
-                "HOW IT WORKS: Splits document into chunks, finds top 3 most relevant sections using semantic search, "
-                "then generates answer based only on those sections.")
+                "Pass all documents relevant to the question in one call, they are searched together. "
+                "HOW IT WORKS: Splits documents into chunks, finds the most relevant sections across all documents "
+                "using semantic search. "
+                f"Mode `{MODE_ANSWER}`: generates answer based only on top sections (3 per document, 10 at most) "
+                "with their sources. "
+                f"Mode `{MODE_RETRIEVE}`: returns ranked sections with relevance scores, sources and positions, "
+                "answer the request yourself based on them. "
+                f"Default mode: `{self.mode}`.")
 
     @property
     def parameters(self) -> dict[str, Any]:
@@ -68,52 +131,72 @@ class RagTool(BaseTool):
                     "type": "string",
                     "description": "The search query or question to search for in the document"
                 },
-                "file_url": {
+                "file_urls": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "URLs of the files to search in"
+                },
+                "mode": {
                     "type": "string",
-                    "description": "File URL"
+                    "enum": [MODE_ANSWER, MODE_RETRIEVE],
+                    "description": "Whether to get generated answer or relevant document sections",
+                    "default": self.mode
                 },
             },
-            "required": ["request", "file_url"],
+            "required": ["request", "file_urls"],
         }
 
     async def _execute(self, tool_call_params: ToolCallParams) -> str | Message:
         arguments = json.loads(tool_call_params.tool_call.function.arguments)
         request = arguments["request"]
-        file_url = arguments["file_url"]
+        file_urls = arguments.get("file_urls")
+        if file_urls is None and arguments.get("file_url"):
+            # `file_url` is the single-document argument of previous tool versions (e.g. in conversation history)
+            file_urls = [arguments["file_url"]]
+        mode = arguments.get("mode") or self.mode
 
         stage = tool_call_params.stage
+        if mode not in (MODE_ANSWER, MODE_RETRIEVE):
+            content = f"Error: Unsupported mode `{mode}`, use `{MODE_ANSWER}` or `{MODE_RETRIEVE}`."
+            stage.append_content(f"{content}\n")
+            return content
+        if not isinstance(file_urls, list) or not file_urls or not all(
+                isinstance(file_url, str) and file_url for file_url in file_urls):
+            content = "Error: `file_urls` must be a non-empty list of file URLs."
+            stage.append_content(f"{content}\n")
+            return content
+        file_urls = list(dict.fromkeys(file_urls))
+
         stage.append_content("## Request arguments: \n")
         stage.append_content(f"**Request**: {request}\n\r")
-        stage.append_content(f"**Document URL**: {file_url}\n")
-
-        cache_document_key = f"{tool_call_params.conversation_id}:{file_url}"
-        cached_data = self.document_cache.get(cache_document_key)
-        if cached_data is not None:
-            index, chunks = cached_data
-        else:
-            text_content = DialFileContentExtractor(
-                endpoint=self.endpoint,
-                api_key=tool_call_params.api_key
-            ).extract_text(file_url)
-
-            if not text_content:
-                stage.append_content("## Response: \n")
-                content = "Error: File content not found."
-                stage.append_content(f"{content}\n")
-                return content
-
-            chunks = self.text_splitter.split_text(text_content)
-            embeddings = self.model.encode(chunks)
-            index = faiss.IndexFlatL2(384)
-            index.add(np.array(embeddings).astype('float32'))
-            self.document_cache.set(cache_document_key, index, chunks)
-
-        query_embedding = self.model.encode([request]).astype('float32')
-        k = min(3, len(chunks))
-        distances, indices = index.search(query_embedding, k=k)
-
-        retrieved_chunks = [chunks[idx] for idx in indices[0]]
-        augmented_prompt = self.__augmentation(request, retrieved_chunks)
+        for file_url in file_urls:
+            stage.append_content(f"**Document URL**: {file_url}\n")
+
+        documents = await asyncio.gather(
+            *(self.__get_document_index_or_none(file_url, tool_call_params) for file_url in file_urls)
+        )
+        indexed_documents = [
+            (file_url, cached_data) for file_url, cached_data in zip(file_urls, documents) if cached_data is not None
+        ]
+        if not indexed_documents:
+            stage.append_content("## Response: \n")
+            content = "Error: File content not found."
+            stage.append_content(f"{content}\n")
+            return content
+
+        query_embedding = await self.__encode_query(request)
+        missing_urls = [file_url for file_url, cached_data in zip(file_urls, documents) if cached_data is None]
+
+        if mode == MODE_RETRIEVE:
+            retrieved_chunks = self.__search(query_embedding, indexed_documents, self.index_config, _RETRIEVAL_TOP_K)
+            content = self.__pack_retrieved_chunks(request, retrieved_chunks, missing_urls)
+            stage.append_content("## Response: \n")
+            stage.append_content(f"```text\n\r{content}\n\r```\n\r")
+            return content
+
+        top_k = min(_TOP_K_PER_DOCUMENT * len(indexed_documents), _MAX_TOP_K)
+        retrieved_chunks = self.__search(query_embedding, indexed_documents, self.index_config, top_k)
+        augmented_prompt = self.__augmentation(request, retrieved_chunks, missing_urls)
         stage.append_content(f"## RAG Request: \n")
         stage.append_content(f"```text\n\r{augmented_prompt}\n\r```\n\r")
         stage.append_content("## Response: \n")
@@ -139,16 +222,218 @@ class RagTool(BaseTool):
         )
 
         content = ''
-        async for chunk in chunks_stream:
-            if chunk.choices and len(chunk.choices) > 0:
-                delta = chunk.choices[0].delta
-                if delta and delta.content:
-                    tool_call_params.stage.append_content(delta.content)
-                    content += delta.content
+        with BufferedContentWriter(tool_call_params.stage) as stage_writer:
+            async for chunk in chunks_stream:
+                if chunk.choices and len(chunk.choices) > 0:
+                    delta = chunk.choices[0].delta
+                    if delta and delta.content:
+                        stage_writer.append_content(delta.content)
+                        content += delta.content
 
         return content
 
-    def __augmentation(self, request: str, chunks: list[str]) -> str:
-        """Combine retrieved chunks with the user's request."""
-        joined_chunks = "\n\n".join(chunks)
-        return f"CONTEXT:\n{joined_chunks}\n---\nREQUEST: {request}"
+    async def __get_document_index_or_none(
+            self,
+            file_url: str,
+            tool_call_params: ToolCallParams,
+    ) -> tuple[Any, list[str], np.ndarray] | None:
+        """Failure of one document (no access, too big, extraction error) doesn't fail search in the others."""
+        try:
+            return await self.__get_document_index(file_url, tool_call_params)
+        except Exception as e:
+            print(f"[RagTool] Unable to get index of {file_url}: {e!r}")
+            return None
+
+    async def __get_document_index(
+            self,
+            file_url: str,
+            tool_call_params: ToolCallParams,
+    ) -> tuple[Any, list[str], np.ndarray] | None:
+        """
+        Get FAISS index, chunks and chunk spans of the document.
+
+        Indexes are content-addressed (hash of file bytes + index config), so the same document attached in
+        many conversations is indexed once. Access is tracked with aliases:
+        - `conversation:{conversation_id}:{file_url}`: document was already accessed in this conversation
+        - `etag:{file_url}:{etag}`: ETag is fetched with the user API key (access check), skips download on hit
+        """
+        conversation_alias = f"conversation:{tool_call_params.conversation_id}:{file_url}"
+        # Lookups can load index from disk or shared cache, so they are made off the event loop like `set`
+        document_key = await asyncio.to_thread(self.document_cache.get_alias, conversation_alias)
+        if document_key and (cached_data := await asyncio.to_thread(self.document_cache.get, document_key)) is not None:
+            return cached_data
+
+        extractor = DialFileContentExtractor(
+            endpoint=self.endpoint,
+            api_key=tool_call_params.api_key
+        )
+
+        etag_alias = None
+        try:
+            etag = await extractor.aget_etag(file_url)
+        except Exception as e:
+            print(f"[RagTool] Unable to get ETag of {file_url}: {e}")
+            etag = None
+        if etag:
+            etag_alias = f"etag:{file_url}:{etag}"
+            document_key = await asyncio.to_thread(self.document_cache.get_alias, etag_alias)
+            if document_key and (
+                    cached_data := await asyncio.to_thread(self.document_cache.get, document_key)) is not None:
+                await asyncio.to_thread(self.document_cache.set_alias, conversation_alias, document_key)
+                return cached_data
+
+        # Text extracted for FileContentExtractionTool (or previous indexing) is reused from the text cache
+        extracted_text = await extractor.aextract(file_url, self.text_cache, etag=etag)
+        suffix = Path(extracted_text.filename).suffix.lower()
+        document_key = f"{extracted_text.content_hash}:{suffix}:{_INDEX_CONFIG}"
+
+        cached_data = await asyncio.to_thread(self.document_cache.get, document_key)
+        if cached_data is None:
+            tool_call_params.stage.append_content(f"## Indexing {extracted_text.filename}: \n")
+            progress = await self.indexer.index(
+                pages=extracted_text.pages(),
+                on_progress=StageProgressReporter(
+                    tool_call_params.stage.append_content, label=extracted_text.filename
+                ),
+                # CSV pages are row groups with the table header, sized to be chunks as they are
+                split_pages=suffix != '.csv',
+            )
+            if not progress.chunks:
+                return None
+            print(f"[RagTool] Indexed {extracted_text.filename}: {len(progress.chunks)} chunks, "
+                  f"{progress.cache_hit_ratio:.0%} of embeddings from cache")
+
+            cached_data = (progress.index, progress.chunks, progress.spans_array())
+            await asyncio.to_thread(self.document_cache.set, document_key, *cached_data)
+
+        await asyncio.to_thread(self.document_cache.set_alias, conversation_alias, document_key)
+        if etag_alias:
+            await asyncio.to_thread(self.document_cache.set_alias, etag_alias, document_key)
+
+        return cached_data
+
+    async def __encode_query(self, request: str) -> np.ndarray:
+        key = hashlib.sha256(request.encode('utf-8')).hexdigest()
+        query_embedding = await self.query_embeddings_cache.aget(key)
+        if query_embedding is None:
+            EMBEDDING_BATCH_SIZE.observe(1, component="rag_query")
+            query_embedding = normalize(self.model.encode([request]))
+            await self.query_embeddings_cache.aset(key, query_embedding)
+        return query_embedding
+
+    @staticmethod
+    def __search(
+            query_embedding: np.ndarray,
+            documents: list[tuple[str, tuple[Any, list[str], np.ndarray]]],
+            index_config: AnnIndexConfig,
+            top_k: int,
+    ) -> list['RetrievedChunk']:
+        """
+        Merged top-k over per-document indexes. Scores are cosine similarities of the same model,
+        so they are comparable across documents.
+        """
+        candidates = []
+        for file_url, (index, chunks, _) in documents:
+            apply_search_params(index, index_config)
+            k = min(top_k, len(chunks))
+            scores, indices = index.search(query_embedding, k=k)
+            candidates.extend(
+                (float(score), file_url, int(idx)) for score, idx in zip(scores[0], indices[0]) if idx >= 0
+            )
+
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        documents_by_url = {file_url: document for file_url, document in documents}
+        retrieved = []
+        for score, file_url, idx in candidates[:top_k]:
+            _, chunks, spans = documents_by_url[file_url]
+            page, start, end = (int(value) for value in spans[idx]) if idx < len(spans) else (None, None, None)
+            retrieved.append(RetrievedChunk(file_url, idx, chunks[idx], score, page, start, end))
+        return retrieved
+
+    @staticmethod
+    def __augmentation(request: str, chunks: list['RetrievedChunk'], missing_urls: list[str]) -> str:
+        """Combine retrieved chunks, marked with their sources, with the user's request."""
+        joined_chunks = "\n\n".join(f"[Source: {chunk.citation}]\n{chunk.text}" for chunk in chunks)
+        missing = "".join(f"\n[Content of {file_url} not found]" for file_url in missing_urls)
+        return f"CONTEXT:\n{joined_chunks}{missing}\n---\nREQUEST: {request}"
+
+    def __pack_retrieved_chunks(
+            self,
+            request: str,
+            chunks: list['RetrievedChunk'],
+            missing_urls: list[str],
+    ) -> str:
+        """
+        Format ranked chunks as tool result, taking chunks in relevance order while they fit the token budget.
+        Chunks that don't fit are skipped, so a smaller lower-ranked chunk can still be included.
+        """
+        budget = self.retrieval_token_budget
+        sections = []
+        for rank, chunk in enumerate(chunks, start=1):
+            section = f"[{rank}] score: {chunk.score:.3f}, source: {chunk.citation}\n{chunk.text}"
+            tokens = self.__count_tokens(section)
+            if tokens > budget:
+                continue
+            budget -= tokens
+            sections.append(section)
+
+        if not sections and chunks:
+            # Even the best chunk doesn't fit, return its beginning
+            chunk = chunks[0]
+            section = f"[1] score: {chunk.score:.3f}, source: {chunk.citation}\n{chunk.text}"
+            sections.append(self.__truncate_to_tokens(section, self.retrieval_token_budget))
+
+        header = f"Relevant sections for request: {request}\nSections are ordered by relevance score (cosine similarity)."
+        missing = "".join(f"\n[Content of {file_url} not found]" for file_url in missing_urls)
+        return header + missing + "\n\n" + "\n\n".join(sections)
+
+    def __token_offsets(self, text: str) -> list[tuple[int, int]] | None:
+        """Character offsets of the embedding model tokens, None if the model has no fast tokenizer."""
+        tokenizer = self.chunker.tokenizer
+        if tokenizer is None:
+            return None
+        encoding = tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+        return encoding["offset_mapping"]
+
+    def __count_tokens(self, text: str) -> int:
+        offsets = self.__token_offsets(text)
+        return len(offsets) if offsets is not None else _estimate_tokens(text)
+
+    def __truncate_to_tokens(self, text: str, max_tokens: int) -> str:
+        offsets = self.__token_offsets(text)
+        if offsets is None:
+            return text[:max_tokens * _CHARS_PER_TOKEN]
+        if len(offsets) <= max_tokens:
+            return text
+        return text[:offsets[max_tokens - 1][1]]
+
+
+class RetrievedChunk(NamedTuple):
+    file_url: str
+    position: int
+    text: str
+    score: float
+    # Page number (row group number for CSV) and character offsets of the chunk within the page text
+    page: int | None
+    start: int | None
+    end: int | None
+
+    @property
+    def citation(self) -> str:
+        if self.page is None:
+            return f"{self.file_url}, chunk #{self.position + 1}"
+        if Path(self.file_url).suffix.lower() == '.csv':
+            # Every CSV row group is indexed as a whole chunk
+            return f"{self.file_url}, row group {self.page}"
+        return f"{self.file_url}, page {self.page}, characters {self.start}-{self.end}"
+
+
+def _estimate_tokens(text: str) -> int:
+    return len(text) // _CHARS_PER_TOKEN + 1
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Awaitable, Callable, Tuple
+
+from task.utils.metrics import METRICS, TOOL_RESULT_CACHE_REQUESTS
+
+
+class ToolResultCache:
+    """
+    In-process LRU cache for results of idempotent tool calls.
+
+    - Key: tool name + canonicalized JSON arguments + optional per-user scope
+    - TTL: provided per tool on each lookup
+    - Bounds: max number of entries and max total size of cached results
+    - Single-flight: concurrent identical calls share one execution
+    - Only string results are cached (Messages with attachments are never cached)
+    - Failed calls are never cached: tools report failures by raising (e.g. `MCPToolError`), the error is passed
+      to the caller and to the coalesced waiters, the next call executes again
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, Tuple[str, str, int, float]] = OrderedDict()
+        self._total_bytes = 0
+        self._in_flight: dict[str, asyncio.Future] = {}
+        self._stats: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0, "evictions": 0, "expirations": 0}
+        )
+        METRICS.gauge("gpa_tool_result_cache_entries", "Number of cached tool results", self.size)
+        METRICS.gauge("gpa_tool_result_cache_bytes", "Size of cached tool results", lambda: self._total_bytes)
+
+    @staticmethod
+    def make_key(tool_name: str, arguments: dict[str, Any], scope: str | None = None) -> str:
+        """Build cache key from tool name, canonicalized arguments and optional scope (e.g. per-user)."""
+        canonical_arguments = json.dumps(arguments, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        digest = hashlib.sha256(canonical_arguments.encode('utf-8')).hexdigest()
+        if scope:
+            scope_digest = hashlib.sha256(scope.encode('utf-8')).hexdigest()[:16]
+            return f"{tool_name}:{scope_digest}:{digest}"
+        return f"{tool_name}:{digest}"
+
+    async def get_or_execute(
+            self,
+            tool_name: str,
+            key: str,
+            ttl_seconds: float,
+            execute: Callable[[], Awaitable[Any]],
+    ) -> Tuple[Any, bool]:
+        """
+        Return cached result for key or execute the call once for all concurrent callers.
+
+        Returns:
+            Tuple of (result, served_from_cache)
+        """
+        stats = self._stats[tool_name]
+
+        cached = self._get(key)
+        if cached is not None:
+            stats["hits"] += 1
+            TOOL_RESULT_CACHE_REQUESTS.inc(tool=tool_name, result="hit")
+            return cached, True
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            stats["coalesced"] += 1
+            TOOL_RESULT_CACHE_REQUESTS.inc(tool=tool_name, result="coalesced")
+            try:
+                return await asyncio.shield(in_flight), True
+            except asyncio.CancelledError:
+                if not in_flight.cancelled():
+                    raise
+                # Leader call was cancelled, retry on behalf of this caller
+                return await self.get_or_execute(tool_name, key, ttl_seconds, execute)
+
+        stats["misses"] += 1
+        TOOL_RESULT_CACHE_REQUESTS.inc(tool=tool_name, result="miss")
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark exception as retrieved, waiters (if any) re-raise it on their side
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            if isinstance(result, str):
+                self._set(tool_name, key, result, ttl_seconds)
+            return result, False
+        finally:
+            self._in_flight.pop(key, None)
+
+    def _get(self, key: str) -> str | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        tool_name, value, size, expires_at = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self._stats[tool_name]["expirations"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        return value
+
+    def _set(self, tool_name: str, key: str, value: str, ttl_seconds: float) -> None:
+        size = len(value.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (tool_name, value, size, time.monotonic() + ttl_seconds)
+        self._total_bytes += size
+
+        while self._entries and (len(self._entries) > self.max_entries or self._total_bytes > self.max_bytes):
+            evicted_key = next(iter(self._entries))
+            evicted_tool_name = self._entries[evicted_key][0]
+            self._remove(evicted_key)
+            self._stats[evicted_tool_name]["evictions"] += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._total_bytes -= entry[2]
+
+    def clear(self) -> None:
+        """Clear all cached results."""
+        self._entries.clear()
+        self._total_bytes = 0
+
+    def size(self) -> int:
+        """Return the number of cached results."""
+        return len(self._entries)
+
+    def stats(self) -> dict[str, Any]:
+        """Return cache metrics: per-tool counters plus global size."""
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "tools": {tool_name: dict(counters) for tool_name, counters in self._stats.items()},
+        }
@@ -0,0 +1,146 @@
+import bisect
+import csv
+import io
+import sys
+from array import array
+from dataclasses import dataclass
+from typing import BinaryIO, Iterable, Iterator
+
+_ENCODING = "utf-8"
+
+
+def markdown_row(cells: Iterable[str]) -> str:
+    """Render cells as markdown table row. Cells are rendered as they are, the caller pads short rows."""
+    return "| " + " | ".join(_markdown_cell(cell) for cell in cells) + " |"
+
+
+def is_blank_row(cells: Iterable[str]) -> bool:
+    """Row without any value: empty or whitespace-only line, or only empty cells. Such rows are not rendered."""
+    return not any(cell.strip() for cell in cells)
+
+
+def markdown_header(columns: Iterable[str]) -> str:
+    """Header row and delimiter row of markdown table."""
+    columns = list(columns)
+    return markdown_row(columns) + "\n" + markdown_row(["---"] * len(columns))
+
+
+def _markdown_cell(value: str) -> str:
+    return value.replace("\r\n", " ").replace("\n", " ").replace("\r", " ").replace("|", "\\|")
+
+
+def _open_source(source: bytes | str) -> BinaryIO:
+    """CSV content, or file by path."""
+    return io.BytesIO(source) if isinstance(source, bytes) else open(source, "rb")
+
+
+def _iter_lines(source: io.BufferedIOBase, position: list[int]) -> Iterator[str]:
+    """Decoded lines of the source, `position[0]` is byte offset right after the last yielded line."""
+    for line in iter(source.readline, b""):
+        position[0] += len(line)
+        yield line.decode(_ENCODING, errors="ignore")
+
+
+@dataclass(frozen=True)
+class CsvDocument:
+    """
+    CSV file rendered as markdown table on demand.
+
+    Only the offset index is built upfront: byte offset of every row in the source and character offset of every
+    rendered line (header block first, then one line per row). `window` parses and renders only the rows that
+    intersect the requested character range, so the whole table is never materialized.
+    `source` is CSV content, or path of the file for big CSVs: only rows of the requested window are read from it.
+    """
+    filename: str
+    content_hash: str
+    source: bytes | str
+    header: str
+    # Number of columns, shorter rows are padded with empty cells (like `pd.read_csv` does)
+    width: int
+    # Byte offsets in `source`: row i is parsed from source[row_offsets[i]:row_offsets[i + 1]]
+    row_offsets: array
+    # Character offsets of rendered lines: line 0 is `header`, line i + 1 is row i, last item is a sentinel
+    line_starts: array
+
+    @classmethod
+    def build(cls, filename: str, content_hash: str, source: bytes | str) -> 'CsvDocument':
+        return cls(filename, content_hash, source, *build_csv_index(source))
+
+    @property
+    def rows_count(self) -> int:
+        return len(self.row_offsets) - 1
+
+    @property
+    def total_chars(self) -> int:
+        return self.line_starts[-1] - 1
+
+    @property
+    def size_bytes(self) -> int:
+        # File of the source is not counted, only what is kept in memory
+        source_size = len(self.source) if isinstance(self.source, bytes) else sys.getsizeof(self.source)
+        return (source_size + sys.getsizeof(self.header)
+                + self.row_offsets.itemsize * len(self.row_offsets)
+                + self.line_starts.itemsize * len(self.line_starts))
+
+    def window(self, start: int, end: int) -> str:
+        """Rendered text in the character range [start, end)."""
+        end = min(end, self.total_chars)
+        if start >= end:
+            return ""
+
+        first_line = max(bisect.bisect_right(self.line_starts, start) - 1, 0)
+        last_line = bisect.bisect_left(self.line_starts, end)
+        lines = []
+        if first_line == 0:
+            lines.append(self.header)
+        first_row, last_row = max(first_line - 1, 0), last_line - 1
+        if first_row < last_row:
+            lines.extend(self._render_rows(first_row, last_row))
+
+        offset = self.line_starts[first_line]
+        return "".join(line + "\n" for line in lines)[start - offset:end - offset]
+
+    def _render_rows(self, first: int, last: int) -> Iterator[str]:
+        start, end = self.row_offsets[first], self.row_offsets[last]
+        with _open_source(self.source) as f:
+            f.seek(start)
+            data = f.read(end - start).decode(_ENCODING, errors="ignore")
+        for row in csv.reader(io.StringIO(data, newline="")):
+            if not is_blank_row(row):
+                yield markdown_row(_pad(row, self.width))
+
+
+def _pad(row: list[str], width: int) -> list[str]:
+    return row + [""] * (width - len(row)) if len(row) < width else row
+
+
+def build_csv_index(source: bytes | str) -> tuple[str, int, array, array]:
+    """
+    Single pass over CSV (content or path of the file): returns rendered header block (header and delimiter rows),
+    number of columns, byte offsets of data rows and character offsets of rendered lines. Blank rows are skipped
+    (see `is_blank_row`).
+    """
+    with _open_source(source) as f:
+        return _build_index(f)
+
+
+def _build_index(source: BinaryIO) -> tuple[str, int, array, array]:
+    position = [0]
+    reader = csv.reader(_iter_lines(source, position))
+
+    header_row = next((row for row in reader if not is_blank_row(row)), None)
+    if header_row is None:
+        return "", 0, array("q", [0]), array("q", [1])
+    header_row[0] = header_row[0].lstrip("\ufeff")
+    header = markdown_header(header_row)
+    width = len(header_row)
+
+    row_offsets = array("q", [position[0]])
+    line_starts = array("q", [0, len(header) + 1])
+    for row in reader:
+        if is_blank_row(row):
+            continue
+        row_offsets.append(position[0])
+        line_starts.append(line_starts[-1] + len(markdown_row(_pad(row, width))) + 1)
+
+    return header, width, row_offsets, line_starts
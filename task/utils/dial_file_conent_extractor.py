@@ -1,66 +1,482 @@
+import asyncio
+import hashlib
 import io
+import multiprocessing
+import os
+import tempfile
+import time
+import weakref
+from array import array
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Awaitable, BinaryIO, Callable, Iterator, Optional
 
+import httpx
 import pdfplumber
 import pandas as pd
-from aidial_client import Dial
+from aidial_client import AsyncDialClientPool
 from bs4 import BeautifulSoup
 
+from task.utils.csv_document import CsvDocument, build_csv_index, is_blank_row, markdown_header, markdown_row
+from task.utils.extracted_text_cache import ExtractedText, ExtractedTextCache
+from task.utils.metrics import FILE_DOWNLOAD_BYTES, FILE_EXTRACTION_DURATION, FILE_EXTRACTION_ERRORS
+
+# Parsing of downloaded files runs in process pool, so heavy PDF/CSV parsing doesn't block the event loop
+FILE_EXTRACTION_WORKERS = int(os.getenv('FILE_EXTRACTION_WORKERS', min(4, os.cpu_count() or 1)))
+MAX_FILE_SIZE = int(os.getenv('MAX_FILE_SIZE', 100 * 1024 * 1024))
+# Downloads bigger than this are spooled to a temporary file instead of memory
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+# PDFs with at least this number of pages are extracted in parallel, page ranges are split across workers
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', 16))
+_PDF_MIN_PAGES_PER_RANGE = 4
+# CSV is read by pandas in chunks of this number of rows
+CSV_CHUNK_ROWS = int(os.getenv('CSV_CHUNK_ROWS', 10_000))
+# For RAG, CSV pages are row groups (header + rows) up to this size, so a group fits the embedding model window
+CSV_ROW_GROUP_CHARS = 800
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_extraction_semaphore: Optional[asyncio.Semaphore] = None
+_http_client: Optional[httpx.AsyncClient] = None
+_dial_client_pool: Optional[AsyncDialClientPool] = None
+
+
+def configure_extraction_workers(workers: int) -> None:
+    """Change number of extraction worker processes, the pool is re-created on the next extraction."""
+    global FILE_EXTRACTION_WORKERS, _process_pool, _extraction_semaphore
+    FILE_EXTRACTION_WORKERS = workers
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+    _process_pool = None
+    _extraction_semaphore = None
 
-class DialFileContentExtractor:
 
-    def __init__(self, endpoint: str, api_key: str):
-        self.dial_client = Dial(
-            base_url=endpoint,
-            api_key=api_key,
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        # `spawn`: workers must not inherit event loop, threads and loaded models of the server process
+        _process_pool = ProcessPoolExecutor(
+            max_workers=FILE_EXTRACTION_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
         )
+    return _process_pool
+
+
+def _get_extraction_semaphore() -> asyncio.Semaphore:
+    global _extraction_semaphore
+    if _extraction_semaphore is None:
+        _extraction_semaphore = asyncio.Semaphore(FILE_EXTRACTION_WORKERS)
+    return _extraction_semaphore
+
+
+async def _run_in_process_pool(fn, *args):
+    """Run function in extraction process pool, number of concurrently running tasks is capped."""
+    async with _get_extraction_semaphore():
+        return await asyncio.get_running_loop().run_in_executor(_get_process_pool(), fn, *args)
+
+
+@contextmanager
+def _counting_errors(filename: str, file_extension: str) -> Iterator[None]:
+    """
+    Count and log extraction failures. Workers raise instead of returning empty text, so failures are counted
+    in the server process (exposed by `/metrics`) and failed extractions are not cached.
+    """
+    try:
+        yield
+    except Exception as e:
+        FILE_EXTRACTION_ERRORS.inc(extension=file_extension)
+        print(f"Error extracting text from {filename}: {str(e)}")
+        raise
+
+
+def _get_http_client() -> httpx.AsyncClient:
+    """Pooled HTTP client for streaming downloads, API key is passed per request."""
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.AsyncClient(timeout=httpx.Timeout(60.0, connect=10.0))
+    return _http_client
+
+
+def _get_dial_client_pool() -> AsyncDialClientPool:
+    """DIAL clients of all extractors (one per request) share connections of one HTTP client."""
+    global _dial_client_pool
+    if _dial_client_pool is None:
+        _dial_client_pool = AsyncDialClientPool()
+    return _dial_client_pool
+
+
+class DownloadedFile:
+    """
+    Downloaded file content, kept in memory up to `SPOOL_MAX_SIZE` and spooled to temporary file after that.
+    SHA-256 of the content is computed while downloading.
+    """
+
+    def __init__(self, filename: str, spool_max_size: int = SPOOL_MAX_SIZE):
+        self.filename = filename
+        self.size = 0
+        self._spool_max_size = spool_max_size
+        self._hash = hashlib.sha256()
+        self._buffer: Optional[bytearray] = bytearray()
+        self._file = None
+
+    def write(self, data: bytes) -> None:
+        self.size += len(data)
+        self._hash.update(data)
+        if self._buffer is not None:
+            self._buffer.extend(data)
+            if len(self._buffer) > self._spool_max_size:
+                self._spool()
+        else:
+            self._file.write(data)
+
+    def _spool(self) -> None:
+        self._file = tempfile.NamedTemporaryFile(prefix="gpa-download-", suffix=Path(self.filename).suffix,
+                                                 delete=False)
+        self._file.write(self._buffer)
+        self._buffer = None
+
+    def finish(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the spooled file, None if the content is in memory."""
+        return self._file.name if self._file is not None else None
+
+    def ensure_path(self) -> str:
+        """Spool in-memory content to temporary file (if not yet), so worker processes can open it by path."""
+        if self._buffer is not None:
+            self._spool()
+            self.finish()
+        return self._file.name
+
+    def read_bytes(self) -> bytes:
+        if self._buffer is not None:
+            return bytes(self._buffer)
+        with open(self._file.name, "rb") as f:
+            return f.read()
+
+    def open(self) -> BinaryIO:
+        if self._buffer is not None:
+            return io.BytesIO(self._buffer)
+        return open(self._file.name, "rb")
+
+    def detach(self) -> Optional[str]:
+        """Hand over the spooled file to the caller, it is not removed on `close`. None if content is in memory."""
+        if self._file is None:
+            return None
+        self._file.close()
+        path, self._file = self._file.name, None
+        return path
+
+    def close(self) -> None:
+        self._buffer = None
+        if self._file is not None:
+            self._file.close()
+            _remove_file(self._file.name)
+            self._file = None
+
+    def __enter__(self) -> 'DownloadedFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def _remove_file(path: str) -> None:
+    try:
+        os.unlink(path)
+    except OSError:
+        pass
+
+
+def _count_pdf_pages_worker(path: str) -> int:
+    with pdfplumber.open(path) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pdf_range_worker(path: str, filename: str, start: int, end: int) -> list[str]:
+    """
+    Process pool entry point: text of PDF pages [start, end), PDF is opened from the file by path.
+    Pages without text are kept as empty strings, so page numbers are preserved.
+    """
+    text = []
+    with pdfplumber.open(path, pages=range(start + 1, end + 1)) as pdf:
+        for page in pdf.pages:
+            text.append(page.extract_text() or "")
+            page.close()
+    return text
 
-    def extract_text(self, file_url: str) -> str:
-        file_download_response = self.dial_client.files.download(file_url)
-        filename = file_download_response.filename
-        file_content: bytes = file_download_response.get_content()
 
-        file_extension = Path(filename).suffix.lower()
-        text_content = self.__extract_text(file_content, file_extension, filename)
+def _build_csv_index_worker(source: bytes | str, filename: str) -> tuple[str, int, array, array]:
+    """Process pool entry point: offset index of CSV, `source` is file content or path of spooled file."""
+    return build_csv_index(source)
 
-        return text_content
 
-    def __extract_text(self, file_content: bytes, file_extension: str, filename: str) -> str:
-        """Extract text content based on file type."""
+def _extract_pages_worker(source: bytes | str, filename: str) -> list[str]:
+    """Process pool entry point, `source` is file content or path of spooled file."""
+    file_extension = Path(filename).suffix.lower()
+    if file_extension == '.csv':
+        # pandas reads spooled CSV from the file, without loading it into memory first
+        return _extract_pages(source, file_extension, filename)
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            source = f.read()
+    return _extract_pages(source, Path(filename).suffix.lower(), filename)
+
+
+class DialFileContentExtractor:
+
+    def __init__(self, endpoint: str, api_key: str, max_file_size: int = MAX_FILE_SIZE):
+        self.api_key = api_key
+        self.max_file_size = max_file_size
+        self.async_dial_client = _get_dial_client_pool().create_client(base_url=endpoint, api_key=api_key)
+
+    async def aextract_text(self, file_url: str) -> str:
+        """Text of the file: streamed download, parsing in process pool."""
+        with await self.adownload(file_url) as downloaded_file:
+            return await self.aextract_text_from_file(downloaded_file)
+
+    async def aextract(
+            self,
+            file_url: str,
+            cache: Optional[ExtractedTextCache] = None,
+            etag: Optional[str] = None,
+    ) -> ExtractedText:
+        """
+        Extract text with pages, using cache when provided:
+        - `{file_url}:{etag}` alias hit: no download
+        - content hash hit (same file under other URL/ETag): downloaded, but not parsed
+        """
+        return await self.__aextract_cached(file_url, cache, etag, "", self.__aextract_text)
+
+    async def aextract_paged(
+            self,
+            file_url: str,
+            cache: Optional[ExtractedTextCache] = None,
+            etag: Optional[str] = None,
+    ) -> ExtractedText | CsvDocument:
+        """
+        Same as `aextract`, but CSV files are returned as `CsvDocument`: only the offset index of rows is built,
+        markdown is rendered for the requested window. Cached under `csv:` keys. CSVs spooled to temporary file
+        while downloading are not loaded into memory: the document reads rows of the window from that file.
+        """
+        filename = self.async_dial_client.files.get_storage_resource(file_url).filename
+        if Path(filename).suffix.lower() != '.csv':
+            return await self.aextract(file_url, cache, etag)
+        return await self.__aextract_cached(file_url, cache, etag, "csv:", self.__aextract_csv_document)
+
+    async def __aextract_cached(
+            self,
+            file_url: str,
+            cache: Optional[ExtractedTextCache],
+            etag: Optional[str],
+            prefix: str,
+            extract: Callable[[DownloadedFile], Awaitable[ExtractedText | CsvDocument]],
+    ) -> ExtractedText | CsvDocument:
+        if cache is None:
+            with await self.adownload(file_url) as downloaded_file:
+                return await extract(downloaded_file)
+
+        alias = None
+        if etag is None:
+            try:
+                etag = await self.aget_etag(file_url)
+            except Exception as e:
+                print(f"Unable to get ETag of {file_url}: {e}")
+        if etag:
+            alias = f"{prefix}{file_url}:{etag}"
+            key = cache.get_alias(alias)
+            if key and (extracted := cache.get(key)) is not None:
+                return extracted
+
+        with await self.adownload(file_url) as downloaded_file:
+            # Same content is extracted differently depending on file type, so suffix is a part of the key
+            key = f"{prefix}{downloaded_file.sha256}:{Path(downloaded_file.filename).suffix.lower()}"
+            extracted = cache.get(key)
+            if extracted is None:
+                extracted = await extract(downloaded_file)
+                cache.set(key, extracted)
+
+        if alias:
+            cache.set_alias(alias, key)
+        return extracted
+
+    async def __aextract_text(self, downloaded_file: DownloadedFile) -> ExtractedText:
+        pages = await self.aextract_pages_from_file(downloaded_file)
+        return ExtractedText.from_pages(downloaded_file.filename, downloaded_file.sha256, pages)
+
+    async def __aextract_csv_document(self, downloaded_file: DownloadedFile) -> CsvDocument:
+        started = time.perf_counter()
+        source = downloaded_file.path or downloaded_file.read_bytes()
+        with _counting_errors(downloaded_file.filename, '.csv'):
+            index = await _run_in_process_pool(_build_csv_index_worker, source, downloaded_file.filename)
+        FILE_EXTRACTION_DURATION.observe(time.perf_counter() - started, extension='.csv')
+
+        document = CsvDocument(downloaded_file.filename, downloaded_file.sha256, source, *index)
+        if isinstance(source, str):
+            # Spooled file stays on disk while the document is alive (cached), windows read their rows from it
+            downloaded_file.detach()
+            weakref.finalize(document, _remove_file, source)
+        return document
+
+    async def adownload(self, file_url: str) -> DownloadedFile:
+        """
+        Stream file into `DownloadedFile` (memory or temporary file), without blocking the event loop.
+
+        Raises:
+            ValueError: if file is bigger than `max_file_size`
+        """
+        resource = self.async_dial_client.files.get_storage_resource(file_url)
+        downloaded_file = DownloadedFile(filename=resource.filename)
         try:
-            if file_extension == '.txt':
-                return file_content.decode('utf-8', errors='ignore')
-
-            elif file_extension == '.pdf':
-                pdf_file = io.BytesIO(file_content)
-                text = []
-                with pdfplumber.open(pdf_file) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text.append(page_text)
-                return '\n\n'.join(text)
-
-            elif file_extension == '.csv':
-                text_content = file_content.decode('utf-8', errors='ignore')
-                csv_buffer = io.StringIO(text_content)
-                df = pd.read_csv(csv_buffer)
-                return df.to_markdown(index=False)
-
-            elif file_extension in ['.html', '.htm']:
-                html_content = file_content.decode('utf-8', errors='ignore')
-                soup = BeautifulSoup(html_content, 'html.parser')
-
-                # Remove script and style elements
-                for script in soup(["script", "style"]):
-                    script.decompose()
-
-                return soup.get_text(separator='\n', strip=True)
+            async with _get_http_client().stream(
+                    "GET",
+                    resource.absolute_url,
+                    headers={"api-key": self.api_key},
+            ) as response:
+                response.raise_for_status()
+                async for data in response.aiter_bytes(64 * 1024):
+                    if downloaded_file.size + len(data) > self.max_file_size:
+                        raise ValueError(f"File {resource.filename} exceeds size limit of {self.max_file_size} bytes")
+                    downloaded_file.write(data)
+            downloaded_file.finish()
+        except BaseException:
+            downloaded_file.close()
+            raise
+
+        FILE_DOWNLOAD_BYTES.observe(downloaded_file.size)
+        return downloaded_file
+
+    async def aget_etag(self, file_url: str) -> str | None:
+        """ETag of the file. Request is made with the user API key, so it also checks user access to the file."""
+        return (await self.async_dial_client.files.get_metadata(file_url)).etag
 
+    async def aextract_text_from_file(self, downloaded_file: DownloadedFile) -> str:
+        """Parse downloaded file in process pool, number of concurrent parsings is capped."""
+        return '\n\n'.join(page for page in await self.aextract_pages_from_file(downloaded_file) if page)
+
+    async def aextract_pages_from_file(self, downloaded_file: DownloadedFile) -> list[str]:
+        """
+        Same as `aextract_text_from_file`, but returns text of every page: PDF pages (empty string for pages
+        without text), CSV row groups (see `CSV_ROW_GROUP_CHARS`) or single page for other file types.
+        """
+        started = time.perf_counter()
+        file_extension = Path(downloaded_file.filename).suffix.lower()
+        with _counting_errors(downloaded_file.filename, file_extension):
+            if file_extension == '.pdf' and FILE_EXTRACTION_WORKERS > 1:
+                pages = await self.__extract_pdf_pages_parallel(downloaded_file)
             else:
-                # Fallback: try to decode as text
-                return file_content.decode('utf-8', errors='ignore')
+                # Spooled files are passed by path, so big content is not pickled to the worker
+                source = downloaded_file.path or downloaded_file.read_bytes()
+                pages = await _run_in_process_pool(_extract_pages_worker, source, downloaded_file.filename)
+        FILE_EXTRACTION_DURATION.observe(time.perf_counter() - started, extension=file_extension)
+
+        return pages
+
+    async def __extract_pdf_pages_parallel(self, downloaded_file: DownloadedFile) -> list[str]:
+        """
+        Split page range of the PDF across worker processes. Workers open the PDF from temporary file,
+        pages are reassembled in order.
+        """
+        path = downloaded_file.ensure_path()
+        page_count = await _run_in_process_pool(_count_pdf_pages_worker, path)
+        if page_count < PDF_PARALLEL_MIN_PAGES:
+            return await _run_in_process_pool(_extract_pages_worker, path, downloaded_file.filename)
+
+        ranges_count = min(FILE_EXTRACTION_WORKERS, page_count // _PDF_MIN_PAGES_PER_RANGE)
+        bounds = [page_count * number // ranges_count for number in range(ranges_count + 1)]
+        ranges = await asyncio.gather(*(
+            _run_in_process_pool(_extract_pdf_range_worker, path, downloaded_file.filename, start, end)
+            for start, end in zip(bounds, bounds[1:])
+        ))
+        return [page for pages in ranges for page in pages]
+
+
+def _extract_pages(file_content: bytes | str, file_extension: str, filename: str) -> list[str]:
+    """
+    Extract text of PDF pages, pages without text are kept as empty strings, so page numbers are preserved.
+    CSV is split into row groups, each repeats the table header, so RAG indexes every group as a self-contained
+    chunk. Other file types are extracted as a single page.
+    `file_content` may be a path of spooled file for CSV.
+    """
+    if file_extension == '.csv':
+        return list(_iter_csv_row_groups(file_content))
+
+    if file_extension == '.pdf':
+        text = []
+        with pdfplumber.open(io.BytesIO(file_content)) as pdf:
+            for page in pdf.pages:
+                text.append(page.extract_text() or "")
+                page.close()
+        return text
+
+    text_content = _extract_document_text(file_content, file_extension, filename)
+    return [text_content] if text_content else []
+
+
+def _extract_document_text(file_content: bytes, file_extension: str, filename: str) -> str:
+    """Extract text content of non-paged file types."""
+    if file_extension == '.txt':
+        return file_content.decode('utf-8', errors='ignore')
+
+    elif file_extension in ['.html', '.htm']:
+        html_content = file_content.decode('utf-8', errors='ignore')
+        soup = BeautifulSoup(html_content, 'html.parser')
+
+        # Remove script and style elements
+        for script in soup(["script", "style"]):
+            script.decompose()
+
+        return soup.get_text(separator='\n', strip=True)
+
+    else:
+        # Fallback: try to decode as text
+        return file_content.decode('utf-8', errors='ignore')
+
+
+def _iter_csv_chunks(source: bytes | str) -> Iterator[tuple[str, list[str]]]:
+    """
+    Read CSV by `CSV_CHUNK_ROWS` rows, from the bytes without decoding them into one string, or from file path.
+    Yields markdown header and markdown rows of every chunk. Values are rendered as they are in the file
+    (no type inference), short rows are padded with empty cells and blank rows are skipped: the same rendering
+    as `CsvDocument`.
+    """
+    reader = pd.read_csv(
+        io.BytesIO(source) if isinstance(source, bytes) else source,
+        chunksize=CSV_CHUNK_ROWS,
+        dtype=str,
+        keep_default_na=False,
+        encoding='utf-8',
+        encoding_errors='ignore',
+    )
+    header = None
+    with reader:
+        for chunk in reader:
+            if header is None:
+                header = markdown_header(chunk.columns)
+            yield header, [
+                markdown_row(row) for row in chunk.itertuples(index=False, name=None) if not is_blank_row(row)
+            ]
+
 
-        except Exception as e:
-            print(f"Error extracting text from {filename}: {str(e)}")
-            return ""
+def _iter_csv_row_groups(source: bytes | str) -> Iterator[str]:
+    """Markdown tables of consecutive rows up to `CSV_ROW_GROUP_CHARS`, every table starts with the header."""
+    header, group, size = "", [], 0
+    for header, rows in _iter_csv_chunks(source):
+        for row in rows:
+            if group and size + len(row) > CSV_ROW_GROUP_CHARS:
+                yield header + "\n" + "\n".join(group)
+                group = []
+            if not group:
+                size = len(header)
+            group.append(row)
+            size += len(row) + 1
+    if group:
+        yield header + "\n" + "\n".join(group)
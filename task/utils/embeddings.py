@@ -0,0 +1,23 @@
+import threading
+
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+
+_models: dict[str, SentenceTransformer] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL_NAME) -> SentenceTransformer:
+    """
+    Returns process-wide SentenceTransformer instance for the model name.
+
+    Loaded once and shared by all tools. In multi-worker mode it is loaded in the master process before fork,
+    so workers share model weights copy-on-write.
+    """
+    with _lock:
+        model = _models.get(model_name)
+        if model is None:
+            model = SentenceTransformer(model_name)
+            _models[model_name] = model
+        return model
@@ -0,0 +1,128 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Iterator
+
+from task.utils.csv_document import CsvDocument
+from task.utils.metrics import CACHE_REQUESTS, METRICS
+
+_PAGE_SEPARATOR = "\n\n"
+
+
+@dataclass(frozen=True)
+class ExtractedText:
+    """
+    Text extracted from a file: pages joined with blank line into one string plus start offsets of the pages,
+    so both the whole text and pages are available without re-joining. Empty pages (e.g. scanned PDF pages) take
+    no room in the text, they start where the next page starts, so page numbers still match the file.
+    """
+    filename: str
+    content_hash: str
+    text: str
+    page_starts: tuple[int, ...]
+
+    @classmethod
+    def from_pages(cls, filename: str, content_hash: str, pages: list[str]) -> 'ExtractedText':
+        page_starts, offset = [], 0
+        for page in pages:
+            page_starts.append(offset)
+            if page:
+                offset += len(page) + len(_PAGE_SEPARATOR)
+        return cls(filename, content_hash, _PAGE_SEPARATOR.join(page for page in pages if page), tuple(page_starts))
+
+    def pages(self) -> Iterator[str]:
+        """Text of every page, empty pages included."""
+        for number, start in enumerate(self.page_starts):
+            next_start = self.page_starts[number + 1] if number + 1 < len(self.page_starts) else None
+            if next_start == start:
+                yield ""
+            else:
+                yield self.text[start:next_start - len(_PAGE_SEPARATOR) if next_start is not None else None]
+
+    @property
+    def total_chars(self) -> int:
+        return len(self.text)
+
+    def window(self, start: int, end: int) -> str:
+        """Text in the character range [start, end)."""
+        return self.text[start:end]
+
+    @property
+    def size_bytes(self) -> int:
+        return sys.getsizeof(self.text) + 8 * len(self.page_starts)
+
+
+class ExtractedTextCache:
+    """
+    In-process LRU cache of extracted file texts, bounded by size and TTL.
+
+    Entries are keyed by content hash and suffix of the file (`{sha256}:{suffix}`, the same bytes are extracted
+    differently as e.g. `.csv` and `.txt`). Aliases `{file_url}:{etag}` point to content keys, so a file
+    that didn't change is served without download (ETag is fetched with the user API key, which checks access).
+    Shared by FileContentExtractionTool (pagination) and RagTool (indexing). FileContentExtractionTool caches CSV
+    files as `CsvDocument` (offset index only) under keys with `csv:` prefix.
+    """
+
+    def __init__(self, max_bytes: int = 256 * 1024 * 1024, ttl_seconds: float = 60 * 60, max_aliases: int = 10_000):
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_aliases = max_aliases
+        # key -> (extracted text, expiration time), ordered from least recently used
+        self._entries: OrderedDict[str, tuple[ExtractedText | CsvDocument, float]] = OrderedDict()
+        self._aliases: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        METRICS.gauge("gpa_extracted_text_cache_bytes", "Size of cached extracted texts", lambda: self._total_bytes)
+
+    def get(self, key: str) -> ExtractedText | CsvDocument | None:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                CACHE_REQUESTS.inc(namespace="extracted-text", result="l1_hit")
+                return entry[0]
+            if entry is not None:
+                self._remove(key)
+        CACHE_REQUESTS.inc(namespace="extracted-text", result="miss")
+        return None
+
+    def set(self, key: str, value: ExtractedText | CsvDocument) -> None:
+        size = value.size_bytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds)
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def get_alias(self, alias: str) -> str | None:
+        with self._lock:
+            entry = self._aliases.get(alias)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self._aliases[alias]
+                return None
+            self._aliases.move_to_end(alias)
+            return entry[0]
+
+    def set_alias(self, alias: str, key: str) -> None:
+        with self._lock:
+            self._aliases[alias] = (key, time.monotonic() + self.ttl_seconds)
+            self._aliases.move_to_end(alias)
+            while len(self._aliases) > self.max_aliases:
+                self._aliases.popitem(last=False)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "aliases": len(self._aliases), "bytes": self._total_bytes}
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._entries.pop(key)
+        self._total_bytes -= value.size_bytes
@@ -1,4 +1,3 @@
-import copy
 from typing import Any
 
 from aidial_sdk.chat_completion import Message, Role
@@ -6,56 +5,100 @@ from aidial_sdk.chat_completion import Message, Role
 from task.utils.constants import TOOL_CALL_HISTORY_KEY, CUSTOM_CONTENT
 
 
+def _project_history_message(history_msg: dict[str, Any]) -> dict[str, Any]:
+    """Project message from tool call history of previous assistant message, source dict is not modified."""
+    if history_msg.get("role") == Role.TOOL.value:
+        return {
+            "role": Role.TOOL.value,
+            "content": history_msg.get("content"),
+            "tool_call_id": history_msg.get("tool_call_id"),
+        }
+    return history_msg
+
+
+def _strip_custom_content(history_msg: dict[str, Any]) -> dict[str, Any]:
+    """Message from tool call history of the current request without custom content, source dict is not modified."""
+    if history_msg.get(CUSTOM_CONTENT):
+        return {key: value for key, value in history_msg.items() if key != CUSTOM_CONTENT}
+    return history_msg
+
+
+def _unpack_message(message: Message, result: list[dict[str, Any]]) -> None:
+    if message.role == Role.ASSISTANT:
+        if custom_content := message.custom_content:
+            # Unpack tool call history from Assistant message State
+            state = custom_content.state
+            if state and isinstance(state, dict):
+                tool_call_history = state.get(TOOL_CALL_HISTORY_KEY)
+                if tool_call_history and isinstance(tool_call_history, list):
+                    for history_msg in tool_call_history:
+                        result.append(_project_history_message(history_msg))
+
+                result.append(message.dict(exclude_none=True, exclude={CUSTOM_CONTENT}))
+    else:
+        attachments_urls_content = ''
+        if message.custom_content and message.custom_content.attachments:
+            attachments_urls_content = '\n\nAttached files URLs:\n'
+            for attachment in message.custom_content.attachments:
+                if attachment.url:
+                    attachments_urls_content += f"{attachment.url}\n"
+                elif attachment.reference_url:
+                    attachments_urls_content += f"{attachment.reference_url}\n"
+
+        content = message.content or ''
+        if attachments_urls_content:
+            content += attachments_urls_content
+
+        result.append(
+            {
+                "role": message.role,
+                "content": content
+            }
+        )
+
+
 def unpack_messages(messages: list[Message], state_history: list[dict[str, Any]]) -> list[dict[str, Any]]:
     result: list[dict[str, Any]] = []
     for message in messages:
-        if message.role == Role.ASSISTANT:
-            if custom_content := message.custom_content:
-                # Unpack tool call history from Assistant message State
-                state = custom_content.state
-                if state and isinstance(state, dict):
-                    tool_call_history = state.get(TOOL_CALL_HISTORY_KEY)
-                    if tool_call_history and isinstance(tool_call_history, list):
-                        for history_msg in tool_call_history:
-                            if history_msg.get("role") == Role.TOOL.value:
-                                result.append(
-                                    {
-                                        "role": Role.TOOL.value,
-                                        "content": history_msg.get("content"),
-                                        "tool_call_id": history_msg.get("tool_call_id"),
-                                    }
-                                )
-                            else:
-                                result.append(history_msg)
-
-                    msg = copy.deepcopy(message)
-                    msg.custom_content = None
-                    result.append(msg.dict(exclude_none=True))
-        else:
-            attachments_urls_content = ''
-            if message.custom_content and message.custom_content.attachments:
-                attachments_urls_content = '\n\nAttached files URLs:\n'
-                for attachment in message.custom_content.attachments:
-                    if attachment.url:
-                        attachments_urls_content += f"{attachment.url}\n"
-                    elif attachment.reference_url:
-                        attachments_urls_content += f"{attachment.reference_url}\n"
-
-            content = message.content or ''
-            if attachments_urls_content:
-                content += attachments_urls_content
-
-            result.append(
-                {
-                    "role": message.role,
-                    "content": content
-                }
-            )
+        _unpack_message(message, result)
 
     if state_history:
         for history_msg in state_history:
-            if history_msg.get(CUSTOM_CONTENT):
-                del history_msg[CUSTOM_CONTENT]
-            result.append(history_msg)
+            result.append(_strip_custom_content(history_msg))
 
     return result
+
+
+class HistoryUnpacker:
+    """
+    Incremental version of `unpack_messages` for the rounds of one request.
+
+    Request messages are the same on every round of the agent loop, only tool call history of the current
+    request grows. The unpacked request messages are reused and only new history messages are appended.
+    """
+
+    def __init__(self):
+        self._messages: list[Message] | None = None
+        self._messages_count = 0
+        self._unpacked: list[dict[str, Any]] = []
+        self._state_history_count = 0
+
+    def unpack(self, messages: list[Message], state_history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """
+        Returns:
+            Unpacked messages. The list is owned by the unpacker, copy it before modifications.
+        """
+        if messages is not self._messages or len(messages) != self._messages_count \
+                or len(state_history) < self._state_history_count:
+            self._messages = messages
+            self._messages_count = len(messages)
+            self._unpacked = []
+            self._state_history_count = 0
+            for message in messages:
+                _unpack_message(message, self._unpacked)
+
+        for history_msg in state_history[self._state_history_count:]:
+            self._unpacked.append(_strip_custom_content(history_msg))
+        self._state_history_count = len(state_history)
+
+        return self._unpacked
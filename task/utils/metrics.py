@@ -0,0 +1,209 @@
+import bisect
+import threading
+from typing import Callable, Iterable
+
+_DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _format_labels(label_names: tuple[str, ...], label_values: tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+
+    def _label_values(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.label_names)
+
+    def samples(self) -> list[str]:
+        raise NotImplementedError()
+
+    def expose(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Iterable[str] = ()):
+        super().__init__(name, documentation, label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._label_values(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {value}" for key, value in values]
+
+
+class Gauge(_Metric):
+    """Gauge which value is read with the callback at scrape time (e.g. cache size)."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, callback: Callable[[], float]):
+        super().__init__(name, documentation)
+        self._callback = callback
+
+    def samples(self) -> list[str]:
+        try:
+            return [f"{self.name} {float(self._callback())}"]
+        except Exception as e:
+            print(f"[metrics] Unable to read gauge {self.name}: {e}")
+            return []
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            label_names: Iterable[str] = (),
+            buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [bucket counts..., +Inf count, sum]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._label_values(labels)
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            state[bucket_index] += 1
+            state[-1] += value
+
+    def samples(self) -> list[str]:
+        with self._lock:
+            values = [(key, list(state)) for key, state in self._values.items()]
+
+        lines = []
+        for key, state in values:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                bucket_labels = _format_labels(self.label_names, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            cumulative += state[len(self.buckets)]
+            bucket_labels = _format_labels(self.label_names, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {state[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Process-wide registry of metrics with Prometheus text exposition.
+
+    Hot path cost is a dict lookup and a lock per observation, so metrics are always on.
+    In multi-worker mode every worker has its own registry.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, label_names: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, documentation, label_names))
+
+    def histogram(
+            self,
+            name: str,
+            documentation: str,
+            label_names: Iterable[str] = (),
+            buckets: tuple[float, ...] = _DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(name, lambda: Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, callback: Callable[[], float]) -> Gauge:
+        """Registers gauge, the latest registered callback wins (e.g. cache re-created)."""
+        gauge = Gauge(name, documentation, callback)
+        with self._lock:
+            self._metrics[name] = gauge
+        return gauge
+
+    def _register(self, name: str, factory: Callable[[], _Metric]):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def expose(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.expose() for metric in metrics) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+TOOL_CALL_DURATION = METRICS.histogram(
+    "gpa_tool_call_duration_seconds", "Tool call duration including stage handling", ["tool"])
+TOOL_EXECUTE_DURATION = METRICS.histogram(
+    "gpa_tool_execute_duration_seconds", "Tool execution duration", ["tool"])
+TOOL_ERRORS = METRICS.counter(
+    "gpa_tool_errors_total", "Tool calls finished with error", ["tool"])
+TOOL_RESULT_CACHE_REQUESTS = METRICS.counter(
+    "gpa_tool_result_cache_requests_total", "Tool result cache lookups by result (hit/miss/coalesced)", ["tool", "result"])
+COMPLETION_TTFT = METRICS.histogram(
+    "gpa_completion_time_to_first_token_seconds", "Time to first streamed chunk of completion", ["deployment"])
+COMPLETION_DURATION = METRICS.histogram(
+    "gpa_completion_duration_seconds", "Duration of streamed completion", ["deployment"])
+DOCUMENT_CACHE_REQUESTS = METRICS.counter(
+    "gpa_document_cache_requests_total", "DocumentCache lookups by result (hit/disk_hit/shared_hit/miss)", ["result"])
+DOCUMENT_CACHE_EVICTIONS = METRICS.counter(
+    "gpa_document_cache_evictions_total", "Documents removed from DocumentCache memory by reason (budget/idle)",
+    ["reason"])
+CACHE_REQUESTS = METRICS.counter(
+    "gpa_cache_requests_total", "Tiered cache lookups by result (l1_hit/l2_hit/miss)", ["namespace", "result"])
+EMBEDDING_BATCH_SIZE = METRICS.histogram(
+    "gpa_embedding_batch_size", "Number of texts per embedding call", ["component"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024, 4096, 16384))
+EMBEDDING_CACHE_REQUESTS = METRICS.counter(
+    "gpa_chunk_embedding_cache_requests_total", "Chunk embedding cache lookups by result (hit/miss)", ["result"])
+MCP_CALL_DURATION = METRICS.histogram(
+    "gpa_mcp_call_duration_seconds", "MCP tool call duration", ["tool"])
+MCP_ERRORS = METRICS.counter(
+    "gpa_mcp_errors_total", "MCP tool calls failed with error", ["tool"])
+MCP_RECONNECTS = METRICS.counter(
+    "gpa_mcp_reconnects_total", "MCP pool session reconnects by reason (transport_error/health_check/disconnected)",
+    ["reason"])
+MCP_TOOL_CATALOG_REFRESHES = METRICS.counter(
+    "gpa_mcp_tool_catalog_refreshes_total", "MCP tool list refreshes by trigger (poll/notification) and result",
+    ["trigger", "result"])
+INTERPRETER_FILE_DURATION = METRICS.histogram(
+    "gpa_interpreter_file_duration_seconds", "Code interpreter file handling by step (fetch/upload)", ["step"])
+INTERPRETER_SESSION_REQUESTS = METRICS.counter(
+    "gpa_interpreter_session_requests_total",
+    "Interpreter session lookups for calls without session_id by result (bound/shared/warm/cold)", ["result"])
+FILE_EXTRACTION_DURATION = METRICS.histogram(
+    "gpa_file_extraction_duration_seconds", "Text extraction duration", ["extension"])
+FILE_EXTRACTION_ERRORS = METRICS.counter(
+    "gpa_file_extraction_errors_total", "Text extraction failures", ["extension"])
+FILE_DOWNLOAD_BYTES = METRICS.histogram(
+    "gpa_file_download_bytes", "Size of downloaded files", [],
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 5e7, 1e8))
@@ -0,0 +1,51 @@
+import asyncio
+import os
+import signal
+
+import uvicorn
+
+
+def serve_prefork(config: uvicorn.Config, workers: int) -> None:
+    """
+    Run `workers` uvicorn servers in forked processes sharing one listening socket.
+
+    Everything loaded before the call (embedding model, app module) is shared with workers copy-on-write.
+    Workers must not inherit running event loops or threads, so call it before any `asyncio.run`.
+    """
+    sock = config.bind_socket()
+    children: list[int] = []
+
+    for worker_number in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            exit_code = 0
+            try:
+                asyncio.run(uvicorn.Server(config).serve(sockets=[sock]))
+            except Exception as e:
+                print(f"[prefork] Worker #{worker_number} failed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children.append(pid)
+
+    print(f"[prefork] Started {workers} workers: {children}")
+
+    def _stop_children(signum, _frame):
+        for child_pid in children:
+            try:
+                os.kill(child_pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, _stop_children)
+    signal.signal(signal.SIGTERM, _stop_children)
+
+    for child_pid in children:
+        try:
+            os.waitpid(child_pid, 0)
+        except ChildProcessError:
+            pass
+
+    sock.close()
@@ -0,0 +1,207 @@
+import asyncio
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+from task.utils.metrics import CACHE_REQUESTS
+
+T = TypeVar('T')
+
+
+class SharedCache(ABC):
+    """
+    Byte-level cache shared between worker processes.
+
+    Implementations:
+    - `RedisSharedCache`: Redis from docker-compose (`redis://localhost:6379/0`)
+    - `InMemorySharedCache`: in-process stand-in for tests and single worker mode (`memory://`)
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        pass
+
+    @staticmethod
+    def from_url(url: str) -> 'SharedCache':
+        if url.startswith("memory://"):
+            return InMemorySharedCache()
+        if url.startswith(("redis://", "rediss://", "unix://")):
+            return RedisSharedCache(url)
+        raise ValueError(f"Unsupported shared cache URL: {url}")
+
+
+class InMemorySharedCache(SharedCache):
+    """Local stand-in of the shared cache tier, lives in the current process only."""
+
+    def __init__(self):
+        self._data: dict[str, tuple[bytes, float | None]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None) -> None:
+        expires_at = time.monotonic() + ttl_seconds if ttl_seconds else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+
+class RedisSharedCache(SharedCache):
+    """Shared cache tier on top of Redis. Requires `redis` package."""
+
+    def __init__(self, url: str, key_prefix: str = "gpa:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("`redis` package is required for Redis shared cache: pip install redis") from e
+
+        # Connection pool of redis-py re-creates connections after fork, so instance is safe to create pre-fork
+        self._client = redis.Redis.from_url(url)
+        self._key_prefix = key_prefix
+
+    def get(self, key: str) -> bytes | None:
+        return self._client.get(self._key_prefix + key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None) -> None:
+        self._client.set(self._key_prefix + key, value, ex=ttl_seconds)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._key_prefix + key)
+
+
+class TieredCache(Generic[T]):
+    """
+    Per-worker L1 LRU cache of deserialized objects in front of optional `SharedCache` (L2).
+
+    Values are serialized with `dumps`/`loads` only when they go to/come from L2.
+    Without shared cache it works as a plain bounded in-process cache.
+    Shared cache client is synchronous: on the event loop use `aget`/`aset`/`adelete`, they access L2 in a thread.
+    """
+
+    def __init__(
+            self,
+            namespace: str,
+            dumps: Callable[[T], bytes],
+            loads: Callable[[bytes], T],
+            shared_cache: Optional[SharedCache] = None,
+            l1_max_entries: int = 256,
+            ttl_seconds: Optional[int] = None,
+    ):
+        self.namespace = namespace
+        self._dumps = dumps
+        self._loads = loads
+        self._shared_cache = shared_cache
+        self._l1: OrderedDict[str, T] = OrderedDict()
+        self._l1_max_entries = l1_max_entries
+        self._ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> T | None:
+        value = self._get_l1(key)
+        if value is not None:
+            return value
+        return self._get_l2(key)
+
+    async def aget(self, key: str) -> T | None:
+        """Same as `get`, L2 is read in a thread, so slow or unreachable shared cache doesn't block the loop."""
+        value = self._get_l1(key)
+        if value is not None:
+            return value
+        if self._shared_cache is None:
+            return self._get_l2(key)
+        return await asyncio.to_thread(self._get_l2, key)
+
+    def set(self, key: str, value: T) -> None:
+        self._put_l1(key, value)
+        self._set_l2(key, value)
+
+    async def aset(self, key: str, value: T) -> None:
+        """Same as `set`, L2 is written in a thread."""
+        self._put_l1(key, value)
+        if self._shared_cache is not None:
+            await asyncio.to_thread(self._set_l2, key, value)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._l1.pop(key, None)
+        self._delete_l2(key)
+
+    async def adelete(self, key: str) -> None:
+        """Same as `delete`, L2 is updated in a thread."""
+        with self._lock:
+            self._l1.pop(key, None)
+        if self._shared_cache is not None:
+            await asyncio.to_thread(self._delete_l2, key)
+
+    def _get_l1(self, key: str) -> T | None:
+        with self._lock:
+            if key in self._l1:
+                self._l1.move_to_end(key)
+                CACHE_REQUESTS.inc(namespace=self.namespace, result="l1_hit")
+                return self._l1[key]
+        return None
+
+    def _get_l2(self, key: str) -> T | None:
+        if self._shared_cache is None:
+            CACHE_REQUESTS.inc(namespace=self.namespace, result="miss")
+            return None
+
+        try:
+            data = self._shared_cache.get(self._shared_key(key))
+        except Exception as e:
+            print(f"[TieredCache] Unable to read `{self.namespace}` from shared cache: {e}")
+            data = None
+        if data is None:
+            CACHE_REQUESTS.inc(namespace=self.namespace, result="miss")
+            return None
+
+        CACHE_REQUESTS.inc(namespace=self.namespace, result="l2_hit")
+        value = self._loads(data)
+        self._put_l1(key, value)
+        return value
+
+    def _set_l2(self, key: str, value: T) -> None:
+        if self._shared_cache is not None:
+            try:
+                self._shared_cache.set(self._shared_key(key), self._dumps(value), self._ttl_seconds)
+            except Exception as e:
+                print(f"[TieredCache] Unable to write `{self.namespace}` to shared cache: {e}")
+
+    def _delete_l2(self, key: str) -> None:
+        if self._shared_cache is not None:
+            try:
+                self._shared_cache.delete(self._shared_key(key))
+            except Exception as e:
+                print(f"[TieredCache] Unable to delete `{self.namespace}` from shared cache: {e}")
+
+    def _put_l1(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._l1[key] = value
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
@@ -0,0 +1,73 @@
+import asyncio
+import time
+from typing import Optional, Protocol
+
+
+class ContentSink(Protocol):
+    """Anything that streams content to the client (`Choice`, `Stage`)."""
+
+    def append_content(self, content: str) -> None:
+        ...
+
+
+class BufferedContentWriter:
+    """
+    Coalesces small content deltas before sending them to the client.
+
+    Every `append_content` call on `Choice`/`Stage` becomes a separate SSE chunk, upstream deltas are often just
+    a few characters. The writer buffers deltas and flushes them when the buffer reaches `max_bytes` or when
+    `max_delay` seconds passed since the first buffered delta. Call `flush()` on tool boundaries and stream end
+    (or use the writer as a context manager).
+    """
+
+    def __init__(self, sink: ContentSink, max_delay: float = 0.02, max_bytes: int = 256):
+        self.sink = sink
+        self.max_delay = max_delay
+        self.max_bytes = max_bytes
+        self._buffer: list[str] = []
+        self._buffered_size = 0
+        self._first_buffered_at = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def append_content(self, content: str) -> None:
+        if not content:
+            return
+
+        if not self._buffer:
+            self._first_buffered_at = time.monotonic()
+            self._schedule_flush()
+
+        self._buffer.append(content)
+        self._buffered_size += len(content)
+
+        if self._buffered_size >= self.max_bytes or time.monotonic() - self._first_buffered_at >= self.max_delay:
+            self.flush()
+
+    def flush(self) -> None:
+        """Send all buffered content to the sink as a single chunk."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        if not self._buffer:
+            return
+
+        content = ''.join(self._buffer)
+        self._buffer.clear()
+        self._buffered_size = 0
+        self.sink.append_content(content)
+
+    def _schedule_flush(self) -> None:
+        # Makes sure that buffered content is not stuck when upstream pauses between deltas
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._flush_handle = loop.call_later(self.max_delay, self.flush)
+
+    def __enter__(self) -> 'BufferedContentWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.flush()
+        return False
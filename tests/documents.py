@@ -0,0 +1,61 @@
+"""Synthetic documents for extraction tests."""
+import io
+import random
+
+_WORDS = ("agent memory document search tool user preference python report revenue quarter contract policy "
+          "section clause model embedding index vector answer question context").split()
+
+
+def page_text(rnd: random.Random, page: int) -> str:
+    """Five paragraphs, every one starts with `Section {page}.{paragraph}.`"""
+    return "\n\n".join(
+        f"Section {page}.{i}. " + " ".join(rnd.choice(_WORDS) for _ in range(90)) + "." for i in range(5)
+    )
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_pdf(page_texts: list[str]) -> bytes:
+    """Minimal text-only PDF (Helvetica, one text object per page), lines are wrapped by 14 words."""
+    objects: list[bytes] = []
+    page_count = len(page_texts)
+    font_id = 3 + 2 * page_count
+
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(page_count))
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {page_count} >>".encode())
+
+    for i, text in enumerate(page_texts):
+        lines = []
+        for paragraph in text.split("\n"):
+            words = paragraph.split()
+            while words:
+                lines.append(" ".join(words[:14]))
+                words = words[14:]
+        operations = ["BT", "/F1 9 Tf", "11 TL", "40 800 Td"]
+        operations += [f"({_pdf_escape(line)}) Tj T*" for line in lines[:70]]
+        operations.append("ET")
+        stream = "\n".join(operations).encode("latin-1", errors="ignore")
+
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref_offset = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset))
+    return output.getvalue()
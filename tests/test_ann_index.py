@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from task.tools.rag.ann_index import (
+    AnnIndexConfig,
+    apply_search_params,
+    build_adaptive_index,
+    create_flat_index,
+    describe,
+    normalize,
+)
+
+DIMENSION = 16
+
+
+def _flat_index(chunks_count: int):
+    index = create_flat_index(DIMENSION)
+    index.add(normalize(np.random.default_rng(0).standard_normal((chunks_count, DIMENSION))))
+    return index
+
+
+def test_small_document_keeps_flat_index():
+    flat_index = _flat_index(99)
+
+    index = build_adaptive_index(flat_index, AnnIndexConfig(flat_max_chunks=100))
+
+    assert index is flat_index
+    assert describe(index) == "flat"
+
+
+@pytest.mark.parametrize("ann_type", ["ivf", "hnsw"])
+def test_large_document_gets_ann_index(ann_type: str):
+    flat_index = _flat_index(400)
+    config = AnnIndexConfig(flat_max_chunks=100, ann_type=ann_type, ivf_nprobe=4, hnsw_ef_search=32)
+
+    index = build_adaptive_index(flat_index, config)
+
+    assert describe(index) == ann_type
+    assert index.ntotal == 400
+    # Every vector finds itself
+    queries = flat_index.reconstruct_n(0, 10)
+    _, ids = index.search(queries, 1)
+    assert ids[:, 0].tolist() == list(range(10))
+
+
+def test_search_params_applied_to_loaded_index():
+    index = build_adaptive_index(_flat_index(400), AnnIndexConfig(flat_max_chunks=100, ann_type="hnsw"))
+
+    apply_search_params(index, AnnIndexConfig(hnsw_ef_search=64))
+
+    assert index.hnsw.efSearch == 64
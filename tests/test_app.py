@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# `python -m task.app` (as in README), the server is replaced with one file extraction, so extraction workers
+# are spawned while `task.app` is the main module
+_LAUNCH = """
+import runpy
+
+import uvicorn
+
+from task.utils.dial_file_conent_extractor import DialFileContentExtractor, DownloadedFile
+
+
+async def _serve(self, sockets=None):
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="test")
+
+    async def _adownload(file_url):
+        downloaded_file = DownloadedFile(filename="notes.txt")
+        downloaded_file.write(b"extracted by worker")
+        downloaded_file.finish()
+        return downloaded_file
+
+    extractor.adownload = _adownload
+    print((await extractor.aextract("files/bucket/notes.txt")).text)
+
+
+uvicorn.Server.serve = _serve
+runpy.run_module("task.app", run_name="__main__", alter_sys=True)
+"""
+
+
+def test_extraction_works_when_app_is_launched_as_main_module():
+    result = subprocess.run(
+        [sys.executable, "-c", _LAUNCH],
+        cwd=ROOT,
+        env={**os.environ, "FILE_EXTRACTION_WORKERS": "2", "WORKERS": "1"},
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().endswith("extracted by worker")
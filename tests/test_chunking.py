@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from task.tools.rag.chunking import TokenChunker, _approximate_token_offsets
+
+CHUNK_TOKENS = 20
+OVERLAP_TOKENS = 5
+
+
+def _text() -> str:
+    rng = np.random.default_rng(0)
+    words = [f"word{number}" for number in range(50)]
+    sentences = [" ".join(rng.choice(words, size=rng.integers(3, 12))) + "." for _ in range(60)]
+    return "\n\n".join(" ".join(sentences[start:start + 4]) for start in range(0, len(sentences), 4))
+
+
+def _tokens_in(text: str, start: int, end: int) -> np.ndarray:
+    """Indices of tokens within [start, end)"""
+    starts, ends = _approximate_token_offsets(text)
+    return np.flatnonzero((starts >= start) & (ends <= end))
+
+
+def test_chunks_fit_window_and_cover_text():
+    text = _text()
+    chunker = TokenChunker(chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS)
+
+    offsets = list(chunker.split_offsets(text))
+
+    assert len(offsets) > 10
+    assert all(len(_tokens_in(text, start, end)) <= CHUNK_TOKENS for start, end in offsets)
+    covered = set().union(*(set(_tokens_in(text, start, end)) for start, end in offsets))
+    assert covered == set(range(len(_approximate_token_offsets(text)[0])))
+
+
+def test_consecutive_chunks_overlap_by_at_most_overlap_tokens():
+    text = _text()
+    chunker = TokenChunker(chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS)
+
+    offsets = list(chunker.split_offsets(text))
+
+    for (_, previous_end), (start, end) in zip(offsets, offsets[1:]):
+        assert start < previous_end
+        shared = np.intersect1d(_tokens_in(text, start, end), _tokens_in(text, start, previous_end))
+        assert 1 <= len(shared) <= OVERLAP_TOKENS
+
+
+def test_chunk_ends_snap_to_separator_within_second_half():
+    text = _text()
+    chunker = TokenChunker(chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS)
+
+    offsets = list(chunker.split_offsets(text))
+
+    for start, end in offsets[:-1]:
+        assert text[end - 1] == "." or text[end:end + 1] in ("\n", " ")
+        assert len(_tokens_in(text, start, end)) >= CHUNK_TOKENS // 2
+
+
+def test_text_without_separators_is_cut_at_window():
+    text = "-" * 100
+    chunker = TokenChunker(chunk_tokens=CHUNK_TOKENS, overlap_tokens=OVERLAP_TOKENS)
+
+    offsets = list(chunker.split_offsets(text))
+
+    assert offsets[0] == (0, CHUNK_TOKENS)
+    assert offsets[1] == (CHUNK_TOKENS - OVERLAP_TOKENS, 2 * CHUNK_TOKENS - OVERLAP_TOKENS)
+    assert offsets[-1][1] == 100
+
+
+def test_overlap_must_be_less_than_window():
+    with pytest.raises(ValueError):
+        TokenChunker(chunk_tokens=10, overlap_tokens=10)
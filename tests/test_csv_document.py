@@ -0,0 +1,33 @@
+import pytest
+
+from task.utils.csv_document import CsvDocument
+from task.utils.dial_file_conent_extractor import _iter_csv_row_groups
+
+
+@pytest.mark.parametrize(("source", "rows"), [
+    (b"a,b\n   \n1,2\n", ["| 1 | 2 |"]),
+    (b"a,b\n,\n1,2\n", ["| 1 | 2 |"]),
+    (b"a,b\n  ,  \n1\n", ["| 1 |  |"]),
+    (b"   \na,b\n1,2\n\n3,4\n", ["| 1 | 2 |", "| 3 | 4 |"]),
+])
+def test_blank_rows_are_skipped(source: bytes, rows: list[str]):
+    document = CsvDocument.build("table.csv", "hash", source)
+
+    rendered = document.window(0, document.total_chars).rstrip("\n")
+
+    assert rendered == "\n".join(["| a | b |", "| --- | --- |", *rows])
+    assert rendered == "\n".join(_iter_csv_row_groups(source))
+
+
+def test_document_from_file_reads_rows_from_it(tmp_path):
+    source = b"\xef\xbb\xbfa,b\n1,\"x\ny\"\n\n2,3\n" + b"".join(b"%d,z\n" % row for row in range(100))
+    path = tmp_path / "table.csv"
+    path.write_bytes(source)
+
+    from_file = CsvDocument.build("table.csv", "hash", str(path))
+    from_bytes = CsvDocument.build("table.csv", "hash", source)
+
+    assert from_file.row_offsets == from_bytes.row_offsets
+    assert from_file.size_bytes < from_bytes.size_bytes
+    for start, end in [(0, 40), (35, 80), (300, 500), (0, from_file.total_chars)]:
+        assert from_file.window(start, end) == from_bytes.window(start, end)
@@ -0,0 +1,143 @@
+import asyncio
+import gc
+import os
+import random
+import time
+
+import pytest
+
+from task.utils import dial_file_conent_extractor
+from task.utils.csv_document import CsvDocument
+from task.utils.dial_file_conent_extractor import DialFileContentExtractor, DownloadedFile
+from task.utils.extracted_text_cache import ExtractedText, ExtractedTextCache
+from task.utils.metrics import FILE_EXTRACTION_ERRORS
+from tests.documents import make_pdf, page_text
+
+# Longest time a lightweight request may wait for the event loop while the extraction runs
+MAX_LOOP_LAG = 0.2
+
+
+def _stub_download(
+        extractor: DialFileContentExtractor,
+        filename: str,
+        content: bytes,
+        spool_max_size: int = dial_file_conent_extractor.SPOOL_MAX_SIZE,
+) -> None:
+    """Serve `content` as the downloaded file, streamed in chunks like `adownload` does."""
+
+    async def _adownload(file_url: str) -> DownloadedFile:
+        downloaded_file = DownloadedFile(filename=filename, spool_max_size=spool_max_size)
+        for start in range(0, len(content), 64 * 1024):
+            downloaded_file.write(content[start:start + 64 * 1024])
+            await asyncio.sleep(0)
+        downloaded_file.finish()
+        return downloaded_file
+
+    extractor.adownload = _adownload
+
+
+def _extraction_errors(extension: str) -> float:
+    for sample in FILE_EXTRACTION_ERRORS.samples():
+        if f'extension="{extension}"' in sample:
+            return float(sample.rsplit(" ", 1)[1])
+    return 0.0
+
+
+async def _serve_requests(latencies: list[float], done: asyncio.Event) -> None:
+    """Lightweight requests of other users: each one only needs the event loop for a moment."""
+    while not done.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.01)
+        latencies.append(time.perf_counter() - started - 0.01)
+
+
+async def _extract_while_serving(extractor: DialFileContentExtractor) -> tuple[ExtractedText, float, list[float]]:
+    latencies: list[float] = []
+    done = asyncio.Event()
+    requests = asyncio.create_task(_serve_requests(latencies, done))
+    started = time.perf_counter()
+    try:
+        extracted = await extractor.aextract("files/bucket/large.pdf")
+    finally:
+        done.set()
+        await requests
+    return extracted, time.perf_counter() - started, latencies
+
+
+def test_requests_are_served_while_large_pdf_is_extracted():
+    rnd = random.Random(0)
+    pdf = make_pdf([page_text(rnd, page) for page in range(20)])
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="test")
+    _stub_download(extractor, "large.pdf", pdf)
+
+    dial_file_conent_extractor.configure_extraction_workers(2)
+    try:
+        extracted, duration, latencies = asyncio.run(_extract_while_serving(extractor))
+    finally:
+        dial_file_conent_extractor.configure_extraction_workers(dial_file_conent_extractor.FILE_EXTRACTION_WORKERS)
+
+    pages = list(extracted.pages())
+    assert len(pages) == 20
+    assert all(page.startswith(f"Section {number}.0.") and f"Section {number}.4." in page
+               for number, page in enumerate(pages))
+    # Extraction keeps the worker busy for much longer than the allowed lag, so blocking would be noticed
+    assert duration > 5 * MAX_LOOP_LAG
+    assert len(latencies) > duration / 0.02
+    assert max(latencies) < MAX_LOOP_LAG
+
+
+def test_failed_extraction_is_counted_and_not_cached():
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="test")
+    _stub_download(extractor, "broken.pdf", b"%PDF-1.4 truncated")
+    cache = ExtractedTextCache()
+    errors = _extraction_errors(".pdf")
+
+    dial_file_conent_extractor.configure_extraction_workers(2)
+    try:
+        for _ in range(2):
+            with pytest.raises(Exception):
+                asyncio.run(extractor.aextract("files/bucket/broken.pdf", cache, etag="1"))
+    finally:
+        dial_file_conent_extractor.configure_extraction_workers(dial_file_conent_extractor.FILE_EXTRACTION_WORKERS)
+
+    # Counted in this (server) process, every attempt extracts the file again
+    assert _extraction_errors(".pdf") == errors + 2
+    assert cache.stats() == {"entries": 0, "aliases": 0, "bytes": 0}
+
+
+def test_paged_pdf_is_extracted_once_and_served_from_cache():
+    rnd = random.Random(1)
+    texts = [page_text(rnd, page) for page in range(3)]
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="test")
+    _stub_download(extractor, "report.pdf", make_pdf(texts))
+    cache = ExtractedTextCache()
+
+    first = asyncio.run(extractor.aextract_paged("files/bucket/report.pdf", cache, etag="1"))
+    extractor.adownload = None
+    second = asyncio.run(extractor.aextract_paged("files/bucket/report.pdf", cache, etag="1"))
+
+    assert isinstance(first, ExtractedText) and second is first
+    assert [page.split(". ", 1)[0] for page in first.pages()] == ["Section 0.0", "Section 1.0", "Section 2.0"]
+
+
+def test_spooled_csv_rows_are_read_from_file():
+    content = b"id,name,comment\n" + b"".join(b"%d,row %d,%s\n" % (row, row, b"x" * 100) for row in range(1000))
+    extractor = DialFileContentExtractor(endpoint="http://localhost:8080", api_key="test")
+    _stub_download(extractor, "table.csv", content, spool_max_size=1024)
+    cache = ExtractedTextCache(ttl_seconds=0.2)
+
+    document = asyncio.run(extractor.aextract_paged("files/bucket/table.csv", cache, etag="1"))
+
+    assert isinstance(document, CsvDocument) and os.path.exists(document.source)
+    assert document.size_bytes < len(content)
+    in_memory = CsvDocument.build("table.csv", document.content_hash, content)
+    for start, end in [(0, 60), (50_000, 60_000), (0, document.total_chars)]:
+        assert document.window(start, end) == in_memory.window(start, end)
+
+    # File is removed with the document, when it is no longer cached
+    path, key = document.source, f"csv:{document.content_hash}:.csv"
+    del document, in_memory
+    time.sleep(0.3)
+    assert cache.get(key) is None
+    gc.collect()
+    assert not os.path.exists(path)
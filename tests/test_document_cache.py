@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+
+from task.tools.rag.ann_index import create_flat_index
+from task.tools.rag.document_cache import DocumentCache
+
+DIMENSION = 8
+
+
+def _entry(chunks_count: int = 4) -> tuple:
+    index = create_flat_index(DIMENSION)
+    index.add(np.random.default_rng(0).random((chunks_count, DIMENSION), dtype=np.float32))
+    chunks = [f"chunk {number}" for number in range(chunks_count)]
+    spans = np.array([(1, number * 10, number * 10 + 7) for number in range(chunks_count)], dtype=np.int64)
+    return index, chunks, spans
+
+
+def test_least_recently_used_entries_are_evicted_over_byte_budget():
+    entry_size = DocumentCache.entry_size(*_entry())
+    cache = DocumentCache(max_bytes=entry_size * 2)
+
+    cache.set("a", *_entry())
+    cache.set("b", *_entry())
+    assert cache.get("a") is not None
+    cache.set("c", *_entry())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.stats()["bytes"] == entry_size * 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entry_bigger_than_budget_is_not_kept_in_memory():
+    cache = DocumentCache(max_bytes=DocumentCache.entry_size(*_entry()) - 1)
+
+    cache.set("a", *_entry())
+
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 0
+
+
+def test_idle_entries_and_aliases_expire():
+    cache = DocumentCache(idle_ttl_seconds=0.2)
+    cache.set("a", *_entry())
+    cache.set("b", *_entry())
+    cache.set_alias("conversation:file", "a")
+
+    time.sleep(0.12)
+    # Access keeps the entry alive
+    assert cache.get("a") is not None
+    time.sleep(0.12)
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get_alias("conversation:file") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_cleanup_removes_expired_entries_and_aliases():
+    cache = DocumentCache(idle_ttl_seconds=0.05)
+    cache.set("a", *_entry())
+    cache.set_alias("conversation:file", "a")
+    time.sleep(0.06)
+
+    assert cache.cleanup_old_entries() == 1
+    assert cache.stats()["entries"] == 0 and cache.stats()["aliases"] == 0
+
+
+def test_aliases_are_capped():
+    cache = DocumentCache(max_aliases=2)
+
+    for number in range(3):
+        cache.set_alias(f"alias-{number}", "a")
+
+    assert cache.get_alias("alias-0") is None
+    assert cache.get_alias("alias-1") == "a" and cache.get_alias("alias-2") == "a"
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import numpy as np
+
+from task.tools.rag import embedding_cache
+from task.tools.rag.embedding_cache import ChunkEmbeddingCache
+
+
+def _embeddings(count: int, offset: int = 0) -> np.ndarray:
+    return np.arange(offset, offset + count * 4, dtype=np.float32).reshape(count, 4)
+
+
+def test_memory_hits_and_misses():
+    cache = ChunkEmbeddingCache(model_name="model")
+    cache.set_many(["a", "b"], _embeddings(2))
+
+    cached = cache.get_many(["b", "c", "a", "b"])
+
+    assert cached[1] is None
+    assert cached[0].tolist() == cached[3].tolist() == _embeddings(2)[1].tolist()
+    assert cached[2].tolist() == _embeddings(2)[0].tolist()
+
+
+def test_embeddings_of_other_model_are_not_served():
+    cache = ChunkEmbeddingCache(model_name="model")
+    cache.set_many(["a"], _embeddings(1))
+
+    assert ChunkEmbeddingCache(model_name="other-model").key("a") != cache.key("a")
+
+
+def test_disk_tier_serves_other_process(tmp_path: Path):
+    path = str(tmp_path / "embeddings.sqlite")
+    ChunkEmbeddingCache(model_name="model", path=path).set_many(["a", "b"], _embeddings(2))
+
+    # New instance: empty memory tier, embeddings come from SQLite
+    cache = ChunkEmbeddingCache(model_name="model", path=path)
+    cached = cache.get_many(["a", "missing", "b"])
+
+    assert cached[0].tolist() == _embeddings(2)[0].tolist()
+    assert cached[1] is None
+    assert cached[2].tolist() == _embeddings(2)[1].tolist()
+    assert cache.stats()["entries"] == 2
+
+
+def test_memory_tier_is_bounded_by_bytes(tmp_path: Path):
+    # Two 4-dimensional float32 vectors fit
+    cache = ChunkEmbeddingCache(model_name="model", max_bytes=32, path=str(tmp_path / "embeddings.sqlite"))
+    cache.set_many(["a", "b", "c"], _embeddings(3))
+
+    assert cache.stats()["bytes"] == 32
+    assert cache.stats()["disk_entries"] == 3
+    # Evicted from memory, still served from disk
+    assert cache.get_many(["a"])[0].tolist() == _embeddings(3)[0].tolist()
+
+
+def test_disk_tier_keeps_recently_used_entries(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(embedding_cache, "_DISK_EVICTION_INTERVAL", 1)
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = ChunkEmbeddingCache(model_name="model", path=path, max_disk_entries=2)
+
+    cache.set_many(["a"], _embeddings(1))
+    cache.set_many(["b"], _embeddings(1, offset=4))
+    # Read by other worker goes to disk and makes "a" recently used there
+    ChunkEmbeddingCache(model_name="model", path=path).get_many(["a"])
+    cache.set_many(["c"], _embeddings(1, offset=8))
+
+    cached = ChunkEmbeddingCache(model_name="model", path=path).get_many(["a", "b", "c"])
+    assert [embedding is not None for embedding in cached] == [True, False, True]
@@ -0,0 +1,17 @@
+from task.utils.extracted_text_cache import ExtractedText
+
+
+def test_empty_pages_keep_page_numbers():
+    pages = ["", "first", "", "", "second", ""]
+    extracted_text = ExtractedText.from_pages("scan.pdf", "hash", pages)
+
+    assert list(extracted_text.pages()) == pages
+    assert extracted_text.text == "first\n\nsecond"
+
+
+def test_pages_without_empty_pages():
+    pages = ["first", "second", "third"]
+    extracted_text = ExtractedText.from_pages("doc.pdf", "hash", pages)
+
+    assert list(extracted_text.pages()) == pages
+    assert extracted_text.text == "first\n\nsecond\n\nthird"
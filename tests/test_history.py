@@ -0,0 +1,125 @@
+import copy
+from typing import Any
+
+from aidial_sdk.chat_completion import Attachment, CustomContent, Message, Role
+
+from task.utils.constants import CUSTOM_CONTENT, TOOL_CALL_HISTORY_KEY
+from task.utils.history import HistoryUnpacker, unpack_messages
+
+
+def _legacy_unpack_messages(messages: list[Message], state_history: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Unpacking before `HistoryUnpacker`: deep copies messages and strips custom content in place."""
+    result: list[dict[str, Any]] = []
+    for message in messages:
+        if message.role == Role.ASSISTANT:
+            if custom_content := message.custom_content:
+                state = custom_content.state
+                if state and isinstance(state, dict):
+                    tool_call_history = state.get(TOOL_CALL_HISTORY_KEY)
+                    if tool_call_history and isinstance(tool_call_history, list):
+                        for history_msg in tool_call_history:
+                            if history_msg.get("role") == Role.TOOL.value:
+                                result.append({
+                                    "role": Role.TOOL.value,
+                                    "content": history_msg.get("content"),
+                                    "tool_call_id": history_msg.get("tool_call_id"),
+                                })
+                            else:
+                                result.append(history_msg)
+
+                    msg = copy.deepcopy(message)
+                    msg.custom_content = None
+                    result.append(msg.dict(exclude_none=True))
+        else:
+            attachments_urls_content = ''
+            if message.custom_content and message.custom_content.attachments:
+                attachments_urls_content = '\n\nAttached files URLs:\n'
+                for attachment in message.custom_content.attachments:
+                    if attachment.url:
+                        attachments_urls_content += f"{attachment.url}\n"
+                    elif attachment.reference_url:
+                        attachments_urls_content += f"{attachment.reference_url}\n"
+
+            content = message.content or ''
+            if attachments_urls_content:
+                content += attachments_urls_content
+            result.append({"role": message.role, "content": content})
+
+    if state_history:
+        for history_msg in state_history:
+            if history_msg.get(CUSTOM_CONTENT):
+                del history_msg[CUSTOM_CONTENT]
+            result.append(history_msg)
+
+    return result
+
+
+def _tool_round(number: int) -> list[dict[str, Any]]:
+    tool_call_id = f"call-{number}"
+    return [
+        {
+            "role": Role.ASSISTANT.value,
+            "content": "",
+            "tool_calls": [{
+                "id": tool_call_id,
+                "type": "function",
+                "function": {"name": "web_search", "arguments": f'{{"query": "q{number}"}}'},
+            }],
+        },
+        {"role": Role.TOOL.value, "content": f"result {number}", "tool_call_id": tool_call_id, "name": "web_search"},
+    ]
+
+
+def _conversation() -> list[Message]:
+    return [
+        Message(
+            role=Role.USER,
+            content="Summarize the file",
+            custom_content=CustomContent(attachments=[
+                Attachment(url="files/bucket/report.pdf", title="report.pdf"),
+                Attachment(data="a,b", reference_url="https://example.com/data.csv", title="data.csv"),
+            ]),
+        ),
+        Message(
+            role=Role.ASSISTANT,
+            content="The report is about sales.",
+            custom_content=CustomContent(state={TOOL_CALL_HISTORY_KEY: [*_tool_round(0), *_tool_round(1)]}),
+        ),
+        Message(role=Role.ASSISTANT, content="Assistant message without state"),
+        Message(role=Role.USER, content="What about the weather?"),
+    ]
+
+
+def test_unpacker_matches_legacy_unpacking_on_every_round():
+    messages = _conversation()
+    state_history: list[dict[str, Any]] = []
+    unpacker = HistoryUnpacker()
+
+    for round_number in range(4):
+        expected = _legacy_unpack_messages(copy.deepcopy(messages), copy.deepcopy(state_history))
+
+        assert unpacker.unpack(messages, state_history) == expected
+        assert unpack_messages(messages, state_history) == expected
+
+        state_history.extend(_tool_round(round_number + 2))
+
+
+def test_unpacking_does_not_modify_request():
+    messages = _conversation()
+    state_history = [{**_tool_round(2)[0], CUSTOM_CONTENT: {"attachments": []}}]
+    messages_before = copy.deepcopy(messages)
+    state_history_before = copy.deepcopy(state_history)
+
+    unpacked = HistoryUnpacker().unpack(messages, state_history)
+
+    assert messages == messages_before
+    assert state_history == state_history_before
+    assert CUSTOM_CONTENT not in unpacked[-1]
+
+
+def test_unpacker_restarts_on_other_messages():
+    unpacker = HistoryUnpacker()
+    unpacker.unpack(_conversation(), _tool_round(2))
+    other_messages = [Message(role=Role.USER, content="New conversation")]
+
+    assert unpacker.unpack(other_messages, []) == [{"role": Role.USER, "content": "New conversation"}]
@@ -0,0 +1,77 @@
+import asyncio
+
+import httpx
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from task.tools.mcp.mcp_client_pool import MCPClientPool
+
+
+class _Client:
+    """MCP client failing the first calls with the queued errors."""
+
+    def __init__(self, errors: list[Exception]):
+        self.errors = errors
+        self.calls = 0
+
+    async def call_tool(self, tool_name: str, tool_args: dict, idempotent: bool = True) -> str:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "done"
+
+
+class _Session:
+    """Pooled session stand-in, `connect_errors` fail connecting before anything is sent."""
+
+    def __init__(self, client: _Client, connect_errors: list[Exception]):
+        self.number = 0
+        self.client = client
+        self.in_flight = 0
+        self.limit = asyncio.Semaphore(1)
+        self.connect_errors = connect_errors
+        self.closing = asyncio.Event()
+
+    async def connect(self, timeout: float):
+        if self.connect_errors:
+            raise self.connect_errors.pop(0)
+        return self.client, self.closing
+
+    async def close(self) -> None:
+        pass
+
+
+def _call(client: _Client, idempotent: bool, connect_errors: list[Exception] | None = None) -> str:
+    pool = MCPClientPool("http://mcp", size=1, retries=1, retry_backoff=0, health_check_interval=0)
+    pool._sessions = [_Session(client, connect_errors or [])]
+    return asyncio.run(pool.call_tool("execute_code", {"code": "print(1)"}, idempotent=idempotent))
+
+
+def test_idempotent_call_is_retried_after_transport_error():
+    client = _Client([httpx.ReadError("connection reset")])
+
+    assert _call(client, idempotent=True) == "done"
+    assert client.calls == 2
+
+
+def test_not_idempotent_call_is_not_retried_once_sent():
+    client = _Client([httpx.ReadError("connection reset")])
+
+    with pytest.raises(httpx.ReadError):
+        _call(client, idempotent=False)
+    assert client.calls == 1
+
+
+def test_not_idempotent_call_is_retried_when_connect_failed():
+    client = _Client([])
+
+    assert _call(client, idempotent=False, connect_errors=[ConnectionError("refused")]) == "done"
+    assert client.calls == 1
+
+
+def test_not_idempotent_call_is_retried_when_session_rejected():
+    client = _Client([McpError(ErrorData(code=32600, message="Session terminated"))])
+
+    assert _call(client, idempotent=False) == "done"
+    assert client.calls == 2
@@ -0,0 +1,187 @@
+import asyncio
+
+from aidial_client.types.chat.legacy.chat_completion import ToolCall
+from mcp.types import CallToolResult, TextContent
+
+from task.tools.base import BaseTool
+from task.tools.mcp.mcp_client import MCPClient
+from task.tools.mcp.mcp_tool import MCPTool
+from task.tools.mcp.mcp_tool_model import MCPToolModel
+from task.tools.models import ToolCallParams
+from task.tools.result_cache import ToolResultCache
+
+
+class _Stage:
+    def __init__(self):
+        self.content = ""
+
+    def append_content(self, content: str) -> None:
+        self.content += content
+
+
+class _Session:
+    """MCP session answering `search` calls with the queued results."""
+
+    def __init__(self, results: list[CallToolResult]):
+        self.results = results
+        self.calls = 0
+
+    async def call_tool(self, tool_name: str, tool_args: dict) -> CallToolResult:
+        self.calls += 1
+        return self.results.pop(0)
+
+
+def _tool_call_params(api_key: str = "key") -> ToolCallParams:
+    tool_call = ToolCall.parse_obj({
+        "id": "call-1",
+        "type": "function",
+        "function": {"name": "search", "arguments": '{"query": "weather"}'},
+    })
+    return ToolCallParams(tool_call=tool_call, stage=_Stage(), choice=None, api_key=api_key, conversation_id="c")
+
+
+def test_mcp_tool_error_is_not_cached():
+    session = _Session([
+        CallToolResult(content=[TextContent(type="text", text="Search failed: rate limited")], isError=True),
+        CallToolResult(content=[TextContent(type="text", text="Sunny, 25C")]),
+    ])
+    client = MCPClient("http://mcp")
+    client.session = session
+    tool = MCPTool(client, MCPToolModel(name="search", description="Web search", parameters={}), result_cache_ttl=300)
+    tool.result_cache = ToolResultCache()
+
+    async def _run() -> list[str]:
+        return [(await tool.execute(_tool_call_params(api_key))).content for api_key in ("user-1", "user-2", "user-3")]
+
+    first, second, third = asyncio.run(_run())
+
+    assert "rate limited" in first and first.startswith("ERROR")
+    assert second == "Sunny, 25C"
+    assert third == "Sunny, 25C"
+    assert session.calls == 2
+
+
+def _counting_call(result: str, delay: float = 0.0):
+    calls = []
+
+    async def _execute() -> str:
+        calls.append(result)
+        await asyncio.sleep(delay)
+        return result
+
+    return _execute, calls
+
+
+def test_result_expires_after_ttl():
+    cache = ToolResultCache()
+    execute, calls = _counting_call("result")
+
+    async def _run() -> list[bool]:
+        served = [(await cache.get_or_execute("tool", "key", 0.05, execute))[1]]
+        served.append((await cache.get_or_execute("tool", "key", 0.05, execute))[1])
+        await asyncio.sleep(0.1)
+        served.append((await cache.get_or_execute("tool", "key", 0.05, execute))[1])
+        return served
+
+    assert asyncio.run(_run()) == [False, True, False]
+    assert len(calls) == 2
+
+
+def test_entries_and_bytes_are_bounded():
+    cache = ToolResultCache(max_entries=2, max_bytes=10)
+
+    async def _run() -> None:
+        for key, value in (("a", "1234"), ("b", "1234"), ("c", "1234"), ("too-big", "x" * 11)):
+            await cache.get_or_execute("tool", key, 60, _counting_call(value)[0])
+        await cache.get_or_execute("tool", "d", 60, _counting_call("123456")[0])
+
+    asyncio.run(_run())
+
+    # "a" is evicted by the entry count, "b" by the byte budget, too big result is not cached at all
+    assert sorted(cache._entries) == ["c", "d"]
+    assert cache.stats()["bytes"] == 10
+    assert cache.stats()["tools"]["tool"]["evictions"] == 2
+
+
+def test_concurrent_identical_calls_execute_once():
+    cache = ToolResultCache()
+    execute, calls = _counting_call("result", delay=0.05)
+
+    async def _run() -> list[tuple[str, bool]]:
+        return await asyncio.gather(*(cache.get_or_execute("tool", "key", 60, execute) for _ in range(5)))
+
+    results = asyncio.run(_run())
+
+    assert len(calls) == 1
+    assert [result for result, _ in results] == ["result"] * 5
+    assert sum(from_cache for _, from_cache in results) == 4
+
+
+def test_failed_call_is_shared_with_waiters_but_not_stored():
+    cache = ToolResultCache()
+    attempts = []
+
+    async def _fail() -> str:
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        raise RuntimeError("search failed")
+
+    async def _run() -> list:
+        return await asyncio.gather(
+            *(cache.get_or_execute("tool", "key", 60, _fail) for _ in range(3)), return_exceptions=True
+        )
+
+    errors = asyncio.run(_run())
+
+    assert all(isinstance(error, RuntimeError) for error in errors)
+    assert len(attempts) == 1
+    assert cache.size() == 0
+
+
+def test_per_user_scope_separates_keys():
+    arguments = {"query": "weather", "max_results": 3}
+
+    user_key = ToolResultCache.make_key("search", arguments, scope="user-1")
+
+    assert user_key != ToolResultCache.make_key("search", arguments, scope="user-2")
+    assert user_key == ToolResultCache.make_key("search", {"max_results": 3, "query": "weather"}, scope="user-1")
+    assert ToolResultCache.make_key("search", arguments) == ToolResultCache.make_key("search", arguments, scope=None)
+    assert "user-1" not in user_key
+
+
+class _UserTool(BaseTool):
+    """Tool with per-user results (default scope of `BaseTool`)."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def _execute(self, tool_call_params: ToolCallParams) -> str:
+        self.calls.append(tool_call_params.api_key)
+        return f"result of {tool_call_params.api_key}"
+
+    @property
+    def result_cache_ttl(self) -> float | None:
+        return 60
+
+    @property
+    def name(self) -> str:
+        return "search"
+
+    @property
+    def description(self) -> str:
+        return "Per-user search"
+
+    @property
+    def parameters(self) -> dict:
+        return {}
+
+
+def test_per_user_results_are_not_shared_between_users():
+    tool = _UserTool()
+    tool.result_cache = ToolResultCache()
+
+    async def _run() -> list[str]:
+        return [(await tool.execute(_tool_call_params(api_key))).content for api_key in ("user-1", "user-2", "user-1")]
+
+    assert asyncio.run(_run()) == ["result of user-1", "result of user-2", "result of user-1"]
+    assert tool.calls == ["user-1", "user-2"]
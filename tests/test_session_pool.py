@@ -0,0 +1,96 @@
+import asyncio
+import json
+import uuid
+
+from task.tools.py_interpreter.session_pool import InterpreterSessionPool
+
+IDLE_TTL = 0.1
+
+
+class _Interpreter:
+    """Interpreter MCP client: unknown or expired `session_id` starts a new kernel."""
+
+    def __init__(self):
+        self.kernels: set[str] = set()
+        self.started = 0
+
+    async def call_tool(self, tool_name: str, arguments: dict, idempotent: bool = True) -> str:
+        session_id = arguments.get("session_id")
+        if session_id not in self.kernels:
+            session_id = uuid.uuid4().hex
+            self.kernels.add(session_id)
+            self.started += 1
+        return json.dumps({"success": True, "output": [], "session_info": {"session_id": session_id}})
+
+
+async def _settle() -> None:
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _create_pool(interpreter: _Interpreter) -> InterpreterSessionPool:
+    # Reaping is driven by the test, the loop is not started
+    return InterpreterSessionPool(interpreter, "execute_code", size=2, idle_ttl=IDLE_TTL)
+
+
+def test_idle_server_does_not_start_kernels():
+    async def _run() -> int:
+        interpreter = _Interpreter()
+        pool = _create_pool(interpreter)
+        pool._fill()
+        await _settle()
+        for _ in range(3):
+            await asyncio.sleep(IDLE_TTL * 1.5)
+            pool._reap()
+            await _settle()
+        return interpreter.started
+
+    assert asyncio.run(_run()) == 2
+
+
+def test_stale_warm_sessions_are_refreshed_in_place_while_pool_is_used():
+    async def _run() -> tuple[list[str], list[str], int, str | None]:
+        interpreter = _Interpreter()
+        pool = _create_pool(interpreter)
+        pool._fill()
+        await _settle()
+        warm_before = [session.session_id for session in pool._warm]
+
+        await asyncio.sleep(IDLE_TTL * 1.5)
+        conversation_session = await pool.acquire("conversation")
+        await _settle()
+        # One warm session is bound, one more started in its place
+        await asyncio.sleep(IDLE_TTL * 1.5)
+        await pool.acquire("conversation")
+        pool._reap()
+        await _settle()
+        return warm_before, [session.session_id for session in pool._warm], interpreter.started, conversation_session
+
+    warm_before, warm_after, started, conversation_session = asyncio.run(_run())
+
+    assert conversation_session == warm_before[0]
+    assert warm_before[1] in warm_after
+    assert started == 3
+
+
+def test_expired_warm_session_is_replaced_on_refresh():
+    async def _run() -> tuple[str, str]:
+        interpreter = _Interpreter()
+        pool = _create_pool(interpreter)
+        pool._fill()
+        await _settle()
+        # The first warm session gets bound, the second one stays warm and is expired by the interpreter
+        expired_session = pool._warm[1].session_id
+        interpreter.kernels.discard(expired_session)
+
+        await asyncio.sleep(IDLE_TTL * 1.5)
+        await pool.acquire("conversation")
+        await _settle()
+        pool._reap()
+        await _settle()
+        return expired_session, [session.session_id for session in pool._warm]
+
+    expired_session, warm_sessions = asyncio.run(_run())
+
+    assert len(warm_sessions) == 2
+    assert expired_session not in warm_sessions
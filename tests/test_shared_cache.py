@@ -0,0 +1,58 @@
+import asyncio
+import time
+from typing import Optional
+
+from task.utils.shared_cache import InMemorySharedCache, TieredCache
+
+SHARED_CACHE_DELAY = 0.3
+
+
+class _SlowSharedCache(InMemorySharedCache):
+    """Shared cache with a slow round trip, like Redis under load."""
+
+    def get(self, key: str) -> bytes | None:
+        time.sleep(SHARED_CACHE_DELAY)
+        return super().get(key)
+
+    def set(self, key: str, value: bytes, ttl_seconds: Optional[int] = None) -> None:
+        time.sleep(SHARED_CACHE_DELAY)
+        super().set(key, value, ttl_seconds)
+
+
+def _create_cache(shared_cache: InMemorySharedCache) -> TieredCache[bytes]:
+    return TieredCache("test", dumps=lambda value: value, loads=lambda data: data, shared_cache=shared_cache)
+
+
+def test_async_access_does_not_block_event_loop():
+    async def _run() -> tuple[bytes | None, float]:
+        cache = _create_cache(_SlowSharedCache())
+        lags = []
+
+        async def _heartbeat():
+            while True:
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                lags.append(time.perf_counter() - started - 0.01)
+
+        heartbeat = asyncio.create_task(_heartbeat())
+        await cache.aset("key", b"value")
+        # Other worker: nothing in L1, value comes from the shared tier
+        other_worker_cache = _create_cache(cache._shared_cache)
+        value = await other_worker_cache.aget("key")
+        heartbeat.cancel()
+        return value, max(lags)
+
+    value, max_lag = asyncio.run(_run())
+
+    assert value == b"value"
+    assert max_lag < SHARED_CACHE_DELAY / 2
+
+
+def test_l1_hit_does_not_touch_shared_cache():
+    shared_cache = InMemorySharedCache()
+    cache = _create_cache(shared_cache)
+    cache.set("key", b"value")
+    shared_cache.delete("test:key")
+
+    assert asyncio.run(cache.aget("key")) == b"value"
+    assert cache.get("missing") is None
@@ -0,0 +1,58 @@
+import asyncio
+
+from task.utils.stream_buffer import BufferedContentWriter
+
+
+class _Sink:
+    def __init__(self):
+        self.chunks: list[str] = []
+
+    def append_content(self, content: str) -> None:
+        self.chunks.append(content)
+
+
+def test_small_deltas_are_coalesced_until_flush():
+    sink = _Sink()
+
+    with BufferedContentWriter(sink, max_delay=60, max_bytes=256) as writer:
+        for delta in ("Hel", "lo", ", ", "", "world"):
+            writer.append_content(delta)
+        assert sink.chunks == []
+
+    assert sink.chunks == ["Hello, world"]
+
+
+def test_buffer_is_flushed_when_size_reached():
+    sink = _Sink()
+    writer = BufferedContentWriter(sink, max_delay=60, max_bytes=4)
+
+    for delta in ("ab", "cd", "e"):
+        writer.append_content(delta)
+
+    assert sink.chunks == ["abcd"]
+    writer.flush()
+    assert sink.chunks == ["abcd", "e"]
+
+
+def test_buffer_is_flushed_after_delay_when_upstream_pauses():
+    sink = _Sink()
+
+    async def _run() -> list[list[str]]:
+        writer = BufferedContentWriter(sink, max_delay=0.05, max_bytes=256)
+        writer.append_content("partial")
+        before_delay = list(sink.chunks)
+        await asyncio.sleep(0.1)
+        return [before_delay, list(sink.chunks)]
+
+    assert asyncio.run(_run()) == [[], ["partial"]]
+
+
+def test_delta_after_delay_flushes_without_timer():
+    sink = _Sink()
+    # No running loop: only the delay check on `append_content` flushes
+    writer = BufferedContentWriter(sink, max_delay=0.0, max_bytes=256)
+
+    writer.append_content("a")
+    writer.append_content("b")
+
+    assert sink.chunks == ["a", "b"]